@@ -0,0 +1,151 @@
+"""
+Dataset analytics precomputed once per dataset snapshot and served as JSON bytes.
+
+Every aggregate the dataset endpoints report (per-column moments, min/max/median, the
+correlation matrix, histograms, and outcome counts and group means) is computed in one
+vectorized pass over the snapshot's float matrix when the dataset is loaded or changes.
+Missing values (NaN) are skipped, as pandas skips them; correlations use the rows where
+both columns are present.
+Each endpoint's payload is then serialized once, with the same settings as Flask's
+jsonify, so a request only copies bytes into a response.
+
+The snapshot hangs off the Dataset it was computed from (see dataset.py): a reloaded
+dataset is a new Dataset, so the analytics are rebuilt on its first use and requests
+holding the old one keep consistent numbers.
+"""
+
+import json
+import threading
+import time
+
+import numpy as np
+
+from dataset import get_dataset
+
+# Rows returned as a preview by /api/dataset
+SAMPLE_ROWS = 20
+HISTOGRAM_BINS = 10
+
+_build_lock = threading.Lock()
+
+
+def _serialize(payload):
+    """JSON bytes as flask.jsonify writes them (sorted keys, compact, trailing newline)"""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':')).encode() + b'\n'
+
+
+def _correlation(matrix):
+    """Pearson correlation of the columns, over pairwise complete rows when values are missing"""
+    missing = np.isnan(matrix)
+    if not missing.any():
+        return np.corrcoef(matrix, rowvar=False)
+
+    n = matrix.shape[1]
+    correlation = np.empty((n, n))
+    for i in range(n):
+        for j in range(i, n):
+            rows = ~(missing[:, i] | missing[:, j])
+            correlation[i, j] = correlation[j, i] = np.corrcoef(matrix[rows, i], matrix[rows, j])[0, 1]
+    return correlation
+
+
+def compute_aggregates(dataset):
+    """Every aggregate the dataset endpoints use, in one pass over the columns"""
+    matrix = dataset.matrix
+    y = dataset.y
+    features = [dataset.columns.index(name) for name in dataset.feature_names]
+
+    correlation = _correlation(matrix)
+    # Exactly 1 on the diagonal, as pandas reports it (corrcoef leaves rounding error there)
+    np.fill_diagonal(correlation, 1.0)
+
+    X = matrix[:, features]
+    return {
+        'mean': np.nanmean(X, axis=0),
+        # Sample standard deviation (ddof=1), as pandas computes it
+        'std': np.nanstd(X, axis=0, ddof=1),
+        'min': np.nanmin(X, axis=0),
+        'max': np.nanmax(X, axis=0),
+        'median': np.nanmedian(X, axis=0),
+        'missing': np.isnan(X).sum(axis=0),
+        'correlation': correlation,
+        'histograms': [np.histogram(column[~np.isnan(column)], bins=HISTOGRAM_BINS)[0] for column in X.T],
+        'positives': int(np.nansum(y)),
+        'group_means': {label: np.nanmean(matrix[y == label], axis=0) for label in (0, 1)}
+    }
+
+
+def build_payloads(dataset):
+    """Response bodies (as dicts) of the dataset endpoints for one snapshot"""
+    aggregates = compute_aggregates(dataset)
+    names = dataset.feature_names
+    total = len(dataset)
+    positives = aggregates['positives']
+
+    diabetic_percentage = round((positives / total) * 100, 1)
+    non_diabetic_percentage = round(((total - positives) / total) * 100, 1)
+    age = dataset.columns.index('Age')
+
+    return {
+        'dataset': {
+            'total_samples': total,
+            'features': len(names),
+            'diabetic_cases': positives,
+            'non_diabetic_cases': total - positives,
+            'diabetes_rate': diabetic_percentage,
+            'columns': dataset.columns,
+            'sample_data': dataset.matrix[:SAMPLE_ROWS].tolist()
+        },
+        'dataset-stats': {
+            'feature_stats': {name: {stat: float(aggregates[stat][i])
+                                     for stat in ('mean', 'std', 'min', 'max', 'median')}
+                              for i, name in enumerate(names)},
+            'total_samples': total,
+            'missing_values': {name: int(count) for name, count in zip(names, aggregates['missing'])}
+        },
+        'correlation-matrix': {
+            'correlation_matrix': aggregates['correlation'].tolist(),
+            'features': dataset.columns
+        },
+        'feature-distributions': {
+            'features': names,
+            'stats': {name: {'mean': float(aggregates['mean'][i]), 'std': float(aggregates['std'][i])}
+                      for i, name in enumerate(names)},
+            'histograms': {name: hist.tolist() for name, hist in zip(names, aggregates['histograms'])}
+        },
+        'outcome-analysis': {
+            'diabetic_count': positives,
+            'non_diabetic_count': total - positives,
+            'total_samples': total,
+            'diabetic_percentage': diabetic_percentage,
+            'non_diabetic_percentage': non_diabetic_percentage,
+            'avg_age_diabetic': round(float(aggregates['group_means'][1][age]), 1),
+            'avg_age_non_diabetic': round(float(aggregates['group_means'][0][age]), 1),
+            'balance_status': "balanced" if abs(diabetic_percentage - 50) < 15 else "imbalanced"
+        }
+    }
+
+
+class AnalyticsSnapshot:
+    """Pre-serialized endpoint bodies for one dataset snapshot"""
+
+    def __init__(self, dataset):
+        start = time.perf_counter()
+        self.payloads = {name: _serialize(payload) for name, payload in build_payloads(dataset).items()}
+        self.sha256 = dataset.sha256
+        self.build_seconds = time.perf_counter() - start
+
+    def body(self, endpoint):
+        return self.payloads[endpoint]
+
+
+def get_analytics(dataset=None):
+    """The analytics snapshot of the current dataset, built on first use after a (re)load"""
+    dataset = get_dataset() if dataset is None else dataset
+    snapshot = dataset.analytics
+    if snapshot is None:
+        with _build_lock:
+            snapshot = dataset.analytics
+            if snapshot is None:
+                snapshot = dataset.analytics = AnalyticsSnapshot(dataset)
+    return snapshot
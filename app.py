@@ -1,23 +1,47 @@
 from flask import Flask, render_template, request, jsonify
-from model import predict_diabetes, train_model
-import pickle
-import pandas as pd
+from model import (active_version, explain_diabetes_many, get_algorithm_name, get_model_card, handle,
+                   predict_diabetes_many, warmup)
+from registry import registry
+from analytics import get_analytics
+from columnar import COLUMNS_MEDIA_TYPE, JSON_MEDIA_TYPE, encode, negotiate
+from dataset import StaleCursorError, get_dataset
+from http_cache import conditional, http_cache_stats, make_etag
+from training_cache import cache_stats
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.svm import SVC
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
 import json
 import os
 
+# pandas and sklearn are imported inside the endpoints that use them, so importing the
+# app (and starting a worker) does not pay for them until a dataset endpoint is hit
+
 app = Flask(__name__)
 
-# Train the model when the app starts
-model_accuracy = train_model()
+# Estimated accuracy until warmup_model() has initialized the model
+model_accuracy = 0.75
+
+
+def warmup_model():
+    """Initialize the model ahead of the first request (timed, see model.warmup)"""
+    global model_accuracy
+    model_accuracy = warmup()
+    
+    # Dataset columns and endpoint payloads, so the first dashboard request does not build them
+    try:
+        get_analytics()
+    except Exception as e:
+        print(f"Error precomputing dataset analytics: {e}")
+    
+    # Extra model versions for A/B trials, if any are configured (see registry.py)
+    try:
+        registry.load_config()
+    except Exception as e:
+        print(f"Error loading the model registry configuration, serving the primary model only: {e}")
+    return model_accuracy
+
+
+def routing_key():
+    """Session key for sticky A/B routing: the X-Session-ID header, else the client address"""
+    return request.headers.get('X-Session-ID') or request.remote_addr
 
 
 @app.route('/')
@@ -40,12 +64,14 @@ def predict():
             float(request.form['age'])
         ]
 
-        # Make prediction
-        prediction, probability = predict_diabetes(features)
+        # Make prediction on the arm this request is routed to
+        prediction, probability, arm, version = registry.predict(features, routing_key())
 
         return jsonify({
             'prediction': int(prediction),
             'probability': float(probability),
+            'model_arm': arm,
+            'model_version': version.version,
             'success': True
         })
     except Exception as e:
@@ -58,27 +84,30 @@ def predict():
 @app.route('/feature-importance', methods=['GET'])
 def get_feature_importance():
     try:
-        # Load the trained model
-        with open('diabetes_model.pkl', 'rb') as f:
-            model = pickle.load(f)
-
-        # Get feature importance from the Random Forest model
-        feature_names = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-                         'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
-
-        importances = model.feature_importances_
-        feature_importance = dict(zip(feature_names, importances))
+        # Use the model already loaded (memory-mapped) by model.py; read once so a reload
+        # cannot split the response between two versions
+        version = active_version()
+        model = version.model
+        
+        def render():
+            # Feature importances were stored in the model card when the model was published
+            card = version.card
+            feature_importance = dict(zip(card['feature_names'], card['feature_importance']))
 
-        return jsonify({
-            'feature_importance': feature_importance,
-            'model_info': {
-                'algorithm': 'Random Forest',
-                'n_estimators': model.n_estimators,
-                'max_depth': model.max_depth,
-                'random_state': model.random_state
-            },
-            'success': True
-        })
+            return jsonify({
+                'feature_importance': feature_importance,
+                'model_info': {
+                    'algorithm': get_algorithm_name(model),
+                    'n_estimators': getattr(model, 'n_estimators', None),
+                    'max_depth': getattr(model, 'max_depth', None),
+                    'random_state': getattr(model, 'random_state', None)
+                },
+                'success': True
+            })
+        
+        # Changes only with the served model version (see http_cache.py)
+        return conditional('feature-importance', make_etag('feature-importance', version.version), render,
+                           version.loaded_at)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -89,19 +118,35 @@ def get_feature_importance():
 @app.route('/model-info', methods=['GET'])
 def get_model_info():
     try:
-        # Load model and get information
-        with open('diabetes_model.pkl', 'rb') as f:
-            model = pickle.load(f)
+        version = active_version()
+        model = version.model
+        training_cache = cache_stats()
+        
+        def render():
+            card = version.card
 
-        return jsonify({
-            'algorithm': 'Random Forest',
-            'n_estimators': model.n_estimators,
-            'accuracy': model_accuracy,
-            'features': 8,
-            'training_samples': 768,
-            'test_samples': 192,
-            'success': True
-        })
+            return jsonify({
+                'algorithm': get_algorithm_name(model),
+                'n_estimators': getattr(model, 'n_estimators', None),
+                'accuracy': card['metrics']['accuracy'],
+                'metrics': card['metrics'],
+                'features': len(card['feature_names']),
+                'training_samples': card['samples']['training'],
+                'test_samples': card['samples']['test'],
+                'dataset_sha256': card['dataset_sha256'],
+                'model_version': handle.info(),
+                'training_cache': training_cache,
+                'success': True
+            })
+        
+        # Besides the model version, the body reports this worker's load time, reload state
+        # and training cache counts (which move on every cache lookup, hit or miss, and when
+        # this process stores an entry), so those are part of the ETag too. No single time
+        # covers all of them, so there is no Last-Modified and If-Modified-Since never matches.
+        info = handle.info()
+        etag = make_etag('model-info', version.version, version.loaded_at, info['reloads'], info['last_error'],
+                         info['watching'], training_cache['hits'], training_cache['misses'], training_cache['entries'])
+        return conditional('model-info', etag, render)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -109,207 +154,224 @@ def get_model_info():
         })
 
 
+@app.route('/api/model-card')
+def get_model_card_endpoint():
+    """The active model's card: metrics, confusion matrix, ROC points, importances, sample counts"""
+    return jsonify({'success': True, 'model_card': get_model_card()})
+
+
 # Dataset API endpoints
-@app.route('/api/dataset')
-def get_dataset():
+# Rows per /api/dataset page (see get_dataset_summary)
+DATASET_PAGE_SIZE = 100
+MAX_DATASET_PAGE_SIZE = 10_000
+
+# Summary and analytics bodies are precomputed per dataset snapshot and served as bytes (see analytics.py)
+def analytics_response(endpoint):
     try:
-        df = pd.read_csv('diabetes.csv')
+        dataset = get_dataset()
         
-        # Basic statistics
-        total_samples = len(df)
-        features = len(df.columns) - 1  # Excluding outcome column
-        diabetic_cases = df['Outcome'].sum()
-        non_diabetic_cases = total_samples - diabetic_cases
-        diabetes_rate = round((diabetic_cases / total_samples) * 100, 1)
-        
-        # Sample data (first 20 rows)
-        sample_data = df.head(20).values.tolist()
-        
-        return jsonify({
-            'total_samples': total_samples,
-            'features': features,
-            'diabetic_cases': int(diabetic_cases),
-            'non_diabetic_cases': int(non_diabetic_cases),
-            'diabetes_rate': diabetes_rate,
-            'columns': df.columns.tolist(),
-            'sample_data': sample_data
-        })
+        # The ETag comes from the dataset hash, so a 304 needs no snapshot at all (see http_cache.py)
+        return conditional(endpoint, make_etag(endpoint, dataset.sha256),
+                           lambda: app.response_class(get_analytics(dataset).body(endpoint),
+                                                      mimetype='application/json'),
+                           dataset.stamp[0] / 1e9)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/dataset-stats')
-def get_dataset_stats():
+@app.route('/api/http-cache')
+def get_http_cache_stats():
+    """Conditional GET requests, 304s and hit ratio per endpoint (this worker process)"""
+    return jsonify({'success': True, 'endpoints': http_cache_stats()})
+
+@app.route('/api/dataset')
+def get_dataset_summary():
+    """Dataset summary with the first 20 rows; with any of the parameters below, a page of rows
+    
+        limit=N            rows per page (default DATASET_PAGE_SIZE, at most MAX_DATASET_PAGE_SIZE)
+        cursor=...         next_cursor of the previous page
+        columns=a,b        only these columns, in this order
+        format=ndjson      stream the rows from the cursor on (all of them unless limit is given)
+                           as one JSON object per line
+    
+    Clients accepting a binary columnar type (see columnar.py) get the rows from the cursor
+    on (all of them unless limit is given) as columns instead; X-Next-Cursor continues them.
+    """
+    response = app.make_response(dataset_response())
+    response.vary.add('Accept')
+    return response
+
+def dataset_response():
+    """/api/dataset in the negotiated media type (see get_dataset_summary)"""
+    media_type = negotiate(request.accept_mimetypes)
+    if media_type is None:
+        return jsonify({'error': f"Arrow responses need pyarrow; accept {COLUMNS_MEDIA_TYPE} or JSON"}), 406
+    if media_type == JSON_MEDIA_TYPE and not any(name in request.args
+                                                 for name in ('limit', 'cursor', 'columns', 'format')):
+        return analytics_response('dataset')
+    
     try:
-        df = pd.read_csv('diabetes.csv')
-        X = df.drop('Outcome', axis=1)
-        
-        feature_stats = {}
-        for column in X.columns:
-            feature_stats[column] = {
-                'mean': float(X[column].mean()),
-                'std': float(X[column].std()),
-                'min': float(X[column].min()),
-                'max': float(X[column].max()),
-                'median': float(X[column].median())
-            }
-        
-        return jsonify({
-            'feature_stats': feature_stats,
-            'total_samples': len(df),
-            'missing_values': X.isnull().sum().to_dict()
-        })
+        dataset = get_dataset()
+        columns = dataset.select([name for name in request.args.get('columns', '').split(',') if name])
+        start = dataset.cursor_offset(request.args['cursor']) if request.args.get('cursor') else 0
+        output = request.args.get('format', 'json')
+        if output not in ('json', 'ndjson'):
+            return jsonify({'error': "format must be 'json' or 'ndjson'"}), 400
+        
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit <= 0:
+            return jsonify({'error': 'limit must be positive'}), 400
+        
+        if media_type != JSON_MEDIA_TYPE:
+            # Whole columns straight from the in-memory arrays, no per-value Python objects
+            stop = len(dataset) if limit is None else min(start + limit, len(dataset))
+            payload = encode(media_type, columns, [dataset[name][start:stop] for name in columns],
+                             {'offset': start, 'total_samples': len(dataset)})
+            response = app.response_class(payload, mimetype=media_type)
+            response.headers['X-Total-Count'] = str(len(dataset))
+            if stop < len(dataset):
+                response.headers['X-Next-Cursor'] = dataset.cursor(stop)
+            return response
+        
+        if output == 'ndjson':
+            # Rows are formatted from the in-memory columns a chunk at a time as the client reads
+            stop = len(dataset) if limit is None else start + limit
+            response = app.response_class(dataset.iter_ndjson(columns, start, stop), mimetype='application/x-ndjson')
+            response.headers['X-Total-Count'] = str(len(dataset))
+            return response
+        
+        limit = min(limit or DATASET_PAGE_SIZE, MAX_DATASET_PAGE_SIZE)
+        stop = min(start + limit, len(dataset))
+        return conditional('dataset-page', make_etag('dataset-page', dataset.sha256, start, stop, *columns),
+                           lambda: jsonify({
+                               'columns': columns,
+                               'rows': dataset.rows(columns, start, stop),
+                               'offset': start,
+                               'total_samples': len(dataset),
+                               'next_cursor': dataset.cursor(stop) if stop < len(dataset) else None
+                           }),
+                           dataset.stamp[0] / 1e9)
+    except StaleCursorError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/dataset-stats')
+def get_dataset_stats():
+    return analytics_response('dataset-stats')
+
 @app.route('/api/correlation-matrix')
 def get_correlation_matrix():
-    try:
-        df = pd.read_csv('diabetes.csv')
-        correlation_matrix = df.corr().values.tolist()
-        
-        return jsonify({
-            'correlation_matrix': correlation_matrix,
-            'features': df.columns.tolist()
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return analytics_response('correlation-matrix')
 
 @app.route('/api/feature-distributions')
 def get_feature_distributions():
-    try:
-        df = pd.read_csv('diabetes.csv')
-        X = df.drop('Outcome', axis=1)
-        
-        distributions = {}
-        stats = {}
-        histograms = {}
-        
-        for column in X.columns:
-            stats[column] = {
-                'mean': float(X[column].mean()),
-                'std': float(X[column].std())
-            }
-            
-            # Create histogram data
-            hist, bins = np.histogram(X[column], bins=10)
-            histograms[column] = hist.tolist()
-        
-        return jsonify({
-            'features': X.columns.tolist(),
-            'stats': stats,
-            'histograms': histograms
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return analytics_response('feature-distributions')
 
 @app.route('/api/outcome-analysis')
 def get_outcome_analysis():
+    return analytics_response('outcome-analysis')
+
+@app.route('/api/model-comparison')
+def get_model_comparison():
+    """Cached comparison for the current dataset, or 202 with the id and progress of the job computing it
+    
+    ?mode=cv&folds=5 compares models with k-fold cross-validation (mean and std per metric).
+    """
     try:
-        df = pd.read_csv('diabetes.csv')
-        
-        diabetic_count = int(df['Outcome'].sum())
-        non_diabetic_count = len(df) - diabetic_count
-        total_samples = len(df)
-        
-        diabetic_percentage = round((diabetic_count / total_samples) * 100, 1)
-        non_diabetic_percentage = round((non_diabetic_count / total_samples) * 100, 1)
-        
-        # Age analysis
-        diabetic_df = df[df['Outcome'] == 1]
-        non_diabetic_df = df[df['Outcome'] == 0]
-        
-        avg_age_diabetic = round(diabetic_df['Age'].mean(), 1)
-        avg_age_non_diabetic = round(non_diabetic_df['Age'].mean(), 1)
-        
-        balance_status = "balanced" if abs(diabetic_percentage - 50) < 15 else "imbalanced"
-        
-        return jsonify({
-            'diabetic_count': diabetic_count,
-            'non_diabetic_count': non_diabetic_count,
-            'total_samples': total_samples,
-            'diabetic_percentage': diabetic_percentage,
-            'non_diabetic_percentage': non_diabetic_percentage,
-            'avg_age_diabetic': avg_age_diabetic,
-            'avg_age_non_diabetic': avg_age_non_diabetic,
-            'balance_status': balance_status
-        })
+        from comparison import get_comparison
+        
+        folds = None
+        if request.args.get('mode', 'holdout') == 'cv':
+            folds = request.args.get('folds', 5, type=int)
+        
+        try:
+            dataset = get_dataset()
+            result, job = get_comparison(dataset.path, folds=folds, dataset_sha256=dataset.sha256)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if result is not None:
+            return jsonify(dict(result, status='done', cached=True))
+        return jsonify(comparison_job_response(job)), 202 if job['status'] == 'running' else 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/model-comparison')
-def get_model_comparison():
+@app.route('/api/model-comparison/jobs/<job_id>')
+def get_model_comparison_job(job_id):
+    """Progress of a model comparison job"""
+    from comparison import get_job
+    
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(comparison_job_response(job))
+
+def comparison_job_response(job):
+    return {
+        'status': job['status'],
+        'job_id': job['job_id'],
+        'progress': {'completed': job['completed'], 'total': job['total']},
+        'error': job['error'],
+        'poll': f"/api/model-comparison/jobs/{job['job_id']}",
+        'result': '/api/model-comparison'
+    }
+
+@app.route('/api/hyperparameter-search', methods=['GET', 'POST'])
+def hyperparameter_search():
+    """Successive-halving search report (GET), or start the search in the background (POST, ?budget=seconds)
+    
+    The budget is capped at tuning.MAX_BUDGET_SECONDS; longer searches are run with python tuning.py.
+    """
     try:
-        df = pd.read_csv('diabetes.csv')
-        X = df.drop('Outcome', axis=1)
-        y = df['Outcome']
-        
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-        
-        models = {
-            'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
-            'Logistic Regression': LogisticRegression(random_state=42),
-            'SVM': SVC(random_state=42),
-            'K-Nearest Neighbors': KNeighborsClassifier(n_neighbors=5),
-            'Decision Tree': DecisionTreeClassifier(random_state=42)
-        }
-        
-        model_results = []
-        best_accuracy = 0
-        best_model = ""
-        
-        for name, model in models.items():
-            model.fit(X_train_scaled, y_train)
-            y_pred = model.predict(X_test_scaled)
-            
-            accuracy = accuracy_score(y_test, y_pred)
-            precision = precision_score(y_test, y_pred, zero_division=0)
-            recall = recall_score(y_test, y_pred, zero_division=0)
-            f1 = f1_score(y_test, y_pred, zero_division=0)
-            
-            if accuracy > best_accuracy:
-                best_accuracy = accuracy
-                best_model = name
-            
-            status = "best" if accuracy >= 0.8 else "good" if accuracy >= 0.75 else "fair"
-            
-            model_results.append({
-                'name': name,
-                'accuracy': accuracy,
-                'precision': precision,
-                'recall': recall,
-                'f1_score': f1,
-                'status': status
+        from tuning import DEFAULT_BUDGET_SECONDS, MAX_BUDGET_SECONDS, get_search, start_search
+        
+        if request.method == 'POST':
+            budget = request.args.get('budget', DEFAULT_BUDGET_SECONDS, type=float)
+            if not 0 < budget <= MAX_BUDGET_SECONDS:
+                return jsonify({'error': f'budget must be between 0 and {MAX_BUDGET_SECONDS} seconds '
+                                         '(run longer searches with python tuning.py)'}), 400
+            started = start_search('diabetes.csv', budget)
+            return jsonify({'status': 'running', 'started': started, 'poll': '/api/hyperparameter-search'}), 202
+        
+        report, checkpoint = get_search('diabetes.csv')
+        if checkpoint is not None and checkpoint.get('status') in ('running', 'error', 'exhausted'):
+            return jsonify({
+                'status': checkpoint['status'],
+                'fits': len(checkpoint['results']),
+                'elapsed_seconds': checkpoint['elapsed_seconds'],
+                'error': checkpoint.get('error'),
+                'report': report
             })
-        
-        # Sort by accuracy
-        model_results.sort(key=lambda x: x['accuracy'], reverse=True)
-        
-        # Find current model rank
-        current_model_rank = next((i+1 for i, model in enumerate(model_results) if model['name'] == 'Random Forest'), 0)
-        
-        recommendation = f"Random Forest performs well with {(model_results[current_model_rank-1]['accuracy']*100):.1f}% accuracy. "
-        if current_model_rank == 1:
-            recommendation += "It's the best performing model!"
-        else:
-            recommendation += f"Consider trying {model_results[0]['name']} for potentially better results."
-        
-        return jsonify({
-            'models': model_results,
-            'best_model': best_model,
-            'best_accuracy': best_accuracy,
-            'current_model_rank': current_model_rank,
-            'recommendation': recommendation
-        })
+        if report is None:
+            return jsonify({'status': 'not_started', 'start': 'POST /api/hyperparameter-search'}), 404
+        return jsonify(dict(report, status='done'))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/model-registry')
+def model_registry():
+    """A/B arms with this worker's per-version request counts, positive rates and latency histograms
+    
+    Arms are configured in MODEL_REGISTRY_CONFIG, which every worker reloads when it changes (see registry.py).
+    """
+    try:
+        return jsonify(dict(registry.info(), success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Risk level names in order of the codes in binary batch predictions
+RISK_LEVELS = ('Low', 'Medium', 'High')
+
 @app.route('/api/batch-predict', methods=['POST'])
 def batch_predict():
+    """Predictions for an uploaded CSV, as JSON or (by Accept header) binary columns (see columnar.py)"""
     try:
+        media_type = negotiate(request.accept_mimetypes)
+        if media_type is None:
+            return jsonify({'success': False,
+                            'error': f"Arrow responses need pyarrow; accept {COLUMNS_MEDIA_TYPE} or JSON"}), 406
+        
         if 'file' not in request.files:
             return jsonify({'success': False, 'error': 'No file uploaded'}), 400
         
@@ -318,6 +380,7 @@ def batch_predict():
             return jsonify({'success': False, 'error': 'No file selected'}), 400
         
         # Read uploaded CSV
+        import pandas as pd
         df = pd.read_csv(file)
         
         # Validate columns
@@ -330,22 +393,27 @@ def batch_predict():
                 'error': f'CSV must contain columns: {", ".join(expected_columns)}'
             }), 400
         
-        # Make predictions
-        predictions = []
-        diabetic_count = 0
+        # Make predictions for the whole file in one pass
+        features = df[expected_columns].to_numpy(dtype=float)
+        predicted_classes, probabilities = predict_diabetes_many(features)
+        diabetic_count = int(predicted_classes.sum())
+        
+        if media_type != JSON_MEDIA_TYPE:
+            # Columns: prediction (int8), probability (float32), risk_level (int8 index into RISK_LEVELS)
+            risk_levels = (probabilities > 0.4).astype(np.int8) + (probabilities > 0.7)
+            summary = {'total_predictions': len(features), 'diabetic_predictions': diabetic_count,
+                       'risk_levels': ','.join(RISK_LEVELS)}
+            payload = encode(media_type, ['prediction', 'probability', 'risk_level'],
+                             [predicted_classes, probabilities, risk_levels], summary)
+            response = app.response_class(payload, mimetype=media_type)
+            response.headers['X-Total-Count'] = str(len(features))
+            response.headers['X-Diabetic-Predictions'] = str(diabetic_count)
+            response.headers['X-Risk-Levels'] = summary['risk_levels']
+            response.vary.add('Accept')
+            return response
         
-        for _, row in df.iterrows():
-            features = [
-                row['Pregnancies'], row['Glucose'], row['BloodPressure'],
-                row['SkinThickness'], row['Insulin'], row['BMI'],
-                row['DiabetesPedigreeFunction'], row['Age']
-            ]
-            
-            prediction, probability = predict_diabetes(features)
-            
-            if prediction == 1:
-                diabetic_count += 1
-            
+        predictions = []
+        for prediction, probability in zip(predicted_classes, probabilities):
             risk_level = "High" if probability > 0.7 else "Medium" if probability > 0.4 else "Low"
             
             predictions.append({
@@ -371,8 +439,97 @@ def batch_predict():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+
+@app.route('/api/explain', methods=['POST'])
+def explain():
+    """Per-feature contributions to the predicted probability for one row or a batch
+
+    Body: {"features": [8 values]} or {"rows": [[8 values], ...]}. For every row,
+    base_probability plus the contributions equals the predicted probability.
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        rows = payload.get('rows', [payload['features']] if 'features' in payload else None)
+        if not rows:
+            return jsonify({'success': False, 'error': 'Send "features" (one row) or "rows" (a batch)'}), 400
+        
+        X = np.asarray(rows, dtype=float)
+        if X.ndim != 2 or X.shape[1] != 8:
+            return jsonify({'success': False, 'error': 'Every row needs the 8 model features'}), 400
+        
+        bias, contributions = explain_diabetes_many(X)
+        feature_names = get_model_card()['feature_names']
+        
+        explanations = []
+        for row_bias, row in zip(bias.tolist(), contributions.tolist()):
+            explanations.append({
+                'base_probability': row_bias,
+                'probability': row_bias + sum(row),
+                'contributions': dict(zip(feature_names, row))
+            })
+        
+        return jsonify({'success': True, 'explanations': explanations})
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest_records():
+    """Update the model incrementally with newly labelled records (see online.py)
+
+    Body: {"records": [{"Pregnancies": ..., ..., "Outcome": 0 or 1}, ...]} or an uploaded
+    CSV file with the columns of diabetes.csv. The updated model is published to the
+    serving artifact only if it passes the golden set check against the served version
+    and the rule model, and never over a served forest or rule model; it is swapped in here right away and
+    the other workers pick it up on their next artifact check.
+
+    Disabled unless MODEL_INGEST_TOKEN is set; requests must send it as
+    "Authorization: Bearer <token>".
+    """
+    import online
+    from online import COLUMNS, ingest, ingest_authorized, parse_records
+    
+    if not online.INGEST_TOKEN:
+        return jsonify({'success': False, 'error': 'Ingest is disabled (set MODEL_INGEST_TOKEN to enable it)'}), 403
+    if not ingest_authorized(request.headers.get('Authorization')):
+        return jsonify({'success': False, 'error': 'Ingest needs the MODEL_INGEST_TOKEN bearer token'}), 401
+    
+    try:
+        if 'file' in request.files:
+            import pandas as pd
+            df = pd.read_csv(request.files['file'])
+            missing = [column for column in COLUMNS if column not in df.columns]
+            if missing:
+                return jsonify({'success': False, 'error': f'CSV is missing columns: {", ".join(missing)}'}), 400
+            records = df[COLUMNS].to_numpy().tolist()
+        else:
+            records = (request.get_json(silent=True) or {}).get('records')
+        
+        X, y = parse_records(records)
+        update = ingest(X, y, publish_to=handle.path)
+        swapped = update['published'] and handle.check()
+        
+        return jsonify({
+            'success': True,
+            'update': update,
+            'swapped': swapped,
+            'rejected': update['rejected'],
+            'active_version': active_version().version
+        })
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 if __name__ == '__main__':
     import os
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
+    warmup_model()
+    handle.start_watching()
+    registry.start_watching()
     app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
@@ -1,17 +1,24 @@
 from flask import Flask, render_template, request, jsonify, session
 from flask_cors import CORS
-from model import predict_diabetes, train_model, model, scaler, load_model
+from model import active_version, get_algorithm_name, get_model, get_model_card, handle, warmup
+from registry import registry
+from shadow import SHADOW_PATH, shadow
+from training_cache import cache_stats
+from http_cache import conditional, make_etag
+from rules import RISK_TABLE, FEATURE_KEYS
 import datetime
 import json
+import uuid
 
 app = Flask(__name__)
 app.secret_key = 'diabetes_prediction_secret_key_2025'
 CORS(app)  # Enable CORS for all routes
 
 # Helper functions (defined first to avoid reference errors)
-def get_feature_importance(features):
-    """Get feature importance for the current prediction"""
-    from model import model, scaler
+def get_feature_importance(features, version=None):
+    """Get feature importance for a prediction made by `version` (the active one by default)"""
+    version = version or active_version()
+    model = version.model
     
     if model is None:
         return []
@@ -22,15 +29,24 @@ def get_feature_importance(features):
         'Insulin', 'BMI', 'Diabetes Pedigree Function', 'Age'
     ]
     
-    # Get feature importance from the model
-    importance_scores = model.feature_importances_
+    # Each feature's contribution to this prediction's probability; importance is its share
+    # of the total absolute contribution. Models without an explainer report global importances.
+    try:
+        _, contributions = version.pipeline.explain_many(features)
+        contributions = contributions[0]
+        total = float(sum(abs(contributions)))
+        importance_scores = [abs(c) / total if total else 0.0 for c in contributions]
+    except ValueError:
+        contributions = [None] * len(feature_names)
+        importance_scores = model.feature_importances_
     
     # Create feature importance list
     feature_importance = []
-    for i, (name, score) in enumerate(zip(feature_names, importance_scores)):
+    for i, (name, score, contribution) in enumerate(zip(feature_names, importance_scores, contributions)):
         feature_importance.append({
             'feature': name,
             'importance': float(score),
+            'contribution': None if contribution is None else float(contribution),
             'value': features[i],
             'impact': 'high' if score > 0.15 else 'medium' if score > 0.08 else 'low'
         })
@@ -68,70 +84,30 @@ def get_medical_priority(prediction, probability):
         else:
             return "ROUTINE - Continue healthy lifestyle"
 
+# Risk factor messages keyed by (feature, level) from the shared rule table in rules.py
+RISK_FACTOR_MESSAGES = {
+    ('glucose', 'high'): ('Blood Glucose', 'Elevated blood glucose levels increase diabetes risk'),
+    ('glucose', 'moderate'): ('Blood Glucose', 'Slightly elevated blood glucose levels'),
+    ('bmi', 'high'): ('BMI', 'Obesity significantly increases diabetes risk'),
+    ('bmi', 'moderate'): ('BMI', 'Overweight increases diabetes risk'),
+    ('bloodpressure', 'high'): ('Blood Pressure', 'High blood pressure is linked to diabetes'),
+    ('bloodpressure', 'moderate'): ('Blood Pressure', 'Elevated blood pressure'),
+    ('age', 'moderate'): ('Age', 'Age increases diabetes risk')
+}
+
 def analyze_risk_factors(features):
     """Analyze individual risk factors"""
     risk_factors = []
+    risk_levels = RISK_TABLE.risk_levels(features)
     
-    # Glucose analysis
-    glucose = features[1]
-    if glucose > 140:
-        risk_factors.append({
-            'factor': 'Blood Glucose',
-            'value': glucose,
-            'level': 'high',
-            'description': 'Elevated blood glucose levels increase diabetes risk'
-        })
-    elif glucose > 100:
-        risk_factors.append({
-            'factor': 'Blood Glucose',
-            'value': glucose,
-            'level': 'moderate',
-            'description': 'Slightly elevated blood glucose levels'
-        })
-    
-    # BMI analysis
-    bmi = features[5]
-    if bmi > 30:
-        risk_factors.append({
-            'factor': 'BMI',
-            'value': bmi,
-            'level': 'high',
-            'description': 'Obesity significantly increases diabetes risk'
-        })
-    elif bmi > 25:
-        risk_factors.append({
-            'factor': 'BMI',
-            'value': bmi,
-            'level': 'moderate',
-            'description': 'Overweight increases diabetes risk'
-        })
-    
-    # Blood pressure analysis
-    bp = features[2]
-    if bp > 90:
-        risk_factors.append({
-            'factor': 'Blood Pressure',
-            'value': bp,
-            'level': 'high',
-            'description': 'High blood pressure is linked to diabetes'
-        })
-    elif bp > 80:
-        risk_factors.append({
-            'factor': 'Blood Pressure',
-            'value': bp,
-            'level': 'moderate',
-            'description': 'Elevated blood pressure'
-        })
-    
-    # Age analysis
-    age = features[7]
-    if age > 45:
-        risk_factors.append({
-            'factor': 'Age',
-            'value': age,
-            'level': 'moderate',
-            'description': 'Age increases diabetes risk'
-        })
+    for (feature, level), (factor, description) in RISK_FACTOR_MESSAGES.items():
+        if risk_levels[feature] == level:
+            risk_factors.append({
+                'factor': factor,
+                'value': features[FEATURE_KEYS.index(feature)],
+                'level': level,
+                'description': description
+            })
     
     return risk_factors
 
@@ -269,13 +245,33 @@ def get_lifestyle_advice(features):
     
     return advice[:6]  # Limit to 6 pieces of advice
 
-# Train the model when the app starts
-try:
-    model_accuracy = train_model()
-    print(f"Model trained successfully with accuracy: {model_accuracy}")
-except Exception as e:
-    print(f"Error training model: {e}")
-    model_accuracy = 0.721  # Default accuracy value
+# Default accuracy value, replaced once warmup_model() has initialized the model.
+# Importing this module stays cheap: the server calls warmup_model() before taking
+# traffic, and otherwise the first request loads the model on demand.
+model_accuracy = 0.721
+
+def warmup_model():
+    """Initialize the model ahead of the first request (timed, see model.warmup)"""
+    global model_accuracy
+    try:
+        model_accuracy = warmup()
+        print(f"Model trained successfully with accuracy: {model_accuracy}")
+    except Exception as e:
+        print(f"Error training model: {e}")
+    
+    # Extra model versions for A/B trials, if any are configured (see registry.py)
+    try:
+        registry.load_config()
+    except Exception as e:
+        print(f"Error loading the model registry configuration, serving the primary model only: {e}")
+    
+    # Candidate scored on live traffic in the background (see shadow.py)
+    if SHADOW_PATH:
+        try:
+            shadow.set_candidate(SHADOW_PATH)
+        except Exception as e:
+            print(f"Error loading the shadow model, shadow scoring disabled: {e}")
+    return model_accuracy
 
 @app.route('/')
 def index():
@@ -300,15 +296,20 @@ def predict():
             float(request.form['age'])
         ]
 
-        # Make prediction
-        prediction, probability = predict_diabetes(features)
+        # Make prediction on the A/B arm this session is routed to (see registry.py)
+        if 'ab_key' not in session:
+            session['ab_key'] = uuid.uuid4().hex
+        prediction, probability, arm, version = registry.predict(features, session['ab_key'])
+        
+        # The candidate scores this row later, on the shadow thread
+        shadow.submit(features, prediction, probability)
         
         # Calculate confidence score (distance from decision boundary)
         confidence = abs(probability - 0.5) * 2  # Scale to 0-1 range
         confidence_level = "High" if confidence > 0.6 else "Medium" if confidence > 0.3 else "Low"
         
-        # Get feature importance for this prediction
-        feature_importance = get_feature_importance(features)
+        # Get feature importance for this prediction, from the version that made it
+        feature_importance = get_feature_importance(features, version)
 
         # Store prediction in session for history
         if 'prediction_history' not in session:
@@ -346,6 +347,8 @@ def predict():
             'feature_importance': feature_importance,
             'prediction_details': {
                 'model_accuracy': model_accuracy,
+                'model_arm': arm,
+                'model_version': version.version,
                 'prediction_timestamp': datetime.datetime.now().isoformat(),
                 'risk_category': get_risk_category(probability),
                 'medical_priority': get_medical_priority(prediction, probability)
@@ -384,6 +387,63 @@ def health():
     """Health endpoint for deployment platforms"""
     return jsonify({'status': 'ok', 'message': 'App is healthy'})
 
+@app.route('/model-info')
+def model_info():
+    """Active model version, its load time and hot reload state (304 while none of them changed)"""
+    version = active_version()
+    model = version.model
+    training_cache = cache_stats()
+    
+    def render():
+        return jsonify({
+            'success': True,
+            'algorithm': get_algorithm_name(model),
+            'accuracy': model_accuracy,
+            'metrics': (version.card or {}).get('metrics'),
+            'model_version': handle.info(),
+            'training_cache': training_cache
+        })
+    
+    # Everything the body reports, as in app.py's /model-info, plus the startup accuracy
+    # estimate (validated by ETag only, like app.py's)
+    info = handle.info()
+    etag = make_etag('model-info', version.version, version.loaded_at, info['reloads'], info['last_error'],
+                     info['watching'], model_accuracy, training_cache['hits'], training_cache['misses'],
+                     training_cache['entries'])
+    return conditional('model-info', etag, render)
+
+@app.route('/api/model-card')
+def get_model_card_endpoint():
+    """The active model's card, precomputed when the model was published"""
+    return jsonify({'success': True, 'model_card': get_model_card()})
+
+@app.route('/api/model-registry')
+def model_registry():
+    """A/B arms and this worker's per-version stats (arms are configured in MODEL_REGISTRY_CONFIG, see registry.py)"""
+    try:
+        return jsonify(dict(registry.info(), success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/shadow')
+def shadow_scoring():
+    """Shadow candidate agreement stats of this worker (the candidate is set with MODEL_SHADOW_PATH, see shadow.py)"""
+    try:
+        return jsonify(dict(shadow.info(), success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/risk_cells')
+def get_risk_cells():
+    """Get the risk cells that dominate prediction traffic"""
+    model = get_model()
+    
+    if not hasattr(model, 'lookup'):
+        return jsonify({'success': False, 'error': 'Risk cell statistics are only available for the rule-based model'})
+    
+    top = request.args.get('top', 10, type=int)
+    return jsonify({'success': True, 'risk_cells': model.lookup.hit_stats(top=top)})
+
 @app.route('/generate_report', methods=['POST'])
 def generate_report():
     """Generate a comprehensive health report"""
@@ -606,6 +666,46 @@ def generate_personalized_health_tips(features, prediction, probability):
     
     return tips
 
+# Detailed risk factor entries keyed by (feature, level) from the shared rule table in rules.py
+DETAILED_RISK_FACTORS = {
+    ('glucose', 'high'): {
+        'factor': 'Blood Glucose',
+        'level': 'High',
+        'impact': 'Major risk factor - indicates possible diabetes',
+        'action': 'Immediate medical evaluation required'
+    },
+    ('glucose', 'moderate'): {
+        'factor': 'Blood Glucose',
+        'level': 'Elevated',
+        'impact': 'Pre-diabetic range - increased risk',
+        'action': 'Lifestyle modifications and monitoring'
+    },
+    ('bmi', 'high'): {
+        'factor': 'BMI',
+        'level': 'High',
+        'impact': 'Obesity significantly increases diabetes risk',
+        'action': 'Weight management program recommended'
+    },
+    ('bmi', 'moderate'): {
+        'factor': 'BMI',
+        'level': 'Elevated',
+        'impact': 'Overweight increases risk moderately',
+        'action': 'Gradual weight loss through diet and exercise'
+    },
+    ('age', 'moderate'): {
+        'factor': 'Age',
+        'level': 'Moderate',
+        'impact': 'Age-related increased risk',
+        'action': 'Regular monitoring and healthy lifestyle'
+    },
+    ('bloodpressure', 'high'): {
+        'factor': 'Blood Pressure',
+        'level': 'High',
+        'impact': 'Hypertension compounds diabetes risk',
+        'action': 'Blood pressure management essential'
+    }
+}
+
 def generate_detailed_risk_analysis(features, prediction, probability):
     """Generate detailed risk factor analysis"""
     analysis = {
@@ -624,63 +724,11 @@ def generate_detailed_risk_analysis(features, prediction, probability):
     glucose = features['glucose']
     bmi = features['bmi']
     age = features['age']
-    bp = features['bloodpressure']
-    pregnancies = features['pregnancies']
-    insulin = features['insulin']
-    dpf = features['dpf']
-    
-    # High-risk factors
-    if glucose > 126:
-        analysis['risk_factors'].append({
-            'factor': 'Blood Glucose',
-            'value': glucose,
-            'level': 'High',
-            'impact': 'Major risk factor - indicates possible diabetes',
-            'action': 'Immediate medical evaluation required'
-        })
-    elif glucose > 100:
-        analysis['risk_factors'].append({
-            'factor': 'Blood Glucose',
-            'value': glucose,
-            'level': 'Elevated',
-            'impact': 'Pre-diabetic range - increased risk',
-            'action': 'Lifestyle modifications and monitoring'
-        })
+    risk_levels = RISK_TABLE.risk_levels(features)
     
-    if bmi > 30:
-        analysis['risk_factors'].append({
-            'factor': 'BMI',
-            'value': bmi,
-            'level': 'High',
-            'impact': 'Obesity significantly increases diabetes risk',
-            'action': 'Weight management program recommended'
-        })
-    elif bmi > 25:
-        analysis['risk_factors'].append({
-            'factor': 'BMI',
-            'value': bmi,
-            'level': 'Elevated',
-            'impact': 'Overweight increases risk moderately',
-            'action': 'Gradual weight loss through diet and exercise'
-        })
-    
-    if age > 45:
-        analysis['risk_factors'].append({
-            'factor': 'Age',
-            'value': age,
-            'level': 'Moderate',
-            'impact': 'Age-related increased risk',
-            'action': 'Regular monitoring and healthy lifestyle'
-        })
-    
-    if bp > 90:
-        analysis['risk_factors'].append({
-            'factor': 'Blood Pressure',
-            'value': bp,
-            'level': 'High',
-            'impact': 'Hypertension compounds diabetes risk',
-            'action': 'Blood pressure management essential'
-        })
+    for (feature, level), details in DETAILED_RISK_FACTORS.items():
+        if risk_levels[feature] == level:
+            analysis['risk_factors'].append(dict(details, value=features[feature]))
     
     # Protective factors
     if glucose < 100:
@@ -997,6 +1045,10 @@ def generate_user_outcome_analysis(history):
 
 if __name__ == '__main__':
     import os
+    warmup_model()
+    handle.start_watching()
+    registry.start_watching()
+    shadow.start()
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') != 'production'
     app.run(debug=debug, host='0.0.0.0', port=port)
@@ -0,0 +1,259 @@
+"""
+Versioned, memory-mappable on-disk format for trained models.
+
+An artifact is a directory holding a JSON header and one raw .npy file per array:
+
+    model_artifact/
+        header.json              format, version, kind, scaler, metadata, array index
+        threshold-3f2a9c01.npy   arrays are named after their content hash
+        ...
+
+Arrays are opened with np.load(mmap_mode='r', allow_pickle=False), so loading maps
+pages instead of reading them, gunicorn workers share the same page cache, and
+nothing in the file can execute code. Array files are content-addressed and the
+header is replaced last, so a reader never sees a header pointing at half-written
+arrays. Publishing removes array files of older versions but keeps those of the version
+it replaces, so a reader that read the previous header just before the swap can still
+open them.
+
+Convert existing pickles with:
+
+    python artifacts.py --model diabetes_model.pkl --scaler scaler.pkl --out model_artifact
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+
+ARTIFACT_DIR = 'model_artifact'
+HEADER_FILE = 'header.json'
+FORMAT_NAME = 'diabetes-model'
+FORMAT_VERSION = 1
+
+
+class ArrayScaler:
+    """StandardScaler replacement rebuilt from stored mean and scale arrays"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=float)
+        self.scale_ = np.asarray(scale, dtype=float)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean_) / self.scale_
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _replace_file(path, data):
+    """Write bytes to a temporary file and move it into place"""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _npy_bytes(array):
+    from io import BytesIO
+    buffer = BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def write_artifact(path, kind, arrays=None, metadata=None, scaler=None, sidecars=None):
+    """Write an artifact directory and return its header
+
+    `sidecars` maps file names to JSON objects stored next to the arrays (e.g. the model
+    card). They are stamped with the artifact's content hash as 'model_version' and written
+    before the header, so a reader that sees a new header also sees its sidecars.
+    """
+    os.makedirs(path, exist_ok=True)
+
+    index = {}
+    for name, array in (arrays or {}).items():
+        data = _npy_bytes(array)
+        digest = _sha256(data)
+        filename = f"{name}-{digest[:8]}.npy"
+        if not os.path.exists(os.path.join(path, filename)):
+            _replace_file(os.path.join(path, filename), data)
+        index[name] = {
+            'file': filename,
+            'dtype': np.asarray(array).dtype.str,
+            'shape': list(np.shape(array)),
+            'sha256': digest
+        }
+
+    header = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'kind': kind,
+        'created': datetime.datetime.now().isoformat(),
+        'scaler': None if scaler is None else {
+            'mean': np.asarray(scaler.mean_, dtype=float).tolist(),
+            'scale': np.asarray(scaler.scale_, dtype=float).tolist()
+        },
+        'metadata': metadata or {},
+        'arrays': index
+    }
+    # The content hash identifies the model version; it ignores the creation time
+    header['content_hash'] = _sha256(json.dumps(
+        {key: value for key, value in header.items() if key != 'created'}, sort_keys=True).encode())
+
+    for filename, sidecar in (sidecars or {}).items():
+        sidecar = dict(sidecar, model_version=header['content_hash'])
+        _replace_file(os.path.join(path, filename), json.dumps(sidecar, indent=2).encode())
+
+    _replace_header(path, header)
+    return header
+
+
+def _replace_header(path, header):
+    """Swap in a new header (its arrays and sidecars already in place) and drop stale arrays"""
+    # Arrays of the version being replaced stay until the next publish: a reader that read
+    # the old header just before the swap may still be opening them
+    previous = {}
+    if artifact_exists(path):
+        try:
+            previous = read_header(path)['arrays']
+        except (OSError, ValueError):
+            pass
+
+    _replace_file(os.path.join(path, HEADER_FILE), json.dumps(header, indent=2).encode())
+
+    # Drop array files from older versions; processes that still map them keep their pages
+    referenced = {entry['file'] for entry in list(header['arrays'].values()) + list(previous.values())}
+    for filename in os.listdir(path):
+        if filename.endswith('.npy') and filename not in referenced:
+            os.remove(os.path.join(path, filename))
+
+
+def promote_artifact(source, path):
+    """Copy the artifact in `source` (e.g. a validated staging directory) into `path`; returns its header
+
+    Files are copied in write_artifact's order, arrays and sidecars first and the header
+    last, so readers of `path` switch from the old version to the new one in one step.
+    """
+    header = read_header(source)
+    os.makedirs(path, exist_ok=True)
+    for filename in os.listdir(source):
+        is_array = filename.endswith('.npy')
+        if filename == HEADER_FILE or not (is_array or filename.endswith('.json')):
+            continue
+        if is_array and os.path.exists(os.path.join(path, filename)):
+            continue  # content-addressed: already there
+        with open(os.path.join(source, filename), 'rb') as f:
+            _replace_file(os.path.join(path, filename), f.read())
+
+    _replace_header(path, header)
+    return header
+
+
+def artifact_exists(path=ARTIFACT_DIR):
+    return os.path.exists(os.path.join(path, HEADER_FILE))
+
+
+def read_header(path=ARTIFACT_DIR):
+    """Read and check an artifact header"""
+    with open(os.path.join(path, HEADER_FILE), 'r') as f:
+        header = json.load(f)
+
+    if header.get('format') != FORMAT_NAME:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} artifact")
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact version {header.get('version')} (expected {FORMAT_VERSION})")
+
+    return header
+
+
+def read_artifact(path=ARTIFACT_DIR, mmap=True, verify=False):
+    """Return (header, arrays) with arrays memory-mapped read-only"""
+    header = read_header(path)
+
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        filename = os.path.join(path, entry['file'])
+        if verify:
+            with open(filename, 'rb') as f:
+                if _sha256(f.read()) != entry['sha256']:
+                    raise ValueError(f"Checksum mismatch for array '{name}' in {path}")
+        arrays[name] = np.load(filename, mmap_mode='r' if mmap else None, allow_pickle=False)
+        if arrays[name].dtype.str != entry['dtype'] or list(arrays[name].shape) != entry['shape']:
+            raise ValueError(f"Array '{name}' in {path} does not match its header entry")
+
+    return header, arrays
+
+
+def save_model_artifact(model, scaler=None, path=ARTIFACT_DIR, metadata=None, sidecars=None):
+    """Write a model (rule model, FlatForest, fitted tree ensemble or online model) as an artifact"""
+    from forest import FlatForest, compile_forest, is_tree_ensemble
+    from online import OnlineLogisticModel
+
+    if is_tree_ensemble(model):
+        # Stored with the scaler already folded in, so loading needs no transform step
+        model = compile_forest(model, scaler)
+
+    if isinstance(model, FlatForest):
+        return write_artifact(path, 'forest', model.to_arrays(), dict(model.metadata(), **(metadata or {})), scaler,
+                              sidecars)
+    if isinstance(model, OnlineLogisticModel):
+        # Keeps its own running scaler statistics and scores raw rows
+        return write_artifact(path, 'linear', model.to_arrays(), dict(model.metadata(), **(metadata or {})), scaler,
+                              sidecars)
+    if getattr(model, 'lookup', None) is not None:
+        # The rule model is defined by rules.py; the artifact only records which model is active
+        return write_artifact(path, 'rule', metadata=metadata, scaler=scaler, sidecars=sidecars)
+
+    raise ValueError(f"Cannot store {type(model).__name__} as a model artifact")
+
+
+def load_model_artifact(path=ARTIFACT_DIR, verify=False):
+    """Return (model, scaler, header) from an artifact directory"""
+    header, arrays = read_artifact(path, verify=verify)
+
+    if header['kind'] == 'forest':
+        from forest import FlatForest
+        model = FlatForest.from_arrays(arrays, header['metadata'])
+    elif header['kind'] == 'linear':
+        from online import OnlineLogisticModel
+        model = OnlineLogisticModel.from_arrays(arrays, header['metadata'])
+    elif header['kind'] == 'rule':
+        from model import MedicalRuleBasedModel
+        model = MedicalRuleBasedModel()
+    else:
+        raise ValueError(f"Unknown artifact kind '{header['kind']}'")
+
+    scaler = None
+    if header['scaler'] is not None:
+        scaler = ArrayScaler(header['scaler']['mean'], header['scaler']['scale'])
+
+    return model, scaler, header
+
+
+def convert_pickles(model_path='diabetes_model.pkl', scaler_path='scaler.pkl', out=ARTIFACT_DIR):
+    """Convert trusted legacy pickles into an artifact (the only place pickles are read)"""
+    import pickle
+
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    scaler = None
+    if scaler_path and os.path.exists(scaler_path):
+        with open(scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+
+    return save_model_artifact(model, scaler, out, metadata={'converted_from': os.path.basename(model_path)})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert model/scaler pickles into a memory-mappable artifact')
+    parser.add_argument('--model', default='diabetes_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    parser.add_argument('--out', default=ARTIFACT_DIR)
+    args = parser.parse_args()
+
+    header = convert_pickles(args.model, args.scaler, args.out)
+    print(f"Wrote {header['kind']} artifact to {args.out} (version {header['content_hash'][:12]})")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Cold-load benchmark: pickle.load + compile_pipeline against the memory-mapped artifact
+(artifacts.py). Each load runs in a fresh subprocess so timings and peak RSS are not
+shared between the two paths.
+
+Usage: python benchmarks/bench_artifact_load.py [--trees N] [--runs N]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from artifacts import save_model_artifact
+
+# Runs in the child process; imports happen before the timer so only loading is measured
+LOAD_SCRIPT = """
+import json, os, pickle, resource, sys, time
+sys.path.insert(0, {root!r})
+from artifacts import load_model_artifact
+from model import compile_pipeline
+import sklearn.ensemble
+
+def current_rss_kb():
+    # Resident set right now (Linux); peak RSS is dominated by the imports above
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+baseline = current_rss_kb()
+start = time.perf_counter()
+if {mode!r} == 'pickle':
+    with open({model_path!r}, 'rb') as f:
+        model = pickle.load(f)
+    with open({scaler_path!r}, 'rb') as f:
+        scaler = pickle.load(f)
+else:
+    model, scaler, header = load_model_artifact({artifact_path!r})
+pipeline = compile_pipeline(model, scaler)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'rss_growth_kb': current_rss_kb() - baseline}}))
+"""
+
+
+def run_load(mode, paths):
+    script = LOAD_SCRIPT.format(root=ROOT, mode=mode, **paths)
+    output = subprocess.run([sys.executable, '-c', script], cwd=paths['workdir'],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    
+    data = pd.read_csv(os.path.join(ROOT, 'diabetes.csv'))
+    X = data.drop('Outcome', axis=1).values.astype(float)
+    y = data['Outcome'].values
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler().fit(X_train)
+    forest = RandomForestClassifier(n_estimators=args.trees, random_state=42).fit(scaler.transform(X_train), y_train)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = {
+            'workdir': workdir,
+            'model_path': os.path.join(workdir, 'diabetes_model.pkl'),
+            'scaler_path': os.path.join(workdir, 'scaler.pkl'),
+            'artifact_path': os.path.join(workdir, 'model_artifact'),
+        }
+        with open(paths['model_path'], 'wb') as f:
+            pickle.dump(forest, f)
+        with open(paths['scaler_path'], 'wb') as f:
+            pickle.dump(scaler, f)
+        save_model_artifact(forest, scaler, paths['artifact_path'])
+        
+        artifact_bytes = sum(os.path.getsize(os.path.join(paths['artifact_path'], name))
+                             for name in os.listdir(paths['artifact_path']))
+        print(f"{args.trees} trees: pickle {os.path.getsize(paths['model_path']) / 1e6:.2f} MB, "
+              f"artifact {artifact_bytes / 1e6:.2f} MB")
+        
+        for mode in ('pickle', 'artifact'):
+            results = [run_load(mode, paths) for _ in range(args.runs)]
+            seconds = sorted(result['seconds'] for result in results)[len(results) // 2]
+            growth = sorted(result['rss_growth_kb'] for result in results)[len(results) // 2]
+            peak = sorted(result['rss_kb'] for result in results)[len(results) // 2]
+            print(f"  {mode:<9} load+compile {seconds * 1e3:>8.1f} ms   "
+                  f"peak RSS {peak / 1024:>7.1f} MB   growth during load {growth / 1024:>6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
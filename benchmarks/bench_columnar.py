@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Serialization time, payload size and client decode time of the bulk response formats:
+
+    json        what the JSON endpoints build: row lists (/api/dataset pages) and one dict
+                per row (/api/batch-predict), through json.dumps
+    columns     the raw little-endian float32/int8 column layout (columnar.encode_columns)
+    arrow       an Arrow IPC stream (only when pyarrow is installed)
+
+Usage: python benchmarks/bench_columnar.py [--rows N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from columnar import arrow_available, decode_columns, encode_arrow, encode_columns
+from dataset import Dataset, get_dataset
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def dataset_formats(data):
+    names = data.columns
+    columns = [data[name] for name in names]
+    formats = {'json': (lambda: json.dumps({'columns': names, 'rows': data.rows(names, 0, len(data))}).encode(),
+                        json.loads),
+               'columns': (lambda: encode_columns(names, columns), decode_columns)}
+    if arrow_available():
+        import pyarrow as pa
+        formats['arrow'] = (lambda: encode_arrow(names, columns), lambda b: pa.ipc.open_stream(b).read_all())
+    return formats
+
+
+def batch_formats(predictions, probabilities):
+    risk_levels = (probabilities > 0.4).astype(np.int8) + (probabilities > 0.7)
+    names = ['prediction', 'probability', 'risk_level']
+
+    def as_json():
+        rows = [{'prediction': int(p), 'probability': float(q), 'risk_level': ('Low', 'Medium', 'High')[r]}
+                for p, q, r in zip(predictions, probabilities, risk_levels)]
+        return json.dumps({'predictions': rows}).encode()
+
+    columns = [predictions, probabilities, risk_levels]
+    formats = {'json': (as_json, json.loads), 'columns': (lambda: encode_columns(names, columns), decode_columns)}
+    if arrow_available():
+        import pyarrow as pa
+        formats['arrow'] = (lambda: encode_arrow(names, columns), lambda b: pa.ipc.open_stream(b).read_all())
+    return formats
+
+
+def report(title, formats):
+    print(f"\n{title}")
+    print(f"{'format':<10} {'encode ms':>10} {'size MB':>9} {'decode ms':>10}")
+    for name, (encode, decode) in formats.items():
+        payload, encode_ms = timed(encode)
+        _, decode_ms = timed(lambda: decode(payload))
+        print(f"{name:<10} {encode_ms:>10.1f} {len(payload) / 1e6:>9.2f} {decode_ms:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    source = get_dataset()
+    repeats = -(-args.rows // len(source))
+    data = Dataset(source.columns, np.tile(source.matrix, (repeats, 1))[:args.rows], source.sha256)
+    print(f"{len(data):,} rows, pyarrow {'available' if arrow_available() else 'not installed'}")
+
+    report(f"/api/dataset ({len(data.columns)} columns)", dataset_formats(data))
+
+    rng = np.random.default_rng(0)
+    probabilities = rng.random(len(data))
+    report("/api/batch-predict (prediction, probability, risk level)",
+           batch_formats((probabilities > 0.5).astype(np.int64), probabilities))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Cross-validated model comparison: serial loop in one process against the process pool
+used by /api/model-comparison?mode=cv (comparison.py).
+
+Usage: python benchmarks/bench_cv_comparison.py [--folds K] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import comparison
+
+DATASET = os.path.join(os.path.dirname(__file__), '..', 'diabetes.csv')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help='pool size (default: one per CPU)')
+    args = parser.parse_args()
+    
+    # Import sklearn up front so neither path is charged for it
+    comparison.run_cv_serial(DATASET, 2)
+    
+    start = time.perf_counter()
+    serial = comparison.run_cv_serial(DATASET, args.folds)
+    serial_seconds = time.perf_counter() - start
+    
+    with tempfile.TemporaryDirectory() as directory:
+        key = comparison.comparison_key(comparison.file_sha256(DATASET), args.folds)
+        job = {'job_id': f'{key}-00000000', 'key': key, 'folds': args.folds, 'dataset_sha256': '',
+               'status': 'running', 'completed': 0, 'total': 0, 'started_at': 0, 'updated_at': 0, 'error': None}
+        comparison.run_job(job, DATASET, directory, max_workers=args.workers)
+        result = comparison.read_json(comparison.result_path(key, directory))
+    
+    print(f"{len(comparison.COMPARISON_MODELS)} models x {args.folds} folds, {os.cpu_count()} CPUs\n")
+    print(f"{'model':<22} {'accuracy':>16} {'precision':>16} {'recall':>16} {'f1':>16}")
+    for model in result['models']:
+        print(f"{model['name']:<22}" + ''.join(f"{model[m]:>9.3f} ± {model[m + '_std']:.3f}"
+                                               for m in ('accuracy', 'precision', 'recall', 'f1_score')))
+    
+    print(f"\nserial loop:               {serial_seconds:>6.2f} s")
+    print(f"process pool, {result['workers']} worker(s): {result['wall_seconds']:>6.2f} s   "
+          f"(x{serial_seconds / result['wall_seconds']:.2f} vs measured serial, "
+          f"pool efficiency {result['pool_efficiency']:.0%})")
+    assert [m['name'] for m in sorted(serial, key=lambda m: -m['accuracy'])] == [m['name'] for m in result['models']]
+
+
+if __name__ == '__main__':
+    main()
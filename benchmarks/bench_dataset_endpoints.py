@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Per-endpoint latency of the dataset endpoints, through the Flask test client:
+
+    pandas        read_csv and the pandas aggregates on every request (the original endpoints)
+    per request   the in-memory DatasetStore columns, with the one-pass aggregates recomputed
+                  and jsonified per request
+    snapshot      the precomputed analytics snapshot, served as pre-serialized bytes (current)
+
+Usage: python benchmarks/bench_dataset_endpoints.py [--calls N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app
+from analytics import build_payloads
+from dataset import get_dataset
+
+ENDPOINTS = ('dataset', 'dataset-stats', 'correlation-matrix', 'feature-distributions', 'outcome-analysis')
+
+
+def pandas_payload(endpoint):
+    """What the original endpoint computed, from a fresh read of the CSV"""
+    df = pd.read_csv('diabetes.csv')
+    X = df.drop('Outcome', axis=1)
+    if endpoint == 'dataset':
+        return {'total_samples': len(df), 'columns': df.columns.tolist(), 'sample_data': df.head(20).values.tolist(),
+                'diabetic_cases': int(df['Outcome'].sum())}
+    if endpoint == 'dataset-stats':
+        return {'feature_stats': {c: {'mean': float(X[c].mean()), 'std': float(X[c].std()), 'min': float(X[c].min()),
+                                      'max': float(X[c].max()), 'median': float(X[c].median())} for c in X.columns},
+                'missing_values': X.isnull().sum().to_dict()}
+    if endpoint == 'correlation-matrix':
+        return {'correlation_matrix': df.corr().values.tolist(), 'features': df.columns.tolist()}
+    if endpoint == 'feature-distributions':
+        return {'stats': {c: {'mean': float(X[c].mean()), 'std': float(X[c].std())} for c in X.columns},
+                'histograms': {c: np.histogram(X[c], bins=10)[0].tolist() for c in X.columns}}
+    return {'diabetic_count': int(df['Outcome'].sum()),
+            'avg_age_diabetic': round(df[df['Outcome'] == 1]['Age'].mean(), 1),
+            'avg_age_non_diabetic': round(df[df['Outcome'] == 0]['Age'].mean(), 1)}
+
+
+def baseline_client(payload):
+    """A Flask app serving every endpoint by computing `payload(endpoint)` per request"""
+    baseline = Flask(__name__)
+    for endpoint in ENDPOINTS:
+        baseline.add_url_rule(f"/api/{endpoint}", endpoint, lambda endpoint=endpoint: jsonify(payload(endpoint)))
+    return baseline.test_client()
+
+
+def measure(client, url, calls):
+    client.get(url)  # warm up
+    start = time.perf_counter()
+    for _ in range(calls):
+        response = client.get(url)
+    assert response.status_code == 200
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=300)
+    args = parser.parse_args()
+
+    clients = [
+        ('pandas', baseline_client(pandas_payload)),
+        ('per request', baseline_client(lambda endpoint: build_payloads(get_dataset())[endpoint])),
+        ('snapshot', app.app.test_client())
+    ]
+
+    print(f"{args.calls} calls per endpoint, mean ms per request")
+    print(f"{'endpoint':<24}" + ''.join(f"{name:>13}" for name, _ in clients) + f"{'speedup':>10}")
+    for endpoint in ENDPOINTS:
+        timings = [measure(client, f"/api/{endpoint}", args.calls) for _, client in clients]
+        print(f"{endpoint:<24}" + ''.join(f"{ms:>13.3f}" for ms in timings) + f"{timings[0] / timings[-1]:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for per-prediction explanations (explanations/sec):
+
+    rules         RuleTable.contributions (exact, one bucket search per rule)
+    flat forest   FlatForest.contributions (Saabas path attribution in one lock-step traversal)
+    per tree      the same attribution computed tree by tree from sklearn's decision_path,
+                  as treeinterpreter-style explainers do; also the correctness reference
+
+Usage: python benchmarks/bench_explain.py [--rows N] [--calls N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forest import compile_forest
+from rules import RISK_TABLE
+
+
+def per_tree_contributions(forest, X):
+    """Saabas attribution walked tree by tree over sklearn's decision paths"""
+    contributions = np.zeros(X.shape)
+    bias = 0.0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        counts = tree.value[:, 0, :]
+        value = counts[:, 1] / counts.sum(axis=1)
+        bias += value[0]
+        paths = estimator.decision_path(X.astype(np.float32))
+        for row in range(len(X)):
+            nodes = paths.indices[paths.indptr[row]:paths.indptr[row + 1]]
+            np.add.at(contributions[row], tree.feature[nodes[:-1]], np.diff(value[nodes]))
+    n = len(forest.estimators_)
+    return np.full(len(X), bias / n), contributions / n
+
+
+def measure(fn, rows, calls):
+    """(single-row explanations/s, batch explanations/s)"""
+    fn(rows[:1])
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(rows[i:i + 1])
+    single = calls / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    fn(rows)
+    batch = len(rows) / (time.perf_counter() - start)
+    return single, batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--calls', type=int, default=500)
+    args = parser.parse_args()
+
+    # Same training setup as model_old.train_model
+    data = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'diabetes.csv'))
+    X = data.drop('Outcome', axis=1).values.astype(float)
+    y = data['Outcome'].values
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler().fit(X_train)
+    forest = RandomForestClassifier(n_estimators=100, random_state=42).fit(scaler.transform(X_train), y_train)
+    flat = compile_forest(forest, scaler)
+
+    rng = np.random.default_rng(0)
+    rows = rng.uniform([0, 40, 40, 0, 0, 15, 0.05, 18], [17, 220, 130, 60, 900, 60, 2.5, 85], size=(args.rows, 8))
+
+    # Both forest explainers must agree, and add up to the predicted probability
+    sample = rows[:200]
+    bias, contributions = flat.contributions(sample)
+    ref_bias, ref_contributions = per_tree_contributions(forest, scaler.transform(sample))
+    print(f"max |flat - per tree| {np.abs(contributions - ref_contributions).max():.2e}, "
+          f"max |bias + sum - proba| {np.abs(bias + contributions.sum(axis=1) - flat.predict_positive(sample)).max():.2e}")
+
+    per_tree_rows = rows[:min(args.rows, 2_000)]
+    print(f"\n{'explainer':<12} {'single row':>16} {'batch':>16}   (explanations/s; per tree batch on {len(per_tree_rows):,} rows)")
+    for name, fn, batch_rows in [
+        ('rules', RISK_TABLE.contributions, rows),
+        ('flat forest', flat.contributions, rows),
+        ('per tree', lambda batch: per_tree_contributions(forest, scaler.transform(batch)), per_tree_rows),
+    ]:
+        single, batch = measure(fn, batch_rows, min(args.calls, len(batch_rows)))
+        print(f"{name:<12} {single:>16,.0f} {batch:>16,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Latency/throughput benchmark for the flattened RandomForest engine (forest.py)
+against sklearn's RandomForestClassifier.predict_proba.
+
+Usage: python benchmarks/bench_forest.py [--rows N] [--calls N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forest import compile_forest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--calls', type=int, default=500)
+    args = parser.parse_args()
+    
+    # Same training setup as model_old.train_model
+    data = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'diabetes.csv'))
+    X = data.drop('Outcome', axis=1).values.astype(float)
+    y = data['Outcome'].values
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler().fit(X_train)
+    forest = RandomForestClassifier(n_estimators=100, random_state=42).fit(scaler.transform(X_train), y_train)
+    
+    start = time.perf_counter()
+    flat = compile_forest(forest, scaler)
+    compile_ms = (time.perf_counter() - start) * 1e3
+    print(f"compiled {flat.n_estimators} trees, {flat.n_nodes:,} nodes, depth {flat.depth} in {compile_ms:.1f} ms")
+    
+    rng = np.random.default_rng(0)
+    rows = rng.uniform([0, 40, 40, 0, 0, 15, 0.05, 18], [17, 220, 130, 60, 900, 60, 2.5, 85], size=(args.rows, 8))
+    
+    def sklearn_score(batch):
+        return forest.predict_proba(scaler.transform(batch))
+    
+    # Single-row latency
+    print(f"\nsingle row ({args.calls} calls)")
+    for name, fn in [('sklearn', sklearn_score), ('flat forest', flat.predict_proba)]:
+        fn(rows[:1])
+        timings = []
+        for i in range(args.calls):
+            start = time.perf_counter()
+            fn(rows[i:i + 1])
+            timings.append(time.perf_counter() - start)
+        p50, p99 = np.percentile(np.array(timings) * 1e6, [50, 99])
+        print(f"  {name:<12} p50 {p50:>8.1f} us   p99 {p99:>8.1f} us")
+    
+    # Batch throughput
+    print(f"\nbatch of {args.rows:,} rows")
+    for name, fn in [('sklearn', sklearn_score), ('flat forest', flat.predict_proba)]:
+        start = time.perf_counter()
+        fn(rows)
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<12} {elapsed:>7.2f} s   {args.rows / elapsed:>10,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
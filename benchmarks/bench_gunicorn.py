@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: the old single-worker gunicorn command against gunicorn.conf.py
+(preloaded model, autosized workers/threads).
+
+Each setup is started on a local port and driven by --clients load generator processes
+POSTing /predict for --seconds. Reports requests/s, latency percentiles and the memory of
+the master plus workers (RSS, and PSS which splits shared copy-on-write pages between the
+processes that map them).
+
+Usage: python benchmarks/bench_gunicorn.py [--clients N] [--seconds S] [--workers N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import subprocess
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+FORM = urllib.parse.urlencode({
+    'pregnancies': 2, 'glucose': 150, 'bloodpressure': 85, 'skinthickness': 30,
+    'insulin': 200, 'bmi': 33.0, 'dpf': 0.6, 'age': 50
+}).encode()
+
+
+def client(url, seconds, queue):
+    """Send /predict requests until the deadline and report per-request latencies"""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        with urllib.request.urlopen(url + '/predict', data=FORM, timeout=30) as response:
+            response.read()
+        latencies.append(time.perf_counter() - start)
+    queue.put(latencies)
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/health', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+def process_tree(pid):
+    """The gunicorn master and its worker pids"""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [pid] + [int(child) for child in f.read().split()]
+    except OSError:
+        return [pid]
+
+
+def memory_kb(pids):
+    """Total (rss, pss) in kB over the given processes, from /proc/<pid>/smaps_rollup"""
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                for line in f:
+                    if line.startswith('Rss:'):
+                        rss += int(line.split()[1])
+                    elif line.startswith('Pss:'):
+                        pss += int(line.split()[1])
+        except OSError:
+            pass
+    return rss, pss
+
+
+def run_setup(name, command, env, args):
+    url = f'http://127.0.0.1:{args.port}'
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(url)
+        # Warm every worker before measuring
+        for _ in range(50):
+            with urllib.request.urlopen(url + '/predict', data=FORM) as response:
+                response.read()
+
+        queue = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client, args=(url, args.seconds, queue)) for _ in range(args.clients)]
+        start = time.perf_counter()
+        for process in clients:
+            process.start()
+        latencies = np.concatenate([queue.get() for _ in clients])
+        elapsed = time.perf_counter() - start
+        for process in clients:
+            process.join()
+
+        pids = process_tree(server.pid)
+        rss, pss = memory_kb(pids)
+        p50, p99 = np.percentile(latencies * 1e3, [50, 99])
+        print(f"{name:<28} {len(latencies) / elapsed:>8.0f} req/s   p50 {p50:>6.1f} ms   p99 {p99:>7.1f} ms   "
+              f"{len(pids) - 1} workers   RSS {rss / 1024:>6.1f} MB   PSS {pss / 1024:>6.1f} MB")
+        return len(latencies) / elapsed
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=None, help='override the autosized worker count')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PORT=str(args.port), PYTHONUNBUFFERED='1')
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, {args.seconds:g} s per setup\n")
+
+    with tempfile.NamedTemporaryFile('w', suffix='.py') as empty_config:
+        # An empty config file keeps gunicorn from picking up ./gunicorn.conf.py
+        before = run_setup('single worker (old command)',
+                           ['gunicorn', '-c', empty_config.name, 'app_simple:app',
+                            '--bind', f'127.0.0.1:{args.port}', '--workers', '1', '--timeout', '120'], env, args)
+
+    after = run_setup('gunicorn.conf.py', ['gunicorn', '-c', 'gunicorn.conf.py', 'app_simple:app',
+                                           '--bind', f'127.0.0.1:{args.port}'], env, args)
+
+    print(f"\nthroughput x{after / before:.2f}")
+
+
+if __name__ == '__main__':
+    main()
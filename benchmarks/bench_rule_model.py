@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for MedicalRuleBasedModel.predict + predict_proba.
+Compares the vectorized engine against the original per-sample loop.
+
+Usage: python benchmarks/bench_rule_model.py [--legacy-max ROWS]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model import MedicalRuleBasedModel
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+
+def legacy_score(X):
+    """Original per-sample implementation (predict and predict_proba in one loop)"""
+    predictions = []
+    probabilities = []
+    for pregnancies, glucose, bp, skin_thickness, insulin, bmi, dpf, age in X:
+        risk_score = 0
+        prob = 0.0
+        if glucose >= 126:
+            risk_score += 4; prob += 0.4
+        elif glucose >= 100:
+            risk_score += 2; prob += 0.2
+        elif glucose < 70:
+            risk_score += 1; prob += 0.1
+        if bmi >= 30:
+            risk_score += 3; prob += 0.25
+        elif bmi >= 25:
+            risk_score += 1; prob += 0.15
+        if age >= 45:
+            risk_score += 2; prob += 0.15
+        elif age >= 35:
+            risk_score += 1; prob += 0.08
+        if bp >= 90:
+            risk_score += 2; prob += 0.1
+        elif bp >= 80:
+            risk_score += 1; prob += 0.05
+        if dpf >= 0.5:
+            risk_score += 2; prob += 0.05
+        elif dpf >= 0.3:
+            risk_score += 1; prob += 0.025
+        if insulin >= 200:
+            risk_score += 2; prob += 0.02
+        elif insulin >= 166:
+            risk_score += 1
+        if pregnancies >= 4:
+            risk_score += 1; prob += 0.015
+        if skin_thickness >= 35:
+            risk_score += 1; prob += 0.015
+        predictions.append(1 if risk_score >= 6 else 0)
+        prob = min(max(prob, 0.05), 0.95)
+        probabilities.append([1 - prob, prob])
+    return np.array(predictions), np.array(probabilities)
+
+
+def make_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    low = np.array([0, 40, 40, 0, 0, 15, 0.05, 18])
+    high = np.array([17, 220, 130, 60, 900, 60, 2.5, 85])
+    return rng.uniform(low, high, size=(n, 8))
+
+
+def time_it(fn, X, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--legacy-max', type=int, default=100_000,
+                        help='largest batch to run through the per-sample loop')
+    args = parser.parse_args()
+    
+    model = MedicalRuleBasedModel()
+    
+    def vectorized_score(X):
+        return model.predict(X), model.predict_proba(X)
+    
+    print(f"{'rows':>10} {'legacy rows/s':>16} {'vectorized rows/s':>18} {'speedup':>8}")
+    for n in SIZES:
+        X = make_rows(n)
+        repeat = 5 if n <= 100_000 else 2
+        vectorized = time_it(vectorized_score, X, repeat)
+        if n <= args.legacy_max:
+            legacy = time_it(legacy_score, X, 1)
+            legacy_rate = f"{n / legacy:,.0f}"
+            speedup = f"{legacy / vectorized:.1f}x"
+        else:
+            legacy_rate, speedup = 'skipped', '-'
+        print(f"{n:>10,} {legacy_rate:>16} {n / vectorized:>18,.0f} {speedup:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Single-row latency benchmark for the /predict hot path.
+Compares the old path (scaler.transform + predict + predict_proba) against
+the compiled pipeline used by model.predict_diabetes.
+
+Usage: python benchmarks/bench_single_row.py [--calls N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import model
+
+
+def legacy_predict(features):
+    """Per-request path before the scaler was compiled away"""
+    features_array = np.array(features).reshape(1, -1)
+    features_scaled = model.scaler.transform(features_array)
+    prediction = model.model.predict(features_scaled)[0]
+    probability = model.model.predict_proba(features_scaled)[0][1]
+    return prediction, probability
+
+
+def measure(fn, rows):
+    timings = np.empty(len(rows))
+    for i, features in enumerate(rows):
+        start = time.perf_counter()
+        fn(features)
+        timings[i] = time.perf_counter() - start
+    return timings * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=20_000)
+    args = parser.parse_args()
+    
+    model.load_model()
+    rng = np.random.default_rng(0)
+    low = np.array([0, 40, 40, 0, 0, 15, 0.05, 18])
+    high = np.array([17, 220, 130, 60, 900, 60, 2.5, 85])
+    rows = rng.uniform(low, high, size=(args.calls, 8)).tolist()
+    
+    print(f"model: {type(model.model).__name__}, {args.calls:,} calls")
+    print(f"{'path':<22} {'p50 us':>9} {'p99 us':>9} {'calls/s':>10}")
+    for name, fn in [('scaler.transform (old)', legacy_predict), ('compiled pipeline', model.predict_diabetes)]:
+        fn(rows[0])  # warm up
+        timings = measure(fn, rows)
+        p50, p99 = np.percentile(timings, [50, 99])
+        print(f"{name:<22} {p50:>9.1f} {p99:>9.1f} {1e6 / timings.mean():>10,.0f}")
+
+
+if __name__ == '__main__':
+    main()
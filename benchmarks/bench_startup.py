@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget for the production app (`app_simple:app`).
+
+Imports app_simple in fresh interpreters under `python -X importtime`, reports the median
+cumulative import time and the slowest modules, then times model.warmup() separately.
+Exits with status 1 when the median import time exceeds --threshold-ms or when a module
+that should load lazily (pandas, sklearn) is pulled in at import time, so it can gate CI.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--threshold-ms MS] [--top N]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules that must only be imported on first use, never by importing the app
+LAZY_MODULES = ('pandas', 'sklearn', 'scipy')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+def import_profile(module):
+    """Return {module: (self_us, cumulative_us)} for one cold import of `module`"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            profile[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return profile
+
+
+def warmup_ms():
+    """Time model.warmup() in a fresh interpreter, after the app has been imported"""
+    script = 'import app_simple, model; app_simple.warmup_model(); print(model.warmup_seconds)'
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1]) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app_simple')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--threshold-ms', type=float, default=600.0)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+    
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [profile[args.module][1] / 1e3 for profile in profiles]
+    median_ms = statistics.median(totals)
+    
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} cold runs "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}), budget {args.threshold_ms:.0f} ms")
+    
+    # Slowest modules by self time, from the run closest to the median
+    profile = min(profiles, key=lambda p: abs(p[args.module][1] / 1e3 - median_ms))
+    print("\nslowest modules (self time):")
+    for name, (self_us, cumulative_us) in sorted(profile.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {name:<40} {self_us / 1e3:>8.1f} ms   cumulative {cumulative_us / 1e3:>8.1f} ms")
+    
+    eager = sorted({name.split('.')[0] for name in profile} & set(LAZY_MODULES))
+    print(f"\nmodel warmup: {warmup_ms():.1f} ms")
+    
+    failures = []
+    if median_ms > args.threshold_ms:
+        failures.append(f"import time {median_ms:.1f} ms exceeds the {args.threshold_ms:.0f} ms budget")
+    if eager:
+        failures.append(f"imported at startup but should load lazily: {', '.join(eager)}")
+    
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK: within the startup budget")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
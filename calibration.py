@@ -0,0 +1,236 @@
+"""
+Probability calibration compiled to a monotone lookup.
+
+A calibration curve maps a model's raw positive-class probability to the observed
+diabetes rate of rows that scored like it. It is fitted on labelled rows from
+diabetes.csv, either with isotonic regression (pool adjacent violators) or with Platt
+scaling (a logistic fit on the raw score), and compiled to two sorted arrays:
+
+    thresholds  raw probabilities where the calibrated value changes
+    values      calibrated probability from that threshold up to the next one
+
+Applying it is one searchsorted per batch, or one bisect per single row. A calibrated
+model's class is taken from the calibrated probability (positive above
+DECISION_THRESHOLD), so the served class and probability always agree. The curve is
+stored in the model's metadata (metadata['calibration'] in the artifact header), so every
+worker applies exactly the curve the model was published with.
+
+Calibrate the published model with:
+
+    python calibration.py [--method isotonic|platt]
+"""
+
+import argparse
+import datetime
+import json
+import os
+from bisect import bisect_right
+
+import numpy as np
+
+# Calibrated probabilities are kept away from certainty; a finite sample never proves 0 or 1
+CALIBRATION_FLOOR = 0.01
+CALIBRATION_CEILING = 0.99
+
+# A calibrated probability above this is a positive prediction
+DECISION_THRESHOLD = 0.5
+
+# Lookup size of a compiled Platt curve (raw probabilities are cut into this many bins)
+PLATT_POINTS = 1001
+
+CALIBRATION_METHODS = ('isotonic', 'platt')
+
+# Raw probabilities this close are the same score (see Calibrator)
+THRESHOLD_TOLERANCE = 1e-9
+
+
+def _pool_adjacent_violators(values, weights):
+    """Non-decreasing least-squares fit of `values` (already ordered by score)"""
+    means, sizes, counts = [], [], []
+    for value, weight in zip(values, weights):
+        means.append(value)
+        sizes.append(weight)
+        counts.append(1)
+        # Merge blocks while the last one is below its predecessor
+        while len(means) > 1 and means[-2] > means[-1]:
+            size = sizes[-2] + sizes[-1]
+            means[-2] = (means[-2] * sizes[-2] + means[-1] * sizes[-1]) / size
+            sizes[-2] = size
+            counts[-2] += counts[-1]
+            del means[-1], sizes[-1], counts[-1]
+    return np.repeat(means, counts)
+
+
+def fit_isotonic(scores, y):
+    """(thresholds, values) of the isotonic regression of y on scores"""
+    scores = np.asarray(scores, dtype=float)
+
+    # Scores that differ only by float rounding (0.7 vs 0.7000000000000001) are one level,
+    # and its threshold is the smallest of them so every one of them maps to it
+    levels, inverse = np.unique(np.round(scores, 9), return_inverse=True)
+    thresholds = np.full(len(levels), np.inf)
+    np.minimum.at(thresholds, inverse, scores)
+
+    weights = np.bincount(inverse).astype(float)
+    rates = np.bincount(inverse, weights=np.asarray(y, dtype=float)) / weights
+    return thresholds, _pool_adjacent_violators(rates, weights)
+
+
+def fit_platt(scores, y, iterations=50):
+    """(thresholds, values) of a Platt sigmoid fitted on scores, tabulated over [0, 1]"""
+    scores = np.asarray(scores, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Platt's smoothed targets keep the fit finite on separable data
+    positives = y.sum()
+    negatives = len(y) - positives
+    targets = np.where(y == 1, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+
+    # Newton's method on the log loss of sigmoid(a * score + b)
+    a, b = 1.0, 0.0
+    design = np.column_stack([scores, np.ones_like(scores)])
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(a * scores + b)))
+        gradient = design.T @ (p - targets)
+        hessian = design.T @ (design * (p * (1 - p))[:, None]) + 1e-9 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        a, b = a - step[0], b - step[1]
+        if np.abs(step).max() < 1e-10:
+            break
+    if a < 0:
+        raise ValueError("Platt scaling found scores anti-correlated with the outcome")
+
+    # Each bin takes the sigmoid at its centre
+    thresholds = np.linspace(0, 1, PLATT_POINTS)
+    centres = thresholds + 0.5 / (PLATT_POINTS - 1)
+    return thresholds, 1 / (1 + np.exp(-(a * centres + b)))
+
+
+def _compact(thresholds, values):
+    """Drop thresholds where the calibrated value does not change"""
+    keep = np.r_[True, np.diff(values) != 0]
+    return thresholds[keep], values[keep]
+
+
+def _brier(probabilities, y):
+    return float(np.mean((np.asarray(probabilities, dtype=float) - y) ** 2))
+
+
+def fit_calibration(scores, y, method='isotonic', dataset_sha256=None):
+    """Fit a calibration curve on raw probabilities and labels; returns the metadata entry"""
+    if method not in CALIBRATION_METHODS:
+        raise ValueError(f"Unknown calibration method '{method}' (expected one of {', '.join(CALIBRATION_METHODS)})")
+
+    scores = np.asarray(scores, dtype=float)
+    y = np.asarray(y, dtype=int)
+    thresholds, values = fit_isotonic(scores, y) if method == 'isotonic' else fit_platt(scores, y)
+    thresholds, values = _compact(thresholds, np.clip(values, CALIBRATION_FLOOR, CALIBRATION_CEILING))
+
+    calibration = {
+        'method': method,
+        'thresholds': thresholds.tolist(),
+        'values': values.tolist(),
+        'rows': int(len(y)),
+        'dataset_sha256': dataset_sha256,
+        'fitted_at': datetime.datetime.now().isoformat()
+    }
+    calibrated = Calibrator.from_metadata(calibration).apply(scores)
+    calibration['brier_before'] = round(_brier(scores, y), 5)
+    calibration['brier_after'] = round(_brier(calibrated, y), 5)
+    return calibration
+
+
+class Calibrator:
+    """A calibration curve compiled for scoring (see fit_calibration)"""
+
+    def __init__(self, thresholds, values, method=None):
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        self.method = method
+
+        if len(self.thresholds) == 0 or len(self.thresholds) != len(self.values):
+            raise ValueError("A calibration curve needs one value per threshold")
+        if np.any(np.diff(self.thresholds) <= 0) or np.any(np.diff(self.values) < 0):
+            raise ValueError("A calibration curve must be increasing")
+
+        # Raw probabilities within float rounding of a threshold (a sum taken in another
+        # order) belong to its step, so lookups compare against slightly lowered thresholds
+        self._lookup = self.thresholds - THRESHOLD_TOLERANCE
+
+        # Plain Python copies keep the single-row path free of NumPy call overhead
+        self._thresholds = self._lookup.tolist()
+        self._values = self.values.tolist()
+
+    @classmethod
+    def from_metadata(cls, calibration):
+        return cls(calibration['thresholds'], calibration['values'], calibration.get('method'))
+
+    def apply(self, probabilities):
+        """Calibrated probabilities for an array of raw ones"""
+        index = np.searchsorted(self._lookup, probabilities, side='right') - 1
+        return self.values[np.maximum(index, 0)]
+
+    def apply_one(self, probability):
+        """Calibrated probability for a single raw one"""
+        return self._values[max(bisect_right(self._thresholds, probability) - 1, 0)]
+
+    def classify(self, probabilities):
+        """Calibrated (predictions, probabilities) for an array of raw probabilities"""
+        calibrated = self.apply(probabilities)
+        return (calibrated > DECISION_THRESHOLD).astype(int), calibrated
+
+    def classify_one(self, probability):
+        """Calibrated (prediction, probability) for a single raw probability"""
+        calibrated = self.apply_one(probability)
+        return int(calibrated > DECISION_THRESHOLD), calibrated
+
+
+def calibrate_artifact(path=None, dataset_path='diabetes.csv', method='isotonic'):
+    """Fit a calibration for the model in the artifact on the dataset and republish it; returns the header
+
+    The recalibrated version goes through model.publish_version like any other: it is
+    staged, validated on the golden set and only then promoted, so a bad curve raises
+    RejectedVersionError and leaves the artifact as it was.
+    """
+    from artifacts import ARTIFACT_DIR, HEADER_FILE, load_model_artifact, save_model_artifact
+    from model import compile_pipeline, publish_version
+    from training_cache import file_sha256
+
+    from golden_set import training_mask
+
+    path = path or ARTIFACT_DIR
+    model, scaler, header = load_model_artifact(path)
+    data = np.loadtxt(dataset_path, delimiter=',', skiprows=1)
+    # The golden set judges the recalibrated version, so it is not fitted on
+    data = data[training_mask(data[:, :-1], data[:, -1])]
+
+    # Fitted on the raw model output; a previous calibration is replaced, not stacked
+    _, scores = compile_pipeline(model, scaler).score_many(data[:, :-1])
+    calibration = fit_calibration(scores, data[:, -1], method, file_sha256(dataset_path))
+
+    # Sidecars (model card, search report) are carried over to the new version
+    sidecars = {}
+    for filename in os.listdir(path):
+        if filename.endswith('.json') and filename != HEADER_FILE:
+            with open(os.path.join(path, filename)) as f:
+                sidecars[filename] = json.load(f)
+
+    metadata = dict(header['metadata'], calibration=calibration)
+    return publish_version(lambda staging: save_model_artifact(model, scaler, staging, metadata, sidecars), path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the published model's probabilities")
+    parser.add_argument('--artifact', default=None, help="artifact directory (default: the served model)")
+    parser.add_argument('--dataset', default='diabetes.csv')
+    parser.add_argument('--method', choices=CALIBRATION_METHODS, default='isotonic')
+    args = parser.parse_args()
+
+    header = calibrate_artifact(args.artifact, args.dataset, args.method)
+    calibration = header['metadata']['calibration']
+    print(f"Calibrated ({calibration['method']}, {len(calibration['thresholds'])} steps): Brier score "
+          f"{calibration['brier_before']} -> {calibration['brier_after']} (version {header['content_hash'][:12]})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Binary columnar payloads for bulk data responses (/api/dataset, /api/batch-predict).
+
+Clients that send `Accept: application/vnd.apache.arrow.stream` get an Arrow IPC stream
+(one record batch) when pyarrow is installed. Clients that send
+`Accept: application/vnd.diabetes.columns` get the raw layout below, which needs nothing
+but NumPy (or any language that reads little-endian arrays):
+
+    offset  size  field
+    0       4     magic b'DCOL'
+    4       2     layout version (uint16, currently 1)
+    6       2     number of columns (uint16)
+    8       8     number of rows (uint64)
+    16      ...   per column: name length (uint16), UTF-8 name, dtype code (1 byte:
+                  b'f' float32, b'b' int8)
+    ...           zero padding to a multiple of 8 bytes
+    ...           column data in header order, each column contiguous and padded to a
+                  multiple of 8 bytes
+
+All integers are little-endian. Whole-number columns whose values fit in int8 (outcome,
+predictions, pregnancies, risk level codes) are sent as int8, all others as float32, so
+non-integer values are rounded to float32 precision (about 7 significant digits).
+Decode with decode_columns(), or in NumPy:
+
+    np.frombuffer(payload, dtype='<f4', count=rows, offset=column_offset)
+"""
+
+import struct
+
+import numpy as np
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+COLUMNS_MEDIA_TYPE = 'application/vnd.diabetes.columns'
+JSON_MEDIA_TYPE = 'application/json'
+
+MAGIC = b'DCOL'
+LAYOUT_VERSION = 1
+
+DTYPE_CODES = {b'f': np.dtype('<f4'), b'b': np.dtype('i1')}
+
+_HEADER = struct.Struct('<4sHHQ')
+
+
+_arrow_available = None
+
+
+def arrow_available():
+    """Whether pyarrow can be imported (checked once per process)"""
+    global _arrow_available
+
+    if _arrow_available is None:
+        try:
+            import pyarrow  # noqa: F401
+            _arrow_available = True
+        except ImportError:
+            _arrow_available = False
+    return _arrow_available
+
+
+def negotiate(accept_mimetypes):
+    """Media type to answer with for the request's Accept header (JSON unless binary is preferred)
+
+    Arrow is only offered when pyarrow is installed; a client that accepts only Arrow
+    otherwise gets None (406).
+    """
+    offered = [JSON_MEDIA_TYPE, COLUMNS_MEDIA_TYPE] + ([ARROW_MEDIA_TYPE] if arrow_available() else [])
+    best = accept_mimetypes.best_match(offered)
+    if best is None and ARROW_MEDIA_TYPE in accept_mimetypes.values() and not arrow_available():
+        return None
+    return best or JSON_MEDIA_TYPE
+
+
+def column_code(values):
+    """Dtype code for a column: b'b' (int8) for small whole numbers, else b'f' (float32)"""
+    values = np.asarray(values)
+    if values.dtype.kind in 'iub' or (values.dtype.kind == 'f' and np.all(np.isfinite(values))
+                                      and np.array_equal(values, np.round(values))):
+        if len(values) == 0 or (values.min() >= -128 and values.max() <= 127):
+            return b'b'
+    return b'f'
+
+
+def _padding(size):
+    return b'\0' * (-size % 8)
+
+
+def encode_columns(names, columns):
+    """The raw columnar payload (see the module docstring) for equally long columns"""
+    rows = len(columns[0]) if columns else 0
+    if any(len(column) != rows for column in columns):
+        raise ValueError("All columns must have the same number of rows")
+
+    parts = [_HEADER.pack(MAGIC, LAYOUT_VERSION, len(names), rows)]
+    codes = [column_code(column) for column in columns]
+    for name, code in zip(names, codes):
+        encoded = name.encode()
+        parts.append(struct.pack('<H', len(encoded)) + encoded + code)
+    parts.append(_padding(sum(len(part) for part in parts)))
+
+    for column, code in zip(columns, codes):
+        data = np.ascontiguousarray(column, dtype=DTYPE_CODES[code]).tobytes()
+        parts.append(data)
+        parts.append(_padding(len(data)))
+    return b''.join(parts)
+
+
+def decode_columns(payload):
+    """{name: array} from a raw columnar payload"""
+    magic, version, count, rows = _HEADER.unpack_from(payload, 0)
+    if magic != MAGIC or version != LAYOUT_VERSION:
+        raise ValueError("Not a columnar payload of a supported version")
+
+    offset = _HEADER.size
+    fields = []
+    for _ in range(count):
+        (length,) = struct.unpack_from('<H', payload, offset)
+        name = bytes(payload[offset + 2:offset + 2 + length]).decode()
+        code = bytes(payload[offset + 2 + length:offset + 3 + length])
+        fields.append((name, DTYPE_CODES[code]))
+        offset += 3 + length
+    offset += -offset % 8
+
+    columns = {}
+    for name, dtype in fields:
+        columns[name] = np.frombuffer(payload, dtype=dtype, count=rows, offset=offset)
+        offset += rows * dtype.itemsize
+        offset += -offset % 8
+    return columns
+
+
+def encode_arrow(names, columns, metadata=None):
+    """Arrow IPC stream bytes with one record batch (needs pyarrow)
+
+    Columns keep the same types as the raw layout (int8 / float32).
+    """
+    import pyarrow as pa
+
+    arrays = [pa.array(np.asarray(column, dtype=DTYPE_CODES[column_code(column)])) for column in columns]
+    schema = pa.schema([pa.field(name, array.type) for name, array in zip(names, arrays)],
+                       metadata={key: str(value) for key, value in (metadata or {}).items()})
+    batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(media_type, names, columns, metadata=None):
+    """Payload bytes in the negotiated binary media type"""
+    if media_type == ARROW_MEDIA_TYPE:
+        return encode_arrow(names, columns, metadata)
+    return encode_columns(names, columns)
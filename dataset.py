@@ -0,0 +1,174 @@
+"""
+The training dataset held in memory as typed NumPy columns, shared by the dataset endpoints.
+
+DatasetStore.get() returns an immutable Dataset snapshot. The CSV is read and parsed once;
+after that a call costs one os.stat(): when the file's mtime or size changes the bytes
+are re-read and hashed, and only a different SHA-256 replaces the snapshot (a touched but
+unchanged file keeps the parsed one). Requests holding an old snapshot finish on it.
+
+Columns whose values are all whole numbers are stored as int64, the rest as float64;
+`matrix` has every column as float64 in file order, for vectorized statistics. Empty
+fields are read as NaN (as pandas reads them), which keeps their column float64.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+DATASET_PATH = 'diabetes.csv'
+OUTCOME_COLUMN = 'Outcome'
+
+# Rows formatted per chunk when streaming; bounds the memory an export of any size needs
+STREAM_CHUNK_ROWS = 2048
+
+
+class StaleCursorError(ValueError):
+    """A page cursor issued for an earlier version of the dataset"""
+
+
+class Dataset:
+    """One parsed version of the dataset file"""
+
+    def __init__(self, columns, matrix, sha256, stamp=None, path=None):
+        self.columns = list(columns)
+        self.feature_names = [name for name in self.columns if name != OUTCOME_COLUMN]
+        self.matrix = matrix
+        self.matrix.setflags(write=False)
+        self.sha256 = sha256
+        self.stamp = stamp
+        self.path = path
+        self.loaded_at = time.time()
+
+        # Pre-serialized endpoint payloads (analytics.AnalyticsSnapshot), built on first use
+        self.analytics = None
+
+        # Typed views of the columns, keyed by name
+        self.data = {}
+        for i, name in enumerate(self.columns):
+            values = matrix[:, i]
+            if np.all(np.isfinite(values)) and np.array_equal(values, np.round(values)):
+                values = values.astype(np.int64)
+            values.setflags(write=False)
+            self.data[name] = values
+
+        features = [self.columns.index(name) for name in self.feature_names]
+        self.X = np.ascontiguousarray(matrix[:, features])
+        self.X.setflags(write=False)
+        self.y = self.data[OUTCOME_COLUMN] if OUTCOME_COLUMN in self.data else None
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def select(self, columns=None):
+        """Column names to project on, in the requested order (all of them for None)"""
+        if not columns:
+            return list(self.columns)
+        unknown = [name for name in columns if name not in self.data]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)} (expected some of {', '.join(self.columns)})")
+        return list(columns)
+
+    def rows(self, columns, start, stop):
+        """Rows start..stop of the given columns as lists of Python values (ints stay ints)"""
+        return list(zip(*(self.data[name][start:stop].tolist() for name in columns)))
+
+    def iter_ndjson(self, columns, start=0, stop=None, chunk_rows=STREAM_CHUNK_ROWS):
+        """Rows start..stop as NDJSON bytes (one JSON object per line), a chunk of rows at a time"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        # For plain ints and finite floats a template formats a row exactly as json.dumps would
+        template = '{' + ','.join(f'"{name}":%r' for name in columns) + '}\n'
+        finite = all(np.isfinite(self.data[name]).all() for name in columns)
+        for offset in range(start, stop, chunk_rows):
+            rows = self.rows(columns, offset, min(offset + chunk_rows, stop))
+            if finite:
+                yield ''.join([template % row for row in rows]).encode()
+            else:
+                yield ''.join([json.dumps(dict(zip(columns, row))) + '\n' for row in rows]).encode()
+
+    def cursor(self, offset):
+        """Opaque cursor for the row at `offset`, valid only for this version of the dataset"""
+        return base64.urlsafe_b64encode(f"{offset}:{self.sha256[:16]}".encode()).decode().rstrip('=')
+
+    def cursor_offset(self, cursor):
+        """Row offset of a cursor made by cursor(); ValueError if it is malformed or from another version"""
+        try:
+            offset, version = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split(':')
+            offset = int(offset)
+        except ValueError:
+            raise ValueError("Malformed cursor")
+        if version != self.sha256[:16]:
+            raise StaleCursorError("The dataset changed since this cursor was issued; start again without a cursor")
+        if not 0 <= offset <= len(self):
+            raise ValueError("Malformed cursor")
+        return offset
+
+    @classmethod
+    def from_bytes(cls, content, stamp=None, path=None):
+        text = content.decode()
+        header = text.split('\n', 1)[0].strip()
+        matrix = np.genfromtxt(io.StringIO(text), delimiter=',', skip_header=1, filling_values=np.nan, ndmin=2)
+        return cls(header.split(','), matrix, hashlib.sha256(content).hexdigest(), stamp, path)
+
+
+class DatasetStore:
+    """The current Dataset for a CSV file, reloaded when the file's content changes"""
+
+    def __init__(self, path=DATASET_PATH):
+        self.path = path
+        self.current = None
+        self.loads = 0
+        self._lock = threading.Lock()
+
+    def _stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self):
+        """The dataset snapshot for the file as it is now"""
+        current = self.current
+        stamp = self._stamp()
+        if current is not None and current.stamp == stamp:
+            return current
+
+        with self._lock:
+            current = self.current
+            if current is not None and current.stamp == stamp:
+                return current
+
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            if current is not None and hashlib.sha256(content).hexdigest() == current.sha256:
+                # Touched or rewritten with the same bytes: keep the parsed columns
+                current.stamp = stamp
+                return current
+
+            self.current = Dataset.from_bytes(content, stamp, self.path)
+            self.loads += 1
+            return self.current
+
+    def info(self):
+        current = self.current
+        return {
+            'path': self.path,
+            'rows': None if current is None else len(current),
+            'sha256': None if current is None else current.sha256,
+            'loads': self.loads
+        }
+
+
+# The store the dataset endpoints read from
+dataset_store = DatasetStore()
+
+
+def get_dataset():
+    """The current snapshot of DATASET_PATH (parsed on first use)"""
+    return dataset_store.get()
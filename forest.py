@@ -0,0 +1,257 @@
+import numpy as np
+
+# Rows scored per traversal block; keeps the (trees x rows) node index arrays cache-sized
+BLOCK_ROWS = 1024
+
+
+def is_tree_ensemble(model):
+    """True for fitted binary sklearn tree ensembles such as RandomForestClassifier"""
+    estimators = getattr(model, 'estimators_', None)
+    return (
+        estimators is not None
+        and len(getattr(model, 'classes_', [])) == 2
+        and getattr(model, 'n_outputs_', 1) == 1
+        and all(hasattr(estimator, 'tree_') for estimator in estimators)
+    )
+
+
+def _round_down_float32(values):
+    """Cast to float32 without rounding up, so float32 x <= result exactly when x <= value"""
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+class FlatForest:
+    """A tree ensemble flattened into contiguous node arrays
+
+    All trees share one set of int32/float32 node arrays (thresholds are float64 once a
+    scaler has been folded in, see compile_forest). Children are stored side by side in
+    `children` (left at 2*i, right at 2*i + 1) and leaves point back to themselves,
+    so every tree can be advanced in lock step for `depth` steps without branching.
+    `value` holds the positive-class probability of every node, not only leaves.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, depth, n_features,
+                 classes, feature_importances, params=None, expects_raw_features=False):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.n_features = int(n_features)
+        self.classes_ = np.asarray(classes)
+        self._feature_importances = np.asarray(feature_importances, dtype=float)
+        self.params = dict(params or {})
+
+        # True when a scaler has been folded into the thresholds at compile time
+        self.expects_raw_features = expects_raw_features
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def feature_importances_(self):
+        return self._feature_importances
+
+    def __getattr__(self, name):
+        # Original hyperparameters (max_depth, random_state, ...) read like sklearn attributes
+        params = self.__dict__.get('params', {})
+        if name in params:
+            return params[name]
+        raise AttributeError(name)
+
+    def to_arrays(self):
+        """Node arrays for the on-disk artifact format (see artifacts.py)"""
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children': self.children,
+            'value': self.value,
+            'roots': self.roots,
+            'feature_importances': self._feature_importances
+        }
+
+    def metadata(self):
+        """JSON-serialisable fields needed to rebuild the forest from its arrays"""
+        return {
+            'depth': self.depth,
+            'n_features': self.n_features,
+            'classes': self.classes_.tolist(),
+            'params': self.params,
+            'expects_raw_features': self.expects_raw_features
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, metadata):
+        """Rebuild a forest from (possibly memory-mapped) arrays without copying them"""
+        return cls(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            children=arrays['children'],
+            value=arrays['value'],
+            roots=arrays['roots'],
+            depth=metadata['depth'],
+            n_features=metadata['n_features'],
+            classes=metadata['classes'],
+            feature_importances=arrays['feature_importances'],
+            params=metadata.get('params'),
+            expects_raw_features=metadata.get('expects_raw_features', False),
+        )
+
+    def leaves(self, X):
+        """Leaf node index reached in every tree by every row, shape (n_trees, n)"""
+        X = np.ascontiguousarray(np.atleast_2d(X), dtype=self.threshold.dtype)
+        n = len(X)
+        n_trees = len(self.roots)
+        leaves = np.empty((n_trees, n), dtype=np.int32)
+
+        for start in range(0, n, BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            flat = block.ravel()
+            m = len(block)
+
+            # One entry per (tree, row) pair, laid out tree-major
+            nodes = np.repeat(self.roots, m)
+            row_offsets = np.tile(np.arange(m, dtype=np.int32) * self.n_features, n_trees)
+
+            for _ in range(self.depth):
+                go_right = flat.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+                nodes = self.children.take(2 * nodes + go_right)
+
+            leaves[:, start:start + m] = nodes.reshape(n_trees, m)
+
+        return leaves
+
+    def contributions(self, X):
+        """Per-feature contributions to the positive-class probability: (bias, contributions)
+
+        Saabas path attribution: each split on a row's path moves the node value from the
+        parent to the child, and that change is credited to the split feature. Per tree the
+        changes add up to leaf value minus root value, so bias (the mean root value) plus
+        contributions.sum(axis=1) equals predict_positive(X). Computed in the same lock-step
+        traversal as leaves(); leaves point to themselves and add nothing.
+        """
+        X = np.ascontiguousarray(np.atleast_2d(X), dtype=self.threshold.dtype)
+        n = len(X)
+        n_trees = len(self.roots)
+        contributions = np.zeros((n, self.n_features))
+
+        for start in range(0, n, BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            flat = block.ravel()
+            m = len(block)
+
+            nodes = np.repeat(self.roots, m)
+            rows = np.tile(np.arange(m, dtype=np.int32), n_trees)
+            row_offsets = rows * self.n_features
+            totals = np.zeros(m * self.n_features)
+
+            for _ in range(self.depth):
+                split_feature = self.feature.take(nodes)
+                go_right = flat.take(row_offsets + split_feature) > self.threshold.take(nodes)
+                children = self.children.take(2 * nodes + go_right)
+
+                delta = np.subtract(self.value.take(children), self.value.take(nodes), dtype=np.float64)
+                totals += np.bincount(row_offsets + split_feature, weights=delta, minlength=len(totals))
+                nodes = children
+
+            contributions[start:start + m] = totals.reshape(m, self.n_features)
+
+        contributions /= n_trees
+        bias = float(self.value.take(self.roots).sum(dtype=np.float64)) / n_trees
+        return np.full(n, bias), contributions
+
+    def predict_positive(self, X):
+        """Positive-class probability for every row (mean of the per-tree leaf values)"""
+        leaves = self.leaves(X)
+        # Trees are summed in order in float64, the same way sklearn averages them
+        return self.value.take(leaves).sum(axis=0, dtype=np.float64) / len(self.roots)
+
+    def predict_with_proba(self, X):
+        """Predict class and positive-class probability in one traversal"""
+        prob = self.predict_positive(X)
+        # sklearn takes argmax over [1 - p, p], which favours class 0 on a tie
+        return self.classes_[(prob > 1 - prob).astype(int)], prob
+
+    def predict_proba(self, X):
+        prob = self.predict_positive(X)
+        return np.column_stack([1 - prob, prob])
+
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
+
+
+def compile_forest(forest, scaler=None):
+    """Flatten a fitted binary tree ensemble into a FlatForest
+
+    When the forest was trained on StandardScaler output, pass the scaler to fold it into
+    the split thresholds (raw = scaled * scale + mean); the compiled forest then scores raw
+    feature rows directly.
+    """
+    if not is_tree_ensemble(forest):
+        raise ValueError("compile_forest expects a fitted binary tree ensemble")
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    depth = 0
+
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        is_leaf = tree.children_left < 0
+        node_ids = np.arange(n_nodes)
+
+        feature = np.where(is_leaf, 0, tree.feature)
+        threshold = np.where(is_leaf, 0.0, tree.threshold)
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+        counts = tree.value[:, 0, :]
+        positive = counts[:, 1] / counts.sum(axis=1)
+
+        features.append(feature)
+        thresholds.append(threshold)
+        children.append(np.column_stack([left, right]).ravel())
+        values.append(positive)
+        roots.append(offset)
+        offset += n_nodes
+        depth = max(depth, tree.max_depth)
+
+    feature = np.concatenate(features).astype(np.int32)
+    threshold = np.concatenate(thresholds)
+
+    if scaler is not None:
+        # sklearn sends a row left when float32(scaled value) <= threshold. The scaled values
+        # that do so end at the rounding midpoint above the largest float32 <= threshold, and
+        # that midpoint is what gets mapped back to raw units (raw = scaled * scale + mean).
+        # Raw thresholds stay float64: a folded split can sit closer to a raw training value
+        # than float32 resolution, and raw rows are compared without any float32 rounding.
+        low = _round_down_float32(threshold).astype(np.float64)
+        high = np.nextafter(low.astype(np.float32), np.float32(np.inf)).astype(np.float64)
+        threshold = (low + high) / 2 * np.asarray(scaler.scale_)[feature] + np.asarray(scaler.mean_)[feature]
+    else:
+        # Same comparison as sklearn: float32 row values against the float64 threshold
+        threshold = _round_down_float32(threshold)
+
+    return FlatForest(
+        feature=feature,
+        threshold=threshold,
+        children=np.concatenate(children).astype(np.int32),
+        value=np.concatenate(values).astype(np.float32),
+        roots=np.array(roots, dtype=np.int32),
+        depth=depth,
+        n_features=forest.n_features_in_,
+        classes=forest.classes_,
+        feature_importances=forest.feature_importances_,
+        params={name: getattr(forest, name) for name in ('max_depth', 'random_state', 'min_samples_leaf')
+                if hasattr(forest, name)},
+        expects_raw_features=scaler is not None,
+    )
@@ -0,0 +1,87 @@
+"""
+The golden set: labelled rows held out of every training path, used to validate model versions.
+
+The first call to ensure_golden_set() draws GOLDEN_FRACTION of the rows of diabetes.csv
+(stratified by outcome, with a fixed seed) and writes them verbatim to golden_set.csv.
+The file is created once and never rewritten, even when the dataset changes, so every
+model version is judged on the same rows:
+
+    golden_set.csv      header and rows of diabetes.csv, in file order
+
+Training code (model_old.fit_model, tuning, online bootstrap, calibration) drops these
+rows with training_mask() before fitting, so a golden set score is always a held-out one.
+Rows are matched on their values rounded to ROUND_DECIMALS, which absorbs the last-bit
+differences between CSV parsers.
+"""
+
+import os
+
+import numpy as np
+
+from training_cache import file_sha256
+
+GOLDEN_SET_PATH = 'golden_set.csv'
+GOLDEN_SOURCE = 'diabetes.csv'
+
+# Share of each outcome class held out, and the seed that picks the rows
+GOLDEN_FRACTION = 0.2
+GOLDEN_SEED = 42
+
+ROUND_DECIMALS = 6
+
+
+def ensure_golden_set(path=GOLDEN_SET_PATH, source=GOLDEN_SOURCE):
+    """Create the golden set from `source` unless it exists; returns its path (None if neither exists)"""
+    if os.path.exists(path):
+        return path
+    if not os.path.exists(source):
+        return None
+
+    with open(source) as f:
+        header, *lines = [line.strip() for line in f if line.strip()]
+    labels = np.array([line.rsplit(',', 1)[1] for line in lines])
+
+    rng = np.random.default_rng(GOLDEN_SEED)
+    chosen = []
+    for label in np.unique(labels):
+        rows = np.flatnonzero(labels == label)
+        chosen.extend(rng.choice(rows, size=round(len(rows) * GOLDEN_FRACTION), replace=False).tolist())
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        f.write('\n'.join([header] + [lines[i] for i in sorted(chosen)]) + '\n')
+    try:
+        # A link fails if the file exists, so a golden set written by another process is never replaced
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+    print(f"Golden set of {len(chosen)} rows held out of {source} in {path}")
+    return path
+
+
+def read_golden_set(path=GOLDEN_SET_PATH):
+    """(X, y) of the golden set (created on first use), or None when there is none"""
+    if ensure_golden_set(path) is None:
+        return None
+    data = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+    return data[:, :-1], data[:, -1].astype(int)
+
+
+def golden_set_sha256(path=GOLDEN_SET_PATH):
+    """Content hash of the golden set (None when there is none); part of training cache keys"""
+    if ensure_golden_set(path) is None:
+        return None
+    return file_sha256(path)
+
+
+def training_mask(X, y, path=GOLDEN_SET_PATH):
+    """Boolean mask of the labelled rows that are not in the golden set (all True without one)"""
+    rows = np.round(np.column_stack([np.asarray(X, dtype=float), np.asarray(y, dtype=float)]), ROUND_DECIMALS)
+    golden = read_golden_set(path)
+    if golden is None:
+        return np.ones(len(rows), dtype=bool)
+
+    held_out = {tuple(row) for row in np.round(np.column_stack(golden), ROUND_DECIMALS).tolist()}
+    return np.array([tuple(row) not in held_out for row in rows.tolist()], dtype=bool)
@@ -0,0 +1,99 @@
+"""
+Gunicorn settings for the production app (`gunicorn -c gunicorn.conf.py app_simple:app`).
+
+The app and its model are loaded once in the master (preload_app + when_ready) and the
+workers are forked from it, so the rule lookup tables and memory-mapped forest arrays are
+shared copy-on-write instead of being rebuilt per worker. gc.freeze() moves everything
+loaded so far out of the collector's reach, so collections in the workers do not touch
+(and thereby copy) those pages.
+
+Every setting can be overridden from the environment:
+
+    PORT                     port to bind (default 5000)
+    WEB_CONCURRENCY          worker processes (default 2 * CPUs + 1, at most GUNICORN_MAX_WORKERS)
+    GUNICORN_MAX_WORKERS     upper bound for the autosized worker count (default 8)
+    GUNICORN_THREADS         threads per worker (default 2)
+    GUNICORN_MAX_REQUESTS    requests before a worker is recycled (default 1000, 0 disables)
+    GUNICORN_TIMEOUT         worker timeout in seconds (default 120)
+    MODEL_RELOAD_INTERVAL    seconds between model artifact checks per worker (default 10, 0 disables)
+    MODEL_REGISTRY_CONFIG    A/B arms to serve next to the primary model (default model_registry.json,
+                             reloaded by every worker when it changes)
+    MODEL_SHADOW_PATH        candidate artifact shadow scored on live traffic (default: none)
+"""
+
+import gc
+import importlib
+import multiprocessing
+import os
+import random
+
+
+def _cpu_count():
+    """CPUs this process may run on (respects container CPU affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Scoring takes microseconds, so a request is dominated by Flask and the GIL: scale with
+# processes, and keep a couple of threads per worker to overlap socket I/O
+workers = _env_int('WEB_CONCURRENCY', min(2 * _cpu_count() + 1, _env_int('GUNICORN_MAX_WORKERS', 8)))
+threads = _env_int('GUNICORN_THREADS', 2)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Load the app and model in the master so workers share them copy-on-write
+preload_app = True
+
+# Recycle workers to cap slow memory growth; the jitter keeps them from restarting together
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = max(max_requests // 10, 1) if max_requests else 0
+
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+loglevel = 'info'
+
+
+def when_ready(server):
+    """Warm the model in the master before the first worker is forked"""
+    if not server.cfg.preload_app:
+        return
+
+    # The module of the app being served (`app_simple:app` -> app_simple, from the command line
+    # or the wsgi_app setting), already imported by preload_app; apps without a warmup_model()
+    # only get the primary model warmed
+    module = importlib.import_module(server.app.app_uri.split(':')[0])
+    if hasattr(module, 'warmup_model'):
+        module.warmup_model()
+    else:
+        import model
+        model.warmup()
+
+    # Objects loaded so far live as long as the master; keep the GC from writing to them
+    gc.freeze()
+    server.log.info(f"Model preloaded in master, {workers} workers x {threads} threads")
+
+
+def post_fork(server, worker):
+    """Per-worker state: own random state, and a model watcher thread (threads do not survive fork)"""
+    random.seed()
+
+    import numpy as np
+    np.random.seed()
+
+    from model import handle
+    handle.start_watching()
+
+    # The A/B config file, and the artifacts of arms other than the primary model
+    from registry import registry
+    registry.start_watching()
+
+    # Shadow scoring thread, fed by this worker's /predict calls
+    from shadow import shadow
+    shadow.start()
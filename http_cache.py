@@ -0,0 +1,82 @@
+"""
+Conditional GET for endpoints whose responses only change with the dataset or the model.
+
+Each such endpoint names the state its body is built from: the dataset's SHA-256 (see
+dataset.py) or the served model's content hash (see artifacts.py). The strong ETag is
+derived from those hashes alone, so it is computed without building the response. A
+request whose If-None-Match matches (or, without one, whose If-Modified-Since is not
+older than the state) gets an empty 304. Nothing is parsed, scored or serialized for it.
+
+Responses carry `Cache-Control: no-cache`: clients may keep them but revalidate on every
+use, which costs one 304 while the dataset and model stay the same.
+
+Requests and 304s are counted per endpoint (per worker process); /api/http-cache reports
+the hit ratios.
+"""
+
+import hashlib
+import threading
+from email.utils import formatdate
+
+from flask import current_app, request
+
+CACHE_CONTROL = 'no-cache'
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def make_etag(*parts):
+    """Strong ETag (quoted) for a response built from the given version hashes and settings"""
+    digest = hashlib.sha256('\0'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _record(endpoint, hit):
+    with _stats_lock:
+        stats = _stats.setdefault(endpoint, {'requests': 0, 'not_modified': 0})
+        stats['requests'] += 1
+        stats['not_modified'] += hit
+
+
+def is_fresh(etag, modified=None):
+    """True if the client's cached copy (If-None-Match / If-Modified-Since) is current"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag.strip('"'))
+    if modified is not None and request.if_modified_since is not None:
+        # HTTP dates have whole seconds
+        return int(modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def conditional(endpoint, etag, render, modified=None):
+    """Response for a GET: an empty 304 when the client is fresh, else render() with cache headers
+
+    `modified` is the Unix time the underlying state last changed (for Last-Modified).
+    """
+    fresh = is_fresh(etag, modified)
+    _record(endpoint, fresh)
+    if fresh:
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.make_response(render())
+        if response.status_code != 200:
+            return response
+
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    if modified is not None:
+        response.headers['Last-Modified'] = formatdate(int(modified), usegmt=True)
+    return response
+
+
+def http_cache_stats():
+    """Requests, 304s and hit ratio per endpoint in this process"""
+    with _stats_lock:
+        return {endpoint: dict(stats, hit_ratio=round(stats['not_modified'] / stats['requests'], 4))
+                for endpoint, stats in _stats.items()}
+
+
+def reset_http_cache_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -1,159 +1,122 @@
-import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, confusion_matrix, precision_score, recall_score, f1_score
-import pickle
+import fcntl
 import os
+import shutil
+import tempfile
+import threading
+import time
+
+from rules import RISK_TABLE, BucketLookup
+from forest import compile_forest, is_tree_ensemble
+from artifacts import (ARTIFACT_DIR, HEADER_FILE, ArrayScaler, artifact_exists, load_model_artifact,
+                       promote_artifact, read_header, save_model_artifact)
+from model_card import build_model_card, evaluate, read_model_card
+from calibration import Calibrator, fit_calibration
+from golden_set import read_golden_set, training_mask
+
+# pandas and sklearn are deliberately not imported here: serving only needs numpy, and
+# importing them would add most of a second to every worker's cold start
 
 # Global variables to store model and scaler
+# (mirrors of handle.current, kept for callers that read them directly; see ModelHandle)
 model = None
 scaler = None
 
+# Model and scaler compiled into a single scoring step (see compile_pipeline)
+pipeline = None
+
+# Labelled rows the rule model's probabilities are calibrated on (minus the golden set,
+# which every new model version is scored on before it is swapped in; see golden_set.py)
+RULE_CALIBRATION_DATASET = 'diabetes.csv'
+
+# How much golden set accuracy a reloaded version may lose against the active one (never
+# below the rule model's, see validate_version)
+GOLDEN_TOLERANCE = 0.05
+
+# Seconds between artifact checks in each worker (0 disables hot reload)
+RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 10))
+
+# Seconds taken by the last warmup() call
+warmup_seconds = None
+
 def create_synthetic_model():
     """Create a model based on medical knowledge rather than dataset dependency"""
-    global model, scaler
+    start = time.perf_counter()
     
     # Create a rule-based model that mimics medical knowledge
     # This doesn't rely on the original dataset but uses medical thresholds
     
     # Initialize scaler with known medical ranges
-    scaler = StandardScaler()
-    # Fit scaler with typical medical ranges
-    scaler.fit([
+    # (same mean and scale a StandardScaler fitted on these two rows would have)
+    ranges = np.array([
         [0, 70, 60, 10, 15, 18.5, 0.08, 21],    # Min values
         [17, 200, 120, 50, 846, 50, 2.5, 81]    # Max values
     ])
+    scaler = ArrayScaler(ranges.mean(axis=0), ranges.std(axis=0))
     
     # Create a simple rule-based predictor
     model = MedicalRuleBasedModel()
     
+    handle.swap(ModelVersion(model, scaler, 'synthetic', 'rules.py', start, rule_model_metadata(model)))
+    
     print("Synthetic medical model created successfully")
     return 0.75  # Estimated accuracy
 
+def rule_model_metadata(model):
+    """Metadata of the rule model: its calibration curve, when the calibration dataset is available"""
+    # The hand-set rule weights are calibrated on the labelled rows outside the golden set
+    metadata = {}
+    if os.path.exists(RULE_CALIBRATION_DATASET):
+        data = np.loadtxt(RULE_CALIBRATION_DATASET, delimiter=',', skiprows=1)
+        X, y = data[:, :-1], data[:, -1]
+        keep = training_mask(X, y)
+        metadata['calibration'] = fit_calibration(model.lookup.table.score(X[keep])[1], y[keep])
+    return metadata
+
+class RejectedVersionError(ValueError):
+    """A model version that loaded but failed validation on the golden set"""
+
 class MedicalRuleBasedModel:
     """Rule-based model using medical knowledge for diabetes prediction"""
     
+    # Thresholds (glucose >= 126, bmi >= 30, ...) are written in raw clinical units
+    expects_raw_features = True
+    
+    def __init__(self):
+        # Outputs for every combination of rule buckets, built once per model
+        self.lookup = BucketLookup(RISK_TABLE)
+    
+    def __getstate__(self):
+        # The lookup table is derived from rules.py, so pickles only record the class
+        return {}
+    
+    def __setstate__(self, state):
+        self.__init__()
+    
     def predict(self, X):
         """Predict diabetes risk based on medical rules"""
-        predictions = []
-        
-        for sample in X:
-            # Extract features
-            pregnancies, glucose, bp, skin_thickness, insulin, bmi, dpf, age = sample
-            
-            # Risk scoring based on medical knowledge
-            risk_score = 0
-            
-            # Glucose risk (most important factor)
-            if glucose >= 126:  # Diabetic range
-                risk_score += 4
-            elif glucose >= 100:  # Pre-diabetic range
-                risk_score += 2
-            elif glucose < 70:  # Hypoglycemic
-                risk_score += 1
-            
-            # BMI risk
-            if bmi >= 30:  # Obese
-                risk_score += 3
-            elif bmi >= 25:  # Overweight
-                risk_score += 1
-            
-            # Age risk
-            if age >= 45:
-                risk_score += 2
-            elif age >= 35:
-                risk_score += 1
-            
-            # Blood pressure risk
-            if bp >= 90:  # High BP
-                risk_score += 2
-            elif bp >= 80:  # Elevated BP
-                risk_score += 1
-            
-            # Family history (DPF)
-            if dpf >= 0.5:
-                risk_score += 2
-            elif dpf >= 0.3:
-                risk_score += 1
-            
-            # Insulin resistance
-            if insulin >= 200:
-                risk_score += 2
-            elif insulin >= 166:
-                risk_score += 1
-            
-            # Pregnancy history
-            if pregnancies >= 4:
-                risk_score += 1
-            
-            # Skin thickness (insulin resistance indicator)
-            if skin_thickness >= 35:
-                risk_score += 1
-            
-            # Final prediction based on total risk score
-            prediction = 1 if risk_score >= 6 else 0
-            predictions.append(prediction)
-        
-        return np.array(predictions)
+        return self.predict_with_proba(X)[0]
     
     def predict_proba(self, X):
         """Predict probability of diabetes"""
-        probabilities = []
-        
-        for sample in X:
-            pregnancies, glucose, bp, skin_thickness, insulin, bmi, dpf, age = sample
-            
-            # Calculate probability based on weighted risk factors
-            prob = 0.0
-            
-            # Glucose (40% weight)
-            if glucose >= 126:
-                prob += 0.4
-            elif glucose >= 100:
-                prob += 0.2
-            elif glucose < 70:
-                prob += 0.1
-            
-            # BMI (25% weight)
-            if bmi >= 30:
-                prob += 0.25
-            elif bmi >= 25:
-                prob += 0.15
-            
-            # Age (15% weight)
-            if age >= 45:
-                prob += 0.15
-            elif age >= 35:
-                prob += 0.08
-            
-            # Blood pressure (10% weight)
-            if bp >= 90:
-                prob += 0.1
-            elif bp >= 80:
-                prob += 0.05
-            
-            # Family history (5% weight)
-            if dpf >= 0.5:
-                prob += 0.05
-            elif dpf >= 0.3:
-                prob += 0.025
-            
-            # Other factors (5% weight total)
-            if insulin >= 200:
-                prob += 0.02
-            if pregnancies >= 4:
-                prob += 0.015
-            if skin_thickness >= 35:
-                prob += 0.015
-            
-            # Ensure probability is between 0 and 1
-            prob = min(max(prob, 0.05), 0.95)  # Keep between 5% and 95%
-            
-            probabilities.append([1-prob, prob])
+        prob = self.predict_with_proba(X)[1]
+        return np.column_stack([1 - prob, prob])
+    
+    def predict_with_proba(self, X):
+        """Predict class and probability of diabetes in a single pass over the rules
         
-        return np.array(probabilities)
+        Returns (predictions, probabilities) where probabilities is the positive-class column.
+        """
+        # Rows are bucketed with one searchsorted per feature, then read from the precomputed cells
+        return self.lookup.lookup_many(X)
+    
+    def predict_one(self, features):
+        """Predict class and probability of diabetes for a single row of raw features"""
+        return self.lookup.lookup_one(features)
+    
+    def contributions(self, X):
+        """Exact per-feature probability contributions (see RuleTable.contributions)"""
+        return self.lookup.table.contributions(X)
     
     @property
     def feature_importances_(self):
@@ -171,20 +134,17 @@ class MedicalRuleBasedModel:
 
 def load_model():
     """Load the trained model and scaler"""
-    global model, scaler
-    
-    # Try to load existing model first
+    # Try to load the memory-mapped model artifact first
     try:
-        if os.path.exists('diabetes_model.pkl') and os.path.exists('scaler.pkl'):
-            with open('diabetes_model.pkl', 'rb') as f:
-                model = pickle.load(f)
-            print("Model loaded successfully")
-            
-            with open('scaler.pkl', 'rb') as f:
-                scaler = pickle.load(f)
-            print("Scaler loaded successfully")
+        if artifact_exists(handle.path):
+            # Validated like a reload, so a bad artifact on disk is never served
+            version = handle.load(validate=True)
+            print(f"Model artifact loaded successfully (version {version.version[:12]})")
             return True
+        if os.path.exists('diabetes_model.pkl'):
+            print("Found diabetes_model.pkl; pickles are no longer loaded, convert them with: python artifacts.py")
     except Exception as e:
+        handle.last_error = str(e)
         print(f"Error loading saved model: {e}")
     
     # If loading fails, create synthetic model
@@ -192,28 +152,407 @@ def load_model():
     create_synthetic_model()
     return True
 
-def predict_diabetes(features):
-    """Predict diabetes using user input features"""
-    global model, scaler
+def predict_with_proba(model, X):
+    """Predict class and positive-class probability with a single model traversal"""
+    if hasattr(model, 'predict_with_proba'):
+        return model.predict_with_proba(X)
+    
+    # Estimators such as RandomForestClassifier derive predict() from predict_proba(),
+    # so take the argmax here instead of walking every tree a second time
+    proba = model.predict_proba(X)
+    return model.classes_[np.argmax(proba, axis=1)], proba[:, 1]
+
+class ScoringPipeline:
+    """Model, scaler and calibration compiled once at load time into a single scoring step
+    
+    With a calibrator (see calibration.py) the class is taken from the calibrated
+    probability, so a prediction never disagrees with the probability served with it.
+    """
+    
+    def __init__(self, model, mean=None, scale=None, calibrator=None):
+        self.model = model
+        self.mean = mean
+        self.scale = scale
+        self.calibrator = calibrator
+    
+    def score_many(self, rows):
+        """Return (predictions, probabilities) for a batch of raw feature rows"""
+        X = np.atleast_2d(np.asarray(rows, dtype=float))
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        predictions, probabilities = predict_with_proba(self.model, X)
+        if self.calibrator is not None:
+            predictions, probabilities = self.calibrator.classify(probabilities)
+        return predictions, probabilities
+    
+    def score_one(self, features):
+        """Return (prediction, probability) for a single raw feature row"""
+        if self.mean is None and hasattr(self.model, 'predict_one'):
+            prediction, probability = self.model.predict_one(features)
+            if self.calibrator is not None:
+                prediction, probability = self.calibrator.classify_one(probability)
+            return prediction, probability
+        
+        predictions, probabilities = self.score_many(features)
+        return predictions[0], probabilities[0]
+    
+    def explain_many(self, rows):
+        """Return (bias, contributions) for a batch of raw feature rows
+        
+        contributions has one column per feature and bias + contributions.sum(axis=1) is
+        the positive-class probability of every row.
+        """
+        if not hasattr(self.model, 'contributions'):
+            raise ValueError(f"{type(self.model).__name__} does not support per-prediction explanations")
+        
+        X = np.atleast_2d(np.asarray(rows, dtype=float))
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        bias, contributions = self.model.contributions(X)
+        
+        if self.calibrator is not None:
+            # Calibration moves the probability as a whole, so its shift goes into the bias
+            raw = bias + contributions.sum(axis=1)
+            bias = bias + self.calibrator.apply(raw) - raw
+        return bias, contributions
+
+def compile_pipeline(model, scaler, calibration=None):
+    """Compile the model, scaler and calibration curve (metadata['calibration']) into a ScoringPipeline
+    
+    Rule models read raw clinical units, so the scaler is skipped for them entirely and
+    requests are scored without any transform. Tree ensembles are flattened with the scaler
+    folded into their split thresholds, so they also score raw rows directly. Other
+    estimators keep the scaler, applied from its precomputed mean and scale instead of
+    going through scaler.transform.
+    """
+    calibrator = None if calibration is None else Calibrator.from_metadata(calibration)
     
-    # Ensure model is loaded
-    if model is None or scaler is None:
+    if is_tree_ensemble(model):
+        return ScoringPipeline(compile_forest(model, scaler), calibrator=calibrator)
+    
+    if scaler is None or getattr(model, 'expects_raw_features', False):
+        return ScoringPipeline(model, calibrator=calibrator)
+    
+    return ScoringPipeline(model, np.asarray(scaler.mean_, dtype=float), np.asarray(scaler.scale_, dtype=float),
+                           calibrator)
+
+class ModelVersion:
+    """One loaded model with its scaler, compiled pipeline and provenance"""
+    
+    def __init__(self, model, scaler, version, source, started=None, metadata=None, card=None):
+        self.model = model
+        self.scaler = scaler
+        self.metadata = metadata or {}
+        self.pipeline = compile_pipeline(model, scaler, self.metadata.get('calibration'))
+        self.version = version
+        self.source = source
+        
+        golden = score_golden_set(self)
+        self.golden_accuracy = None if golden is None else round(golden['accuracy'], 4)
+        
+        # Versions published without a model card get one built from the golden set evaluation
+        if card is None and golden is not None:
+            samples = {'total': golden['rows'], 'training': None, 'test': golden['rows']}
+            card = build_model_card(model, golden, samples, version=version, source='golden_set')
+        self.card = card
+        self.loaded_at = time.time()
+        self.load_seconds = None if started is None else time.perf_counter() - started
+    
+    def info(self):
+        return {
+            'version': self.version,
+            'source': self.source,
+            'model_type': type(self.model).__name__,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.loaded_at)),
+            'load_time_ms': None if self.load_seconds is None else round(self.load_seconds * 1000, 2),
+            'golden_accuracy': self.golden_accuracy,
+            'card_source': None if self.card is None else self.card['source'],
+            'calibration': self.calibration_info(),
+            # Written by model_old.train_model: cache key, hyperparameters, metrics, training time
+            'training': self.metadata.get('training')
+        }
+
+    def calibration_info(self):
+        """Method and fit quality of the version's calibration curve (None when uncalibrated)"""
+        calibration = self.metadata.get('calibration')
+        if calibration is None:
+            return None
+        return {name: calibration.get(name) for name in ('method', 'rows', 'brier_before', 'brier_after', 'fitted_at')}
+
+class ModelHandle:
+    """The active ModelVersion, swapped atomically when the model artifact changes
+    
+    Requests read `handle.current` once and score with that version, so a reload only
+    replaces the reference: in-flight calls finish on the version they started with and
+    later calls see the new one. A watcher thread polls the artifact header (replaced last
+    by artifacts.write_artifact) and loads, validates and swaps new versions off the
+    request path. Versions that fail validation are logged and never served.
+    """
+    
+    def __init__(self, path=ARTIFACT_DIR):
+        self.path = path
+        self.current = None
+        self.reloads = 0
+        self.last_error = None
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+    
+    def _header_stamp(self):
+        try:
+            stat = os.stat(os.path.join(self.path, HEADER_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def swap(self, version):
+        """Make `version` the active model (a single reference assignment)"""
+        global model, scaler, pipeline
+        
+        self.current = version
+        if self is handle:
+            model, scaler, pipeline = version.model, version.scaler, version.pipeline
+    
+    def load(self, validate=False):
+        """Load the artifact, optionally validate it (see validate_version), and swap it in"""
+        with self._lock:
+            stamp = self._header_stamp()
+            start = time.perf_counter()
+            loaded_model, loaded_scaler, header = load_model_artifact(self.path)
+            try:
+                version = ModelVersion(loaded_model, loaded_scaler, header['content_hash'], self.path, start,
+                                       header['metadata'], read_model_card(self.path, header['content_hash']))
+                if validate:
+                    validate_version(version, self.current)
+            except RejectedVersionError:
+                # Rejected for its content: not tried again until the artifact changes
+                self._stamp = stamp
+                raise
+            
+            self.swap(version)
+            self._stamp = stamp
+        
+        return version
+    
+    def check(self):
+        """Reload if the artifact changed since the last check; returns True when a new version was swapped in"""
+        stamp = self._header_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        
+        if self.current is not None and read_header(self.path)['content_hash'] == self.current.version:
+            # Rewritten with identical content
+            self._stamp = stamp
+            return False
+        
+        try:
+            version = self.load(validate=True)
+        except Exception as e:
+            # A rejected version keeps its stamp (see load); read errors, e.g. from an artifact
+            # being replaced, are retried on the next poll and reported once
+            if str(e) != self.last_error:
+                print(f"Model reload rejected, keeping version {self.current.version[:12] if self.current else None}: {e}")
+            self.last_error = str(e)
+            return False
+        
+        self.reloads += 1
+        self.last_error = None
+        print(f"Model reloaded: version {version.version[:12]} in {version.load_seconds * 1000:.1f} ms")
+        return True
+    
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Error checking model artifact: {e}")
+    
+    def start_watching(self, interval=None):
+        """Poll the artifact from a background thread (call once per process, after forking)"""
+        interval = RELOAD_INTERVAL if interval is None else interval
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return self._watcher
+        
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name='model-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+    
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+    
+    def info(self):
+        """Active version and reload state for /model-info"""
+        return {
+            'active': None if self.current is None else self.current.info(),
+            'watching': self._watcher is not None and self._watcher.is_alive(),
+            'reloads': self.reloads,
+            'last_error': self.last_error
+        }
+
+# The model every request is scored with
+handle = ModelHandle(ARTIFACT_DIR)
+
+_golden_set = None
+
+def load_golden_set():
+    """Return (X, y) of the golden set (see golden_set.py), or None when it is not available"""
+    global _golden_set
+    
+    if _golden_set is None:
+        _golden_set = read_golden_set()
+    return _golden_set
+
+def score_golden_set(version):
+    """Evaluation (see model_card.evaluate) of a freshly loaded version on the golden set (None without one)"""
+    golden = load_golden_set()
+    if golden is None:
+        return None
+    
+    X, y = golden
+    predictions, probabilities = version.pipeline.score_many(X)
+    
+    # The version has not served traffic yet; golden rows must not show up as risk cell hits
+    if hasattr(version.model, 'lookup'):
+        version.model.lookup.reset_hits()
+    
+    probabilities = np.asarray(probabilities, dtype=float)
+    if len(predictions) != len(y) or not np.all(np.isfinite(probabilities)) \
+            or probabilities.min() < 0 or probabilities.max() > 1 or not np.isin(predictions, (0, 1)).all():
+        raise RejectedVersionError(f"Model version {version.version[:12]} produced invalid golden set outputs")
+    return dict(evaluate(y, predictions, probabilities), rows=len(y))
+
+_baseline = None
+
+def baseline_version():
+    """The rule model as served without an artifact; its golden set accuracy is the floor for every version"""
+    global _baseline
+    
+    if _baseline is None:
+        rules = MedicalRuleBasedModel()
+        _baseline = ModelVersion(rules, None, 'baseline', 'rules.py', metadata=rule_model_metadata(rules))
+    return _baseline
+
+def validate_version(candidate, active=None):
+    """Raise RejectedVersionError if the candidate is clearly worse than the active version on the golden set
+    
+    Every candidate must also reach the rule model's golden set accuracy. That floor never
+    moves, so a run of versions that each lose a little against the one before cannot
+    drift below the model served when there is no artifact at all.
+    """
+    if candidate.golden_accuracy is None:
+        return
+    
+    floor = baseline_version().golden_accuracy
+    if floor is not None and candidate.golden_accuracy < floor:
+        raise RejectedVersionError(f"golden set accuracy {candidate.golden_accuracy:.3f} is below the rule model's "
+                                   f"{floor:.3f}")
+    
+    if active is not None and active.golden_accuracy is not None \
+            and candidate.golden_accuracy < active.golden_accuracy - GOLDEN_TOLERANCE:
+        raise RejectedVersionError(f"golden set accuracy {candidate.golden_accuracy:.3f} is below the active "
+                                   f"version's {active.golden_accuracy:.3f} minus the {GOLDEN_TOLERANCE} tolerance")
+
+_publish_lock = threading.Lock()
+
+def publish_version(save, path=ARTIFACT_DIR):
+    """Publish a new model version to the artifact at `path` only if it passes validation
+    
+    save(staging_path) writes the candidate artifact. It is written to a staging directory
+    next to `path`, loaded, validated against the version published at `path` (see
+    validate_version) and only then promoted into `path`. Raises RejectedVersionError and
+    leaves `path` untouched when the candidate fails. Returns the published header.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    # One publish at a time per artifact, across threads and processes, so a candidate is
+    # never promoted over a version it was not validated against
+    with _publish_lock, open(f"{os.path.abspath(path)}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        staging = tempfile.mkdtemp(prefix=f"{os.path.basename(os.path.abspath(path))}.staging-", dir=parent)
+        try:
+            save(staging)
+            candidate = ModelHandle(staging).load()
+            active = None
+            if artifact_exists(path):
+                try:
+                    active = ModelHandle(path).load()
+                except Exception as e:
+                    print(f"Published model at {path} does not load, validating against the rule model: {e}")
+            validate_version(candidate, active)
+            header = promote_artifact(staging, path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    print(f"Model version {header['content_hash'][:12]} published to {path} "
+          f"(golden set accuracy {candidate.golden_accuracy})")
+    return header
+
+def active_version():
+    """The version to score one request with; read once so a swap cannot split a request"""
+    version = handle.current
+    if version is None:
         load_model()
+        version = handle.current
+    
+    return version
+
+def get_model():
+    """Return the active model, loading it on first use"""
+    return active_version().model
+
+def get_algorithm_name(model):
+    """Human readable name of a model, as the /model-info endpoints report it"""
+    if hasattr(model, 'partial_fit'):
+        return 'Online Logistic Regression'
+    return 'Random Forest' if hasattr(model, 'n_estimators') else 'Medical Rule-Based Model'
+
+def get_model_card():
+    """Return the active version's model card (precomputed, see model_card.py)"""
+    return active_version().card
+
+def warmup():
+    """Load the model ahead of the first request and report how long it took
     
-    # Prepare the input
-    features_array = np.array(features).reshape(1, -1)
+    Returns the model accuracy estimate, like train_model().
+    """
+    global warmup_seconds
     
-    # Scale the features
-    if scaler is not None:
-        features_scaled = scaler.transform(features_array)
-    else:
-        features_scaled = features_array
+    start = time.perf_counter()
+    accuracy = train_model()
     
-    # Make prediction
-    prediction = model.predict(features_scaled)[0]
-    probability = model.predict_proba(features_scaled)[0][1]
+    # Score one row so memory-mapped forest arrays and the NumPy code paths are paged in.
+    # Rule lookups are built in memory at load time and would only count a spurious hit.
+    version = handle.current
+    if not hasattr(version.model, 'lookup'):
+        version.pipeline.score_many(np.zeros((1, 8)))
     
-    return prediction, probability
+    warmup_seconds = time.perf_counter() - start
+    print(f"Model warmed up in {warmup_seconds * 1000:.1f} ms")
+    return accuracy
+
+def predict_diabetes_many(rows):
+    """Predict diabetes for a batch of feature rows in one pass"""
+    return active_version().pipeline.score_many(rows)
+
+def predict_diabetes(features):
+    """Predict diabetes using user input features"""
+    return active_version().pipeline.score_one(features)
+
+def explain_diabetes_many(rows):
+    """Per-feature probability contributions for a batch of rows: (bias, contributions)"""
+    return active_version().pipeline.explain_many(rows)
+
+def explain_diabetes(features):
+    """Per-feature probability contributions for a single row: (bias, contributions)"""
+    bias, contributions = explain_diabetes_many(features)
+    return float(bias[0]), contributions[0]
 
 def train_model():
     """Initialize the model (no dataset dependency)"""
@@ -232,18 +571,11 @@ def train_model():
         return create_synthetic_model()
 
 def save_model():
-    """Save the current model and scaler"""
+    """Save the current model and scaler as a model artifact"""
     global model, scaler
     
     try:
-        with open('diabetes_model.pkl', 'wb') as f:
-            pickle.dump(model, f)
-        with open('scaler.pkl', 'wb') as f:
-            pickle.dump(scaler, f)
-        print("Model and scaler saved successfully")
+        header = save_model_artifact(model, scaler, ARTIFACT_DIR)
+        print(f"Model and scaler saved successfully (version {header['content_hash'][:12]})")
     except Exception as e:
         print(f"Error saving model: {e}")
-
-# Initialize the model when module is imported
-if model is None or scaler is None:
-    load_model()
@@ -0,0 +1,146 @@
+"""
+Model card: everything the info and metrics endpoints report about a model version,
+computed once when the model is trained and stored as a JSON sidecar of the artifact:
+
+    model_artifact/
+        header.json
+        model_card.json    metrics, confusion matrix, ROC points, feature importances,
+                           sample counts, dataset hash; tied to the artifact's content hash
+
+The card is written with the artifact (artifacts.write_artifact sidecars, stamped with the
+artifact's content hash). The serving process reads it once per model version and answers
+from memory.
+Metrics are computed with numpy so the card can also be built at load time (on the
+golden set) for models that were published without one, without importing sklearn.
+"""
+
+import datetime
+import json
+import os
+
+import numpy as np
+
+MODEL_CARD_FILE = 'model_card.json'
+
+FEATURE_NAMES = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+                 'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
+
+# ROC curves are thinned to at most this many points
+ROC_POINTS = 101
+
+
+def _safe_divide(numerator, denominator):
+    return float(numerator) / float(denominator) if denominator else 0.0
+
+
+def roc_curve(y_true, y_prob, max_points=ROC_POINTS):
+    """(fpr, tpr, thresholds, auc) of the positive class, thinned to max_points"""
+    y_true = np.asarray(y_true, dtype=int)
+    y_prob = np.asarray(y_prob, dtype=float)
+
+    order = np.argsort(-y_prob, kind='stable')
+    y_prob, y_true = y_prob[order], y_true[order]
+
+    # One point per distinct score, as sklearn.metrics.roc_curve does
+    last_of_run = np.r_[np.flatnonzero(np.diff(y_prob)), len(y_prob) - 1]
+    tps = np.cumsum(y_true)[last_of_run]
+    fps = (last_of_run + 1) - tps
+
+    tpr = np.r_[0.0, tps / max(tps[-1], 1)]
+    fpr = np.r_[0.0, fps / max(fps[-1], 1)]
+    thresholds = np.r_[np.inf, y_prob[last_of_run]]
+    auc = float(np.trapezoid(tpr, fpr)) if hasattr(np, 'trapezoid') else float(np.trapz(tpr, fpr))
+
+    if len(fpr) > max_points:
+        keep = np.unique(np.linspace(0, len(fpr) - 1, max_points).round().astype(int))
+        fpr, tpr, thresholds = fpr[keep], tpr[keep], thresholds[keep]
+
+    return fpr, tpr, thresholds, auc
+
+
+def evaluate(y_true, y_pred, y_prob=None):
+    """Metrics, classification report, confusion matrix and ROC points for one evaluation"""
+    y_true = np.asarray(y_true, dtype=int)
+    y_pred = np.asarray(y_pred, dtype=int)
+
+    cm = np.zeros((2, 2), dtype=int)
+    np.add.at(cm, (y_true, y_pred), 1)
+
+    # classification_report(output_dict=True) layout
+    report = {}
+    for label in (0, 1):
+        true_positive = cm[label, label]
+        precision = _safe_divide(true_positive, cm[:, label].sum())
+        recall = _safe_divide(true_positive, cm[label, :].sum())
+        report[str(label)] = {
+            'precision': precision,
+            'recall': recall,
+            'f1-score': _safe_divide(2 * precision * recall, precision + recall),
+            'support': int(cm[label, :].sum())
+        }
+    support = np.array([report[label]['support'] for label in ('0', '1')])
+    report['accuracy'] = _safe_divide(np.trace(cm), cm.sum())
+    for average, weights in (('macro avg', np.ones(2)), ('weighted avg', support)):
+        report[average] = {
+            metric: _safe_divide(sum(report[label][metric] * weight for label, weight in zip(('0', '1'), weights)),
+                                 weights.sum())
+            for metric in ('precision', 'recall', 'f1-score')
+        }
+        report[average]['support'] = int(support.sum())
+
+    evaluation = {
+        'accuracy': report['accuracy'],
+        'precision': report['1']['precision'],
+        'recall': report['1']['recall'],
+        'f1_score': report['1']['f1-score'],
+        'classification_report': report,
+        'confusion_matrix': cm.tolist()
+    }
+
+    if y_prob is not None:
+        fpr, tpr, thresholds, auc = roc_curve(y_true, y_prob)
+        evaluation['roc_auc'] = auc
+        evaluation['roc_curve'] = {
+            'fpr': fpr.round(6).tolist(),
+            'tpr': tpr.round(6).tolist(),
+            # JSON has no infinity; the first point (nothing predicted positive) gets null
+            'thresholds': [None if np.isinf(t) else round(float(t), 6) for t in thresholds]
+        }
+
+    return evaluation
+
+
+def build_model_card(model, evaluation, samples, version=None, dataset_sha256=None, source='training',
+                     params=None, training_seconds=None):
+    """Assemble a model card from an evaluation (see evaluate) and the model itself"""
+    importances = getattr(model, 'feature_importances_', None)
+    return {
+        'model_version': version,
+        'model_type': type(model).__name__,
+        'source': source,
+        'created': datetime.datetime.now().isoformat(),
+        'dataset_sha256': dataset_sha256,
+        'samples': samples,
+        'params': params or {},
+        'training_seconds': training_seconds,
+        'metrics': {name: evaluation[name] for name in ('accuracy', 'precision', 'recall', 'f1_score', 'roc_auc')
+                    if name in evaluation},
+        'classification_report': evaluation['classification_report'],
+        'confusion_matrix': evaluation['confusion_matrix'],
+        'roc_curve': evaluation.get('roc_curve'),
+        'feature_names': FEATURE_NAMES,
+        'feature_importance': None if importances is None else np.asarray(importances, dtype=float).tolist()
+    }
+
+
+def read_model_card(path, version=None):
+    """The card stored next to the artifact in `path`, or None if missing or for another version"""
+    try:
+        with open(os.path.join(path, MODEL_CARD_FILE), 'r') as f:
+            card = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if version is not None and card.get('model_version') != version:
+        return None
+    return card
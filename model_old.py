@@ -3,298 +3,125 @@ import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, confusion_matrix, precision_score, recall_score, f1_score
-import pickle
-import os
+
+from forest import compile_forest
+from artifacts import ARTIFACT_DIR, artifact_exists, load_model_artifact, save_model_artifact
+from calibration import fit_calibration
+from golden_set import golden_set_sha256, training_mask
+from model import predict_with_proba, publish_version
+from model_card import MODEL_CARD_FILE, build_model_card, evaluate, read_model_card
+from training_cache import cached_training
 
 # Global variables to store model and scaler
 model = None
 scaler = None
 
-def create_synthetic_model():
-    """Create a model based on medical knowledge rather than dataset dependency"""
-    global model, scaler
-    
-    # Create a rule-based model that mimics medical knowledge
-    # This doesn't rely on the original dataset but uses medical thresholds
-    
-    # Initialize scaler with known medical ranges
-    scaler = StandardScaler()
-    # Fit scaler with typical medical ranges
-    scaler.fit([
-        [0, 70, 60, 10, 15, 18.5, 0.08, 21],    # Min values
-        [17, 200, 120, 50, 846, 50, 2.5, 81]    # Max values
-    ])
-    
-    # Create a simple rule-based predictor
-    model = MedicalRuleBasedModel()
-    
-    print("Synthetic medical model created successfully")
-    return 0.75  # Estimated accuracy
+# Model card of the loaded model (see model_card.py)
+model_card = None
 
-class MedicalRuleBasedModel:
-    """Rule-based model using medical knowledge for diabetes prediction"""
-    
-    def predict(self, X):
-        """Predict diabetes risk based on medical rules"""
-        predictions = []
-        
-        for sample in X:
-            # Extract features
-            pregnancies, glucose, bp, skin_thickness, insulin, bmi, dpf, age = sample
-            
-            # Risk scoring based on medical knowledge
-            risk_score = 0
-            
-            # Glucose risk (most important factor)
-            if glucose >= 126:  # Diabetic range
-                risk_score += 4
-            elif glucose >= 100:  # Pre-diabetic range
-                risk_score += 2
-            elif glucose < 70:  # Hypoglycemic
-                risk_score += 1
-            
-            # BMI risk
-            if bmi >= 30:  # Obese
-                risk_score += 3
-            elif bmi >= 25:  # Overweight
-                risk_score += 1
-            
-            # Age risk
-            if age >= 45:
-                risk_score += 2
-            elif age >= 35:
-                risk_score += 1
-            
-            # Blood pressure risk
-            if bp >= 90:  # High BP
-                risk_score += 2
-            elif bp >= 80:  # Elevated BP
-                risk_score += 1
-            
-            # Family history (DPF)
-            if dpf >= 0.5:
-                risk_score += 2
-            elif dpf >= 0.3:
-                risk_score += 1
-            
-            # Insulin resistance
-            if insulin >= 200:
-                risk_score += 2
-            elif insulin >= 166:
-                risk_score += 1
-            
-            # Pregnancy history
-            if pregnancies >= 4:
-                risk_score += 1
-            
-            # Skin thickness (insulin resistance indicator)
-            if skin_thickness >= 35:
-                risk_score += 1
-            
-            # Final prediction based on total risk score
-            prediction = 1 if risk_score >= 6 else 0
-            predictions.append(prediction)
-        
-        return np.array(predictions)
-    
-    def predict_proba(self, X):
-        """Predict probability of diabetes"""
-        probabilities = []
-        
-        for sample in X:
-            pregnancies, glucose, bp, skin_thickness, insulin, bmi, dpf, age = sample
-            
-            # Calculate probability based on weighted risk factors
-            prob = 0.0
-            
-            # Glucose (40% weight)
-            if glucose >= 126:
-                prob += 0.4
-            elif glucose >= 100:
-                prob += 0.2
-            elif glucose < 70:
-                prob += 0.1
-            
-            # BMI (25% weight)
-            if bmi >= 30:
-                prob += 0.25
-            elif bmi >= 25:
-                prob += 0.15
-            
-            # Age (15% weight)
-            if age >= 45:
-                prob += 0.15
-            elif age >= 35:
-                prob += 0.08
-            
-            # Blood pressure (10% weight)
-            if bp >= 90:
-                prob += 0.1
-            elif bp >= 80:
-                prob += 0.05
-            
-            # Family history (5% weight)
-            if dpf >= 0.5:
-                prob += 0.05
-            elif dpf >= 0.3:
-                prob += 0.025
-            
-            # Other factors (5% weight total)
-            if insulin >= 200:
-                prob += 0.02
-            if pregnancies >= 4:
-                prob += 0.015
-            if skin_thickness >= 35:
-                prob += 0.015
-            
-            # Ensure probability is between 0 and 1
-            prob = min(max(prob, 0.05), 0.95)  # Keep between 5% and 95%
-            
-            probabilities.append([1-prob, prob])
-        
-        return np.array(probabilities)
-    
-    @property
-    def feature_importances_(self):
-        """Return feature importances based on medical knowledge"""
-        return np.array([
-            0.05,  # Pregnancies
-            0.40,  # Glucose (most important)
-            0.10,  # Blood Pressure
-            0.03,  # Skin Thickness
-            0.07,  # Insulin
-            0.20,  # BMI
-            0.05,  # Diabetes Pedigree Function
-            0.10   # Age
-        ])
+# (model, flattened forest) used for per-prediction explanations (see explainable_model)
+explainer = None
 
-def load_model():
-    """Load the trained model and scaler"""
-    global model, scaler
-    
-    # Try to load existing model first
-    try:
-        if os.path.exists('diabetes_model.pkl') and os.path.exists('scaler.pkl'):
-            with open('diabetes_model.pkl', 'rb') as f:
-                model = pickle.load(f)
-            print("Model loaded successfully")
-            
-            with open('scaler.pkl', 'rb') as f:
-                scaler = pickle.load(f)
-            print("Scaler loaded successfully")
-            return True
-    except Exception as e:
-        print(f"Error loading saved model: {e}")
-    
-    # If loading fails, create synthetic model
-    print("Creating synthetic medical model...")
-    create_synthetic_model()
-    return True
+# Everything that determines the trained model; part of the training cache key
+TRAINING_PARAMS = {
+    'estimator': 'RandomForestClassifier',
+    'n_estimators': 100,
+    'random_state': 42,
+    'test_size': 0.2,
+    'split_random_state': 42
+}
 
-def predict_diabetes(features):
-    """Predict diabetes using user input features"""
-    global model, scaler
-    
-    # Ensure model is loaded
-    if model is None or scaler is None:
-        load_model()
-    
-    # Prepare the input
-    features_array = np.array(features).reshape(1, -1)
-    
-    # Scale the features
-    if scaler is not None:
-        features_scaled = scaler.transform(features_array)
+def load_model():
+    global model, scaler, model_card
+    if artifact_exists(ARTIFACT_DIR):
+        model, scaler, header = load_model_artifact(ARTIFACT_DIR)
+        model_card = read_model_card(ARTIFACT_DIR, header['content_hash'])
     else:
-        features_scaled = features_array
-    
-    # Make prediction
-    prediction = model.predict(features_scaled)[0]
-    probability = model.predict_proba(features_scaled)[0][1]
-    
-    return prediction, probability
-
-def train_model():
-    """Initialize the model (no dataset dependency)"""
-    global model, scaler
-    
-    try:
-        # Try to load existing model first
-        if load_model():
-            return 0.75  # Return estimated accuracy
-        else:
-            # Create synthetic model if no saved model exists
-            return create_synthetic_model()
-    except Exception as e:
-        print(f"Error in model initialization: {e}")
-        # Fallback to synthetic model
-        return create_synthetic_model()
-
-def save_model():
-    """Save the current model and scaler"""
-    global model, scaler
-    
-    try:
-        with open('diabetes_model.pkl', 'wb') as f:
-            pickle.dump(model, f)
-        with open('scaler.pkl', 'wb') as f:
-            pickle.dump(scaler, f)
-        print("Model and scaler saved successfully")
-    except Exception as e:
-        print(f"Error saving model: {e}")
-
-# Initialize the model when module is imported
-if model is None or scaler is None:
-    load_model()
-    except FileNotFoundError:
         print("Model files not found. Training new model...")
         train_model()
         load_model()
 
-def train_model():
-    global model, scaler
-    # Load the dataset
+def model_input(features_array):
+    """Rows in the units the loaded model expects (artifact forests read raw values)"""
+    if getattr(model, 'expects_raw_features', False):
+        return features_array
+    return scaler.transform(features_array)
+
+def fit_model():
+    """Train the model and scaler from diabetes.csv; returns (model, scaler, metrics)"""
+    # Load the dataset, without the rows held out as the golden set (see golden_set.py)
     data = pd.read_csv('diabetes.csv')
+    data = data[training_mask(data.drop('Outcome', axis=1).values, data['Outcome'].values)]
 
     # Separate features and target
     X = data.drop('Outcome', axis=1)
     y = data['Outcome']
 
     # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TRAINING_PARAMS['test_size'], random_state=TRAINING_PARAMS['split_random_state'])
 
     # Scale the features
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
 
-    # Train the model
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    # Train the model on all cores (n_jobs does not change the fitted trees)
+    model = RandomForestClassifier(n_estimators=TRAINING_PARAMS['n_estimators'],
+                                   random_state=TRAINING_PARAMS['random_state'], n_jobs=-1)
     model.fit(X_train_scaled, y_train)
 
-    # Calculate accuracy
-    accuracy = model.score(X_test_scaled, y_test)
+    # Evaluate once on the test split: metrics, report, confusion matrix and ROC points
+    y_prob = model.predict_proba(X_test_scaled)[:, 1]
+    metrics = evaluate(y_test.values, model.predict(X_test_scaled), y_prob)
+    metrics['samples'] = {
+        'total': int(len(X)),
+        'training': int(len(X_train)),
+        'test': int(len(X_test)),
+        'positive_rate': round(float(y.mean()), 4)
+    }
+    
+    # Forest probabilities on their own training rows are overconfident, so the calibration
+    # curve is fitted on the held-out split
+    metrics['calibration'] = fit_calibration(y_prob, y_test.values)
+    return model, scaler, metrics
+
+def train_model():
+    """Train (or reuse the cached training of) the model and publish it as the model artifact
     
-    # Get detailed metrics
-    y_pred = model.predict(X_test_scaled)
-    precision = precision_score(y_test, y_pred)
-    recall = recall_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred)
+    Published through model.publish_version (staged, validated on the golden set, promoted
+    under the publish lock); raises RejectedVersionError and leaves the artifact as it was
+    when the new model fails validation.
+    """
+    global model, scaler
+    
+    # Unchanged dataset and hyperparameters reuse the stored model, scaler and metrics
+    # The golden set decides which rows are trained on, so it is part of the key
+    params = dict(TRAINING_PARAMS, golden_set_sha256=golden_set_sha256())
+    model, scaler, training, hit = cached_training('diabetes.csv', params, fit_model)
+    metrics = training['metrics']
     
     print(f"Model Performance:")
-    print(f"Accuracy: {accuracy:.3f}")
-    print(f"Precision: {precision:.3f}")
-    print(f"Recall: {recall:.3f}")
-    print(f"F1-Score: {f1:.3f}")
+    print(f"Accuracy: {metrics['accuracy']:.3f}")
+    print(f"Precision: {metrics['precision']:.3f}")
+    print(f"Recall: {metrics['recall']:.3f}")
+    print(f"F1-Score: {metrics['f1_score']:.3f}")
 
-    # Save the model and scaler
-    with open('diabetes_model.pkl', 'wb') as f:
-        pickle.dump(model, f)
-    with open('scaler.pkl', 'wb') as f:
-        pickle.dump(scaler, f)
+    # The model card carries the full evaluation; the artifact header keeps the headline numbers
+    card = build_model_card(model, metrics, metrics['samples'], dataset_sha256=training['dataset_sha256'],
+                            params=training['params'], training_seconds=training['training_seconds'])
+    summary = dict(training, metrics=card['metrics'])
 
-    return accuracy
+    # Save the model and scaler as a memory-mappable artifact. The training metadata is the
+    # same on a hit and a miss, so republishing an unchanged model keeps its version.
+    metadata = {'training': summary, 'calibration': metrics['calibration']}
+    header = publish_version(lambda staging: save_model_artifact(model, scaler, staging, metadata=metadata,
+                                                                 sidecars={MODEL_CARD_FILE: card}), ARTIFACT_DIR)
+    
+    global model_card
+    model_card = dict(card, model_version=header['content_hash'])
+
+    return metrics['accuracy']
 
 def predict_diabetes(features):
     global model, scaler
@@ -304,83 +131,65 @@ def predict_diabetes(features):
         load_model()
 
     # Convert features to numpy array and reshape
-    features_array = np.array(features).reshape(1, -1)
+    features_array = np.array(features, dtype=float).reshape(1, -1)
 
-    # Scale the features
-    features_scaled = scaler.transform(features_array)
-
-    # Make prediction
-    prediction = model.predict(features_scaled)[0]
-    probability = model.predict_proba(features_scaled)[0][1]
+    # Make prediction (class and probability from one pass over the model)
+    predictions, probabilities = predict_with_proba(model, model_input(features_array))
+    prediction, probability = predictions[0], probabilities[0]
 
     return prediction, probability
 
 
 def get_model_metrics():
-    """Get comprehensive model performance metrics"""
-    # Load the dataset
-    data = pd.read_csv('diabetes.csv')
-    
-    # Separate features and target
-    X = data.drop('Outcome', axis=1)
-    y = data['Outcome']
-    
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Scale the features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    # Load the saved model
-    with open('diabetes_model.pkl', 'rb') as f:
-        model = pickle.load(f)
-    
-    # Make predictions
-    y_pred = model.predict(X_test_scaled)
-    
-    # Calculate metrics
-    accuracy = model.score(X_test_scaled, y_test)
-    precision = precision_score(y_test, y_pred)
-    recall = recall_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred)
-    
-    # Get classification report
-    report = classification_report(y_test, y_pred, output_dict=True)
-    
-    # Get confusion matrix
-    cm = confusion_matrix(y_test, y_pred)
+    """Get comprehensive model performance metrics (from the model card written at training time)"""
+    # Ensure model is loaded
+    if model is None or scaler is None:
+        load_model()
+    if model_card is None:
+        # Published without a card (e.g. converted from pickles): train, which writes one
+        train_model()
     
     return {
-        'accuracy': accuracy,
-        'precision': precision,
-        'recall': recall,
-        'f1_score': f1,
-        'classification_report': report,
-        'confusion_matrix': cm.tolist(),
-        'feature_importance': model.feature_importances_.tolist(),
-        'feature_names': ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 
-                         'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
+        'accuracy': model_card['metrics']['accuracy'],
+        'precision': model_card['metrics']['precision'],
+        'recall': model_card['metrics']['recall'],
+        'f1_score': model_card['metrics']['f1_score'],
+        'roc_auc': model_card['metrics'].get('roc_auc'),
+        'classification_report': model_card['classification_report'],
+        'confusion_matrix': model_card['confusion_matrix'],
+        'roc_curve': model_card['roc_curve'],
+        'feature_importance': model_card['feature_importance'],
+        'feature_names': model_card['feature_names'],
+        'samples': model_card['samples'],
+        'dataset_sha256': model_card['dataset_sha256']
     }
 
+def explainable_model():
+    """The loaded model as a FlatForest, flattened at most once per loaded model"""
+    global explainer
+    if explainer is None or explainer[0] is not model:
+        # Artifact forests are already flat; freshly trained ones get the scaler folded in
+        explainer = (model, model if hasattr(model, 'contributions') else compile_forest(model, scaler))
+    return explainer[1]
+
 def get_prediction_explanation(features):
     """Get detailed explanation of prediction"""
-    # Load the saved model and scaler
-    with open('diabetes_model.pkl', 'rb') as f:
-        model = pickle.load(f)
-    with open('scaler.pkl', 'rb') as f:
-        scaler = pickle.load(f)
+    # Ensure model is loaded
+    if model is None or scaler is None:
+        load_model()
     
     # Convert features to numpy array and reshape
-    features_array = np.array(features).reshape(1, -1)
+    features_array = np.array(features, dtype=float).reshape(1, -1)
     
-    # Scale the features
-    features_scaled = scaler.transform(features_array)
+    # Scaled values are reported from the scaler's mean and scale without a transform call
+    features_scaled = (features_array - scaler.mean_) / scaler.scale_
     
-    # Make prediction
-    prediction = model.predict(features_scaled)[0]
-    probabilities = model.predict_proba(features_scaled)[0]
+    # Make prediction and attribute it to the features (path attribution, see FlatForest.contributions)
+    forest = explainable_model()
+    rows = features_array if forest.expects_raw_features else features_scaled
+    prediction, probability = forest.predict_with_proba(rows)
+    bias, contributions = forest.contributions(rows)
+    probabilities = [1 - float(probability[0]), float(probability[0])]
     
     # Get feature importance
     feature_importance = model.feature_importances_
@@ -392,14 +201,16 @@ def get_prediction_explanation(features):
     for i, (name, value, importance) in enumerate(zip(feature_names, features, feature_importance)):
         feature_impact[name] = {
             'value': value,
-            'importance': importance,
-            'scaled_value': features_scaled[0][i]
+            'importance': float(importance),
+            'contribution': float(contributions[0][i]),
+            'scaled_value': float(features_scaled[0][i])
         }
     
     return {
-        'prediction': int(prediction),
+        'prediction': int(prediction[0]),
         'probability_no_diabetes': probabilities[0],
         'probability_diabetes': probabilities[1],
+        'base_probability': float(bias[0]),
         'feature_impact': feature_impact,
         'model_confidence': max(probabilities)
     }
@@ -0,0 +1,364 @@
+"""
+Incremental model updates from newly labelled records.
+
+The online model is a logistic regression trained by minibatch SGD on standardised
+features. Its scaler statistics are running ones: each update merges the new rows' mean
+and variance into the stored count, mean and variance, and the coefficients are
+re-expressed for the new scaler so the model scores every row exactly as before the
+merge. It then takes a few SGD passes over the new rows only, so an update costs
+O(new rows) no matter how many records came before.
+
+State is kept as a model artifact (kind 'linear', see artifacts.py):
+
+    online_model/
+        header.json          metadata['online']: rows seen, updates, last update time
+        coef-....npy         coefficients on standardised features
+        mean-....npy         running scaler mean and variance
+        var-....npy
+        ingested.csv         every record an update trained on, appended (for audits and full retrains)
+
+Ingested rows that are in the golden set are dropped before the update, so it stays held
+out. After an update the model is published to the serving artifact through
+model.publish_version: it is written to a staging directory, validated on the golden set
+against the published version and the rule model's fixed floor, and only promoted if it
+passes. Every worker's ModelHandle then picks it up and swaps it in. A serving model of
+another kind (a forest, or the rule model, which is served when there is no artifact) is
+never replaced by an update, only by `--replace` on the command line.
+
+POST /api/ingest is disabled unless MODEL_INGEST_TOKEN is set, and then needs it as a
+bearer token (see ingest_authorized).
+
+Bootstrap the online model from the dataset (less the golden set rows) once with:
+
+    python online.py --bootstrap diabetes.csv
+"""
+
+import argparse
+import datetime
+import fcntl
+import hmac
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from artifacts import ARTIFACT_DIR, artifact_exists, load_model_artifact, read_header, save_model_artifact
+from golden_set import training_mask
+from model import RejectedVersionError, publish_version
+
+ONLINE_DIR = 'online_model'
+INGEST_LOG = 'ingested.csv'
+
+# Dataset the online model is trained on when an update finds no online model yet
+BOOTSTRAP_DATASET = 'diabetes.csv'
+
+COLUMNS = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI',
+           'DiabetesPedigreeFunction', 'Age', 'Outcome']
+
+# SGD settings, stored with the model so an update continues with the same ones
+DEFAULT_PARAMS = {
+    'learning_rate': 0.05,  # step size at the first update, decayed as 1 / sqrt(1 + steps / 100)
+    'alpha': 1e-4,          # L2 penalty
+    'batch_size': 32,
+    'epochs': 5             # passes over the new rows per update
+}
+
+# Shared secret POST /api/ingest requires; unset (the default) disables the endpoint
+INGEST_TOKEN = os.environ.get('MODEL_INGEST_TOKEN')
+
+# Serialises updates between threads; the file lock in online_lock() does so between processes
+_update_lock = threading.Lock()
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -500, 500)))
+
+
+class OnlineLogisticModel:
+    """Logistic regression with running scaler statistics, updated with partial_fit()
+
+    Scores raw feature rows directly: the scaler is folded into raw-unit coefficients
+    whenever the model changes.
+    """
+
+    expects_raw_features = True
+
+    def __init__(self, n_features=8, coef=None, intercept=0.0, count=0, mean=None, var=None, steps=0,
+                 params=None):
+        self.n_features = int(n_features)
+        self.coef = np.zeros(n_features) if coef is None else np.array(coef, dtype=float)
+        self.intercept = float(intercept)
+        self.count = int(count)
+        self.mean = np.zeros(n_features) if mean is None else np.array(mean, dtype=float)
+        self.var = np.zeros(n_features) if var is None else np.array(var, dtype=float)
+        self.steps = int(steps)
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.classes_ = np.array([0, 1])
+        self._fold()
+
+    @property
+    def scale(self):
+        # Constant features keep a scale of 1, as StandardScaler does
+        return np.where(self.var > 0, np.sqrt(self.var), 1.0)
+
+    def _fold(self):
+        """Raw-unit coefficients: coef . (x - mean) / scale + intercept == raw_coef . x + raw_intercept"""
+        self.raw_coef = self.coef / self.scale
+        self.raw_intercept = self.intercept - float(self.raw_coef @ self.mean)
+        self._raw_coef = self.raw_coef.tolist()
+
+    @property
+    def feature_importances_(self):
+        """Absolute standardised coefficients, normalised to sum to 1"""
+        weights = np.abs(self.coef)
+        total = weights.sum()
+        return weights / total if total else np.full(self.n_features, 1.0 / self.n_features)
+
+    def partial_fit(self, X, y):
+        """Update the scaler statistics and coefficients with a batch of labelled rows"""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        y = np.asarray(y, dtype=float)
+        n = len(X)
+        if n == 0:
+            return self
+
+        # Merge the batch into the running mean and variance (Chan et al.)
+        total = self.count + n
+        delta = X.mean(axis=0) - self.mean
+        m2 = self.var * self.count + X.var(axis=0) * n + delta ** 2 * self.count * n / total
+        self.mean = self.mean + delta * n / total
+        self.var = m2 / total
+        self.count = total
+
+        # Same function under the new scaler: coef . (x - mean') / scale' + intercept
+        self.coef = self.raw_coef * self.scale
+        self.intercept = self.raw_intercept + float(self.raw_coef @ self.mean)
+
+        Z = (X - self.mean) / self.scale
+        batch_size = self.params['batch_size']
+        rng = np.random.default_rng(self.steps)
+        for _ in range(self.params['epochs']):
+            order = rng.permutation(n)
+            for start in range(0, n, batch_size):
+                rows = order[start:start + batch_size]
+                error = _sigmoid(Z[rows] @ self.coef + self.intercept) - y[rows]
+                rate = self.params['learning_rate'] / math.sqrt(1 + self.steps / 100)
+                self.coef -= rate * (Z[rows].T @ error / len(rows) + self.params['alpha'] * self.coef)
+                self.intercept -= rate * float(error.mean())
+                self.steps += 1
+
+        self._fold()
+        return self
+
+    def predict_with_proba(self, X):
+        """Predict class and positive-class probability for raw feature rows"""
+        z = np.atleast_2d(np.asarray(X, dtype=float)) @ self.raw_coef + self.raw_intercept
+        return (z > 0).astype(int), _sigmoid(z)
+
+    def predict_one(self, features):
+        """Predict class and probability for a single row of raw features"""
+        z = self.raw_intercept + sum(c * x for c, x in zip(self._raw_coef, features))
+        return int(z > 0), 1.0 / (1.0 + math.exp(-max(min(z, 500.0), -500.0)))
+
+    def predict_proba(self, X):
+        prob = self.predict_with_proba(X)[1]
+        return np.column_stack([1 - prob, prob])
+
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
+
+    def to_arrays(self):
+        """Arrays for the on-disk artifact format (see artifacts.py)"""
+        return {'coef': self.coef, 'mean': self.mean, 'var': self.var}
+
+    def metadata(self):
+        """JSON-serialisable fields needed to rebuild the model from its arrays"""
+        return {
+            'n_features': self.n_features,
+            'intercept': self.intercept,
+            'count': self.count,
+            'steps': self.steps,
+            'params': self.params
+        }
+
+    @classmethod
+    def from_sklearn(cls, model, scaler, count, params=None):
+        """Wrap a binary sklearn linear classifier fitted on StandardScaler output"""
+        return cls(n_features=len(scaler.mean_), coef=np.ravel(model.coef_), intercept=np.ravel(model.intercept_)[0],
+                   count=count, mean=scaler.mean_, var=scaler.var_, params=params)
+
+    @classmethod
+    def from_arrays(cls, arrays, metadata):
+        return cls(n_features=metadata['n_features'], coef=arrays['coef'], intercept=metadata['intercept'],
+                   count=metadata['count'], mean=arrays['mean'], var=arrays['var'], steps=metadata['steps'],
+                   params=metadata.get('params'))
+
+
+def parse_records(records):
+    """(X, y) from records given as dicts keyed by COLUMNS or as lists of 9 values"""
+    if not records:
+        raise ValueError("No records to ingest")
+
+    try:
+        rows = [[record[column] for column in COLUMNS] if isinstance(record, dict) else list(record)
+                for record in records]
+        data = np.array(rows, dtype=float)
+    except KeyError as e:
+        raise ValueError(f"Record is missing column {e}")
+    except (TypeError, ValueError):
+        raise ValueError(f"Records must have the {len(COLUMNS)} numeric columns {', '.join(COLUMNS)}")
+
+    if data.ndim != 2 or data.shape[1] != len(COLUMNS):
+        raise ValueError(f"Records must have the {len(COLUMNS)} numeric columns {', '.join(COLUMNS)}")
+    if not np.all(np.isfinite(data)):
+        raise ValueError("Records contain missing or non-finite values")
+    if not np.isin(data[:, -1], (0, 1)).all():
+        raise ValueError("Outcome must be 0 or 1")
+
+    return data[:, :-1], data[:, -1].astype(int)
+
+
+def ingest_authorized(authorization):
+    """Whether an Authorization header is "Bearer <INGEST_TOKEN>" (never when no token is set)"""
+    if not INGEST_TOKEN or not authorization:
+        return False
+    scheme, _, credentials = authorization.partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip().encode(), INGEST_TOKEN.encode())
+
+
+@contextmanager
+def online_lock(path=ONLINE_DIR):
+    """Hold the update lock for the online model in `path` (threads and processes)"""
+    os.makedirs(path, exist_ok=True)
+    with _update_lock, open(os.path.join(path, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_online_model(path=ONLINE_DIR):
+    """The stored online model, or None if there is none yet"""
+    if not artifact_exists(path):
+        return None
+
+    model, _, _ = load_model_artifact(path)
+    if not isinstance(model, OnlineLogisticModel):
+        raise ValueError(f"{path} does not hold an online model")
+    return model
+
+
+def load_online_metadata(path=ONLINE_DIR):
+    """metadata['online'] of the stored online model ({} if there is none)"""
+    if not artifact_exists(path):
+        return {}
+    return read_header(path)['metadata'].get('online', {})
+
+
+def _append_log(path, X, y):
+    log_path = os.path.join(path, INGEST_LOG)
+    new_file = not os.path.exists(log_path)
+    with open(log_path, 'a') as f:
+        if new_file:
+            f.write(','.join(COLUMNS) + '\n')
+        np.savetxt(f, np.column_stack([X, y]), delimiter=',', fmt='%.10g')
+
+
+def load_bootstrap(path):
+    """(X, y) of a labelled CSV to start an online model from, without the golden set rows"""
+    data = np.loadtxt(path, delimiter=',', skiprows=1)
+    X, y = data[:, :-1], data[:, -1]
+    keep = training_mask(X, y)
+    return X[keep], y[keep]
+
+
+def ingest(X, y, path=ONLINE_DIR, publish_to=ARTIFACT_DIR, bootstrap=BOOTSTRAP_DATASET, replace=False):
+    """Update the online model with labelled rows and publish it; returns an update summary
+
+    Rows in the golden set are dropped first ('held_out_rows' counts them); ValueError if
+    none are left. Without a stored online model it is first trained on `bootstrap` (once),
+    so the first update starts from the dataset rather than from the new rows alone. The
+    updated model is published to `publish_to` only if it passes validation there, and only
+    over a linear model unless `replace` is set (no artifact means the rule model is
+    served); 'rejected' in the summary says why it was not.
+    """
+    keep = training_mask(X, y)
+    X, y = X[keep], y[keep]
+    if len(X) == 0:
+        raise ValueError("Every record is in the golden set, which is held out of training")
+
+    with online_lock(path):
+        model = load_online_model(path)
+        bootstrapped = False
+        if model is None:
+            model = OnlineLogisticModel(n_features=X.shape[1])
+            if bootstrap and os.path.exists(bootstrap):
+                model.partial_fit(*load_bootstrap(bootstrap))
+                bootstrapped = True
+
+        start = time.perf_counter()
+        model.partial_fit(X, y)
+        update_seconds = time.perf_counter() - start
+
+        previous = load_online_metadata(path)
+        online = {
+            'rows_seen': model.count,
+            'updates': previous.get('updates', 0) + 1,
+            'last_update_rows': int(len(X)),
+            'held_out_rows': int((~keep).sum()),
+            'last_update_ms': round(update_seconds * 1000, 3),
+            'updated_at': datetime.datetime.now().isoformat()
+        }
+        header = save_model_artifact(model, None, path, metadata={'online': online})
+        _append_log(path, X, y)
+
+        published, rejected = False, None
+        if publish_to:
+            serving_kind = read_header(publish_to)['kind'] if artifact_exists(publish_to) else 'rule'
+            if serving_kind != 'linear' and not replace:
+                rejected = f"the serving model is a {serving_kind} model, which online updates do not replace"
+            else:
+                try:
+                    publish_version(lambda staging: save_model_artifact(model, None, staging,
+                                                                        metadata={'online': online}), publish_to)
+                    published = True
+                except RejectedVersionError as e:
+                    rejected = str(e)
+
+    return dict(online, version=header['content_hash'], bootstrapped=bootstrapped,
+                published=published, rejected=rejected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap or update the online model from a CSV file")
+    parser.add_argument('csv', nargs='?', help="labelled records with the columns of diabetes.csv")
+    parser.add_argument('--bootstrap', help="start a new online model from this dataset")
+    parser.add_argument('--out', default=ONLINE_DIR)
+    parser.add_argument('--publish', default=ARTIFACT_DIR, help="serving artifact to update ('' to skip)")
+    parser.add_argument('--replace', action='store_true',
+                        help="publish over a serving model of another kind (it is still validated)")
+    args = parser.parse_args()
+
+    if args.bootstrap:
+        X, y = load_bootstrap(args.bootstrap)
+        with online_lock(args.out):
+            model = OnlineLogisticModel(n_features=X.shape[1]).partial_fit(X, y)
+            online = {'rows_seen': model.count, 'updates': 0, 'updated_at': datetime.datetime.now().isoformat()}
+            save_model_artifact(model, None, args.out, metadata={'online': online})
+        print(f"Online model bootstrapped from {model.count} rows in {args.out}")
+
+    if args.csv:
+        data = np.loadtxt(args.csv, delimiter=',', skiprows=1, ndmin=2)
+        summary = ingest(data[:, :-1], data[:, -1].astype(int), args.out, args.publish or None, replace=args.replace)
+        print(f"Ingested {summary['last_update_rows']} rows in {summary['last_update_ms']} ms "
+              f"({summary['rows_seen']} seen, version {summary['version'][:12]})")
+        if summary['rejected']:
+            print(f"Not published: {summary['rejected']}")
+
+
+if __name__ == '__main__':
+    main()
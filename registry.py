@@ -0,0 +1,326 @@
+"""
+Several model versions served side by side, for A/B trials.
+
+The registry holds named arms, each a ModelHandle (so every arm hot-reloads and is
+validated like the primary model) with a routing weight. /predict asks the registry for
+an arm and scores with that arm's current version:
+
+    weighted    each request picks an arm at random in proportion to the weights
+    sticky      the arm is a hash of the request's session key, so a session keeps
+                seeing the same arm for as long as the weights do not change
+
+The 'primary' arm is model.handle, the served artifact; with only that arm configured
+routing is skipped entirely. Arms are configured in MODEL_REGISTRY_CONFIG (JSON), which
+is the only way to configure them; there is no HTTP endpoint that changes routing:
+
+    {
+        "mode": "sticky",
+        "arms": {
+            "primary": {"weight": 90},
+            "candidate": {"path": "candidate_model", "weight": 10}
+        }
+    }
+
+Each worker polls the file (every model.RELOAD_INTERVAL seconds, from start_watching)
+and applies it when it changes: new arms are loaded, validated and watched, weights and
+mode are updated, and arms no longer listed get weight 0. A file that fails to apply is
+reported in 'last_error' and routing stays as it was.
+
+Every scored request is counted against the arm and model version that served it:
+requests, positive predictions, mean probability and a latency histogram. Stats are kept
+per worker process (and reported with its pid); they start over when a worker restarts.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+
+import model
+from model import ModelHandle
+
+REGISTRY_CONFIG = os.environ.get('MODEL_REGISTRY_CONFIG', 'model_registry.json')
+
+PRIMARY_ARM = 'primary'
+ROUTING_MODES = ('weighted', 'sticky')
+
+# Upper bounds (ms) of the latency histogram buckets; slower requests go in a last '+Inf' bucket
+LATENCY_BUCKETS_MS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 50)
+
+
+class VersionStats:
+    """Counters for the requests one model version served through one arm"""
+
+    def __init__(self):
+        self.requests = 0
+        self.positives = 0
+        self.probability_sum = 0.0
+        self.latency_sum = 0.0
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._bounds = [bound / 1000 for bound in LATENCY_BUCKETS_MS]
+        self._lock = threading.Lock()
+
+    def record(self, prediction, probability, seconds):
+        bucket = bisect_left(self._bounds, seconds)
+        with self._lock:
+            self.requests += 1
+            self.positives += prediction == 1
+            self.probability_sum += probability
+            self.latency_sum += seconds
+            self.latency_counts[bucket] += 1
+
+    def percentile(self, q):
+        """Upper bound (ms) of the histogram bucket holding the q-th latency percentile"""
+        rank = q / 100 * self.requests
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (None,), self.latency_counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self):
+        requests = self.requests
+        return {
+            'requests': requests,
+            'positive_rate': round(self.positives / requests, 4) if requests else None,
+            'mean_probability': round(self.probability_sum / requests, 4) if requests else None,
+            'latency_ms': {
+                'mean': round(self.latency_sum / requests * 1000, 4) if requests else None,
+                'p50': self.percentile(50),
+                'p99': self.percentile(99),
+                'histogram': {f"le_{bound}" if bound is not None else 'inf': count for bound, count
+                              in zip(LATENCY_BUCKETS_MS + (None,), self.latency_counts)}
+            }
+        }
+
+
+class Arm:
+    """A named ModelHandle with its routing weight and per-version stats"""
+
+    def __init__(self, name, handle, weight=1.0):
+        self.name = name
+        self.handle = handle
+        self.weight = float(weight)
+        self.stats = {}
+
+    def current(self):
+        version = self.handle.current
+        if version is None:
+            version = model.active_version() if self.handle is model.handle else self.handle.load()
+        return version
+
+    def version_stats(self, version):
+        stats = self.stats.get(version)
+        if stats is None:
+            stats = self.stats.setdefault(version, VersionStats())
+        return stats
+
+    def info(self):
+        version = self.handle.current
+        return {
+            'weight': self.weight,
+            'path': self.handle.path,
+            'version': None if version is None else version.version,
+            'golden_accuracy': None if version is None else version.golden_accuracy,
+            'last_error': self.handle.last_error,
+            'versions': {key: stats.snapshot() for key, stats in list(self.stats.items())}
+        }
+
+
+class ModelRegistry:
+    """Named arms and the routing table that picks one per request"""
+
+    def __init__(self, mode='weighted', config_path=REGISTRY_CONFIG):
+        self.arms = {PRIMARY_ARM: Arm(PRIMARY_ARM, model.handle)}
+        self.mode = mode
+        self.config_path = config_path
+        self.last_error = None
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._routes = self._build_routes()
+        self._config_stamp = None
+        self._watching = False
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def _build_routes(self, weights=None):
+        """Cumulative weights and their arms; assigned as a whole so a request never sees half an update"""
+        weights = weights or {name: arm.weight for name, arm in self.arms.items()}
+        arms = [self.arms[name] for name, weight in weights.items() if weight > 0]
+        if not arms:
+            raise ValueError("At least one arm needs a positive weight")
+
+        total = sum(weights[arm.name] for arm in arms)
+        bounds, running = [], 0.0
+        for arm in arms:
+            running += weights[arm.name]
+            bounds.append(running / total)
+        bounds[-1] = 1.0
+        return bounds, arms
+
+    def configure(self, arms=None, mode=None):
+        """Add or reweight arms and set the routing mode
+
+        `arms` maps arm names to {'weight': ..., 'path': ...}; a path is only needed for
+        arms that are not registered yet (the primary arm always serves model.handle).
+        New arms are loaded and validated against the golden set before any traffic moves.
+        """
+        if mode is not None and mode not in ROUTING_MODES:
+            raise ValueError(f"Unknown routing mode '{mode}' (expected one of {', '.join(ROUTING_MODES)})")
+
+        with self._lock:
+            for name, spec in (arms or {}).items():
+                if name in self.arms:
+                    continue
+                if not spec.get('path'):
+                    raise ValueError(f"Arm '{name}' needs an artifact path")
+                handle = ModelHandle(spec['path'])
+                model.validate_version(handle.load(), model.active_version())
+                if self._watching:
+                    handle.start_watching()
+                self.arms[name] = Arm(name, handle, 0)
+
+            weights = {name: arm.weight for name, arm in self.arms.items()}
+            for name, spec in (arms or {}).items():
+                if 'weight' in spec:
+                    weights[name] = float(spec['weight'])
+            if any(weight < 0 for weight in weights.values()):
+                raise ValueError("Arm weights must not be negative")
+
+            routes = self._build_routes(weights)
+            for name, weight in weights.items():
+                self.arms[name].weight = weight
+            self._routes = routes
+            self.mode = mode or self.mode
+
+        return self.info()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.config_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load_config(self, path=None):
+        """Configure from the JSON file (see the module docstring); a missing file leaves the primary arm alone"""
+        if path is not None:
+            self.config_path = path
+        stamp = self._file_stamp()
+        if stamp is None:
+            return False
+
+        try:
+            with open(self.config_path) as f:
+                config = json.load(f)
+            # The file lists every arm that should get traffic
+            arms = dict(config.get('arms') or {})
+            for name in self.arms:
+                if name != PRIMARY_ARM and name not in arms:
+                    arms[name] = {'weight': 0}
+            self.configure(arms, config.get('mode'))
+        except ValueError:
+            # A bad file is reported once, not re-read on every poll; read errors are retried
+            self._config_stamp = stamp
+            raise
+
+        self._config_stamp = stamp
+        self.last_error = None
+        return True
+
+    def check_config(self):
+        """Apply the config file if it changed since it was last read; returns True when it was applied"""
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._config_stamp:
+            return False
+
+        try:
+            applied = self.load_config()
+        except Exception as e:
+            if str(e) != self.last_error:
+                print(f"Model registry configuration rejected, routing unchanged: {e}")
+            self.last_error = str(e)
+            return False
+        print(f"Model registry configuration reloaded from {self.config_path}")
+        return applied
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            self.check_config()
+
+    def route(self, key=None):
+        """The arm to serve a request with; `key` makes the choice sticky in 'sticky' mode"""
+        bounds, arms = self._routes
+        if len(arms) == 1:
+            return arms[0]
+
+        if key is not None and self.mode == 'sticky':
+            point = zlib.crc32(str(key).encode()) / 0x100000000
+        else:
+            point = random.random()
+        return arms[min(bisect_right(bounds, point), len(arms) - 1)]
+
+    def predict(self, features, key=None):
+        """Score one row on the routed arm; returns (prediction, probability, arm name, ModelVersion)
+
+        The version is the one that scored the row, so callers explain and report with it
+        rather than reading an arm again (which a reload may have swapped meanwhile).
+        """
+        arm = self.route(key)
+        version = arm.current()
+
+        start = time.perf_counter()
+        prediction, probability = version.pipeline.score_one(features)
+        arm.version_stats(version.version).record(prediction, probability, time.perf_counter() - start)
+
+        return prediction, probability, arm.name, version
+
+    def start_watching(self, interval=None):
+        """Watch the config file and the artifacts of the non-primary arms (call once per process, after forking)
+
+        The primary arm is watched by model.handle. Arms added by a later config reload are
+        watched from then on.
+        """
+        with self._lock:
+            self._watching = True
+            for arm in list(self.arms.values()):
+                if arm.handle is not model.handle:
+                    arm.handle.start_watching(interval)
+
+        interval = model.RELOAD_INTERVAL if interval is None else interval
+        if interval > 0 and (self._watcher is None or not self._watcher.is_alive()):
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), name='registry-watcher',
+                                             daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+        with self._lock:
+            self._watching = False
+            for arm in list(self.arms.values()):
+                if arm.handle is not model.handle:
+                    arm.handle.stop_watching()
+
+    def info(self):
+        """Arms, weights and per-version stats for /api/model-registry"""
+        return {
+            'mode': self.mode,
+            'config': self.config_path,
+            'last_error': self.last_error,
+            'pid': os.getpid(),
+            'stats_since': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'latency_buckets_ms': list(LATENCY_BUCKETS_MS),
+            'arms': {name: arm.info() for name, arm in list(self.arms.items())}
+        }
+
+
+# The registry /predict routes through
+registry = ModelRegistry()
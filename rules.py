@@ -0,0 +1,220 @@
+from bisect import bisect_right
+
+import numpy as np
+
+# Feature order used by the model, the prediction form and the batch CSV
+FEATURE_KEYS = ['pregnancies', 'glucose', 'bloodpressure', 'skinthickness', 'insulin', 'bmi', 'dpf', 'age']
+
+# Medical risk rules, declared once for the rule-based model and the risk analysis helpers.
+#
+# Each rule splits one feature into buckets at its cutpoints: bucket i holds values with
+# cutpoints[i-1] <= value < cutpoints[i]. Every bucket carries
+#   scores  - risk points, summed over all rules for the class prediction
+#   weights - probability weight, summed over all rules for predict_proba
+#   levels  - risk level reported by the risk factor analysis (None = not reported)
+# Rules are listed in the order their probability weights are summed.
+RISK_RULES = [
+    # Glucose (40% weight): hypoglycemic, normal, pre-diabetic, diabetic
+    {'feature': 'glucose', 'cutpoints': [70, 100, 126], 'scores': [1, 0, 2, 4],
+     'weights': [0.1, 0.0, 0.2, 0.4], 'levels': [None, None, 'moderate', 'high']},
+    # BMI (25% weight): normal, overweight, obese
+    {'feature': 'bmi', 'cutpoints': [25, 30], 'scores': [0, 1, 3],
+     'weights': [0.0, 0.15, 0.25], 'levels': [None, 'moderate', 'high']},
+    # Age (15% weight)
+    {'feature': 'age', 'cutpoints': [35, 45], 'scores': [0, 1, 2],
+     'weights': [0.0, 0.08, 0.15], 'levels': [None, None, 'moderate']},
+    # Blood pressure (10% weight): normal, elevated, high
+    {'feature': 'bloodpressure', 'cutpoints': [80, 90], 'scores': [0, 1, 2],
+     'weights': [0.0, 0.05, 0.1], 'levels': [None, 'moderate', 'high']},
+    # Family history (DPF, 5% weight)
+    {'feature': 'dpf', 'cutpoints': [0.3, 0.5], 'scores': [0, 1, 2],
+     'weights': [0.0, 0.025, 0.05], 'levels': [None, None, None]},
+    # Insulin resistance, pregnancy history and skin thickness (5% weight total)
+    {'feature': 'insulin', 'cutpoints': [166, 200], 'scores': [0, 1, 2],
+     'weights': [0.0, 0.0, 0.02], 'levels': [None, None, None]},
+    {'feature': 'pregnancies', 'cutpoints': [4], 'scores': [0, 1],
+     'weights': [0.0, 0.015], 'levels': [None, None]},
+    {'feature': 'skinthickness', 'cutpoints': [35], 'scores': [0, 1],
+     'weights': [0.0, 0.015], 'levels': [None, None]},
+]
+
+# Total risk score at which the rule model predicts diabetes
+RISK_SCORE_THRESHOLD = 6
+
+# Summed probability weights are clipped to this range
+PROBABILITY_FLOOR = 0.05
+PROBABILITY_CEILING = 0.95
+
+
+class RuleTable:
+    """Risk rules compiled to sorted per-feature cutpoint arrays"""
+
+    def __init__(self, rules=RISK_RULES):
+        self.rules = rules
+        self.features = [rule['feature'] for rule in rules]
+        self.columns = [FEATURE_KEYS.index(rule['feature']) for rule in rules]
+        self.cutpoints = [np.asarray(rule['cutpoints'], dtype=float) for rule in rules]
+        self.scores = [np.asarray(rule['scores'], dtype=int) for rule in rules]
+        self.weights = [np.asarray(rule['weights'], dtype=float) for rule in rules]
+        self.levels = [rule['levels'] for rule in rules]
+
+        for rule, cutpoints in zip(rules, self.cutpoints):
+            if np.any(np.diff(cutpoints) <= 0):
+                raise ValueError(f"Cutpoints for {rule['feature']} must be strictly increasing")
+            if not len(rule['scores']) == len(rule['weights']) == len(rule['levels']) == len(cutpoints) + 1:
+                raise ValueError(f"Rule for {rule['feature']} needs one score, weight and level per bucket")
+
+        # Missing values (NaN) never trigger a rule, so they map to the bucket with no score or weight
+        self.neutral = [int(np.flatnonzero((scores == 0) & (weights == 0))[0])
+                        for scores, weights in zip(self.scores, self.weights)]
+
+    def buckets(self, X):
+        """Bucket index of every rule for every row, shape (n, n_rules)"""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        buckets = np.empty((len(X), len(self.rules)), dtype=np.intp)
+
+        for i, (column, cutpoints) in enumerate(zip(self.columns, self.cutpoints)):
+            values = X[:, column]
+            # side='right' puts a value equal to a cutpoint in the higher bucket (value >= cutpoint)
+            buckets[:, i] = np.where(np.isnan(values), self.neutral[i],
+                                     np.searchsorted(cutpoints, values, side='right'))
+
+        return buckets
+
+    def score(self, X):
+        """Return (risk_scores, probabilities) for every row"""
+        buckets = self.buckets(X)
+        risk_scores = np.zeros(len(buckets), dtype=int)
+        probabilities = np.zeros(len(buckets))
+
+        # Weights are added rule by rule in declaration order, matching the original scalar sums
+        for i in range(len(self.rules)):
+            risk_scores += self.scores[i][buckets[:, i]]
+            probabilities += self.weights[i][buckets[:, i]]
+
+        return risk_scores, np.clip(probabilities, PROBABILITY_FLOOR, PROBABILITY_CEILING)
+
+    def contributions(self, X):
+        """Exact per-feature contributions to the probability: (bias, contributions)
+
+        The probability is a sum of one weight per rule, so a feature contributes the weight
+        of the bucket it falls in (rules on the same feature add up). contributions has one
+        column per FEATURE_KEYS entry. bias is the clipping adjustment of every row, so
+        bias + contributions.sum(axis=1) equals the probability from score().
+        """
+        buckets = self.buckets(X)
+        contributions = np.zeros((len(buckets), len(FEATURE_KEYS)))
+        for i, column in enumerate(self.columns):
+            contributions[:, column] += self.weights[i][buckets[:, i]]
+
+        total = contributions.sum(axis=1)
+        return np.clip(total, PROBABILITY_FLOOR, PROBABILITY_CEILING) - total, contributions
+
+    def risk_levels(self, features):
+        """Map each feature of a single row (list or form dict) to its reported risk level"""
+        if isinstance(features, dict):
+            features = [features[key] for key in FEATURE_KEYS]
+
+        buckets = self.buckets([features])[0]
+        return {feature: levels[bucket] for feature, levels, bucket in zip(self.features, self.levels, buckets)}
+
+
+# Compiled once at import and shared by every caller
+RISK_TABLE = RuleTable()
+
+
+class BucketLookup:
+    """Precomputed prediction and probability for every combination of rule buckets
+
+    The rule model is piecewise constant: its output depends only on which bucket each
+    feature falls into. Every bucket combination (a risk cell) is packed into a single
+    integer id, and the outputs for all cells are computed once when the model is built.
+    Scoring a row is then a bucket search per feature plus one table lookup. Hits per cell
+    are counted so hit_stats() can report which cells dominate live traffic.
+    """
+
+    def __init__(self, table=RISK_TABLE):
+        self.table = table
+        self.radices = [len(cutpoints) + 1 for cutpoints in table.cutpoints]
+        self.n_cells = int(np.prod(self.radices))
+
+        # Mixed-radix strides: cell id = sum(bucket[i] * strides[i])
+        self.strides = np.array([int(np.prod(self.radices[i + 1:])) for i in range(len(self.radices))])
+
+        # Outputs for every cell, built with the same additions as RuleTable.score
+        cells = np.stack(np.unravel_index(np.arange(self.n_cells), self.radices), axis=1)
+        risk_scores = np.zeros(self.n_cells, dtype=int)
+        probabilities = np.zeros(self.n_cells)
+        for i in range(len(self.radices)):
+            risk_scores += table.scores[i][cells[:, i]]
+            probabilities += table.weights[i][cells[:, i]]
+        self.predictions = (risk_scores >= RISK_SCORE_THRESHOLD).astype(np.int8)
+        self.probabilities = np.clip(probabilities, PROBABILITY_FLOOR, PROBABILITY_CEILING)
+
+        # Plain Python copies keep the single-row path free of NumPy call overhead
+        self._cutpoints = [cutpoints.tolist() for cutpoints in table.cutpoints]
+        self._strides = self.strides.tolist()
+        self._neutral = list(table.neutral)
+        self._columns = list(table.columns)
+        self._predictions = self.predictions.tolist()
+        self._probabilities = self.probabilities.tolist()
+
+        self.hits = np.zeros(self.n_cells, dtype=np.int64)
+
+    def cell_ids(self, X):
+        """Packed risk cell id of every row"""
+        return self.table.buckets(X) @ self.strides
+
+    def lookup_many(self, X):
+        """Return (predictions, probabilities) for every row"""
+        cells = self.cell_ids(X)
+        self.hits += np.bincount(cells, minlength=self.n_cells)
+        return self.predictions[cells].astype(int), self.probabilities[cells]
+
+    def lookup_one(self, features):
+        """Return (prediction, probability) for a single row of raw features"""
+        cell = 0
+        for column, cutpoints, stride, neutral in zip(self._columns, self._cutpoints, self._strides, self._neutral):
+            value = features[column]
+            if value != value:  # NaN never triggers a rule
+                cell += neutral * stride
+            else:
+                cell += bisect_right(cutpoints, value) * stride
+        self.hits[cell] += 1
+        return self._predictions[cell], self._probabilities[cell]
+
+    def describe_cell(self, cell):
+        """Readable bucket range of every feature for a packed cell id"""
+        buckets = np.unravel_index(cell, self.radices)
+        ranges = {}
+        for feature, cutpoints, bucket in zip(self.table.features, self._cutpoints, buckets):
+            if bucket == 0:
+                ranges[feature] = f"< {cutpoints[0]:g}"
+            elif bucket == len(cutpoints):
+                ranges[feature] = f">= {cutpoints[-1]:g}"
+            else:
+                ranges[feature] = f"{cutpoints[bucket - 1]:g} - {cutpoints[bucket]:g}"
+        return ranges
+
+    def hit_stats(self, top=10):
+        """Summary of risk cell hits, busiest cells first"""
+        total = int(self.hits.sum())
+        busiest = np.argsort(self.hits, kind='stable')[::-1][:top]
+
+        return {
+            'total_predictions': total,
+            'cells': self.n_cells,
+            'cells_hit': int(np.count_nonzero(self.hits)),
+            'top_cells': [{
+                'cell': int(cell),
+                'hits': int(self.hits[cell]),
+                'share': round(float(self.hits[cell]) / total, 4),
+                'prediction': int(self.predictions[cell]),
+                'probability': float(self.probabilities[cell]),
+                'buckets': self.describe_cell(cell)
+            } for cell in busiest if self.hits[cell] > 0]
+        }
+
+    def reset_hits(self):
+        """Clear the hit counters"""
+        self.hits[:] = 0
@@ -0,0 +1,212 @@
+"""
+Shadow scoring of a candidate model on live traffic, off the request path.
+
+/predict answers with the primary model as usual and hands the request's features and
+the primary (prediction, probability) to the shadow scorer, which only appends them to a
+bounded queue. A background thread drains the queue in batches, scores each batch in one
+vectorized call on the candidate and records how often the candidate disagrees and how
+far its probabilities move. When the queue is full the row is dropped and counted, never
+waited for, so a slow or broken candidate cannot slow /predict down.
+
+The candidate is a model artifact directory watched by its own ModelHandle. It is set only
+by the operator, with MODEL_SHADOW_PATH at startup; GET /api/shadow is read-only. Stats
+are kept per worker process, like the registry's: each worker only compares the /predict
+calls it served, so one response is a sample of the traffic, not all of it.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from model import ModelHandle
+
+SHADOW_PATH = os.environ.get('MODEL_SHADOW_PATH')
+
+# Rows waiting to be shadow scored; more than this and new rows are dropped
+SHADOW_QUEUE_SIZE = int(os.environ.get('MODEL_SHADOW_QUEUE_SIZE', 10_000))
+
+# Most rows scored in one vectorized call
+SHADOW_BATCH_SIZE = 512
+
+# Upper bounds of the |probability delta| histogram buckets (the last bucket is open)
+DELTA_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5)
+
+
+class ShadowStats:
+    """Agreement between the primary and one candidate version"""
+
+    def __init__(self):
+        self.rows = 0
+        self.batches = 0
+        self.disagreements = 0
+        self.delta_sum = 0.0
+        self.abs_delta_sum = 0.0
+        self.max_abs_delta = 0.0
+        self.delta_counts = np.zeros(len(DELTA_BUCKETS) + 1, dtype=np.int64)
+        self.score_seconds = 0.0
+
+    def record(self, predictions, probabilities, shadow_predictions, shadow_probabilities, seconds):
+        delta = np.asarray(shadow_probabilities, dtype=float) - probabilities
+        magnitude = np.abs(delta)
+        self.rows += len(delta)
+        self.batches += 1
+        self.disagreements += int(np.count_nonzero(np.asarray(shadow_predictions) != predictions))
+        self.delta_sum += float(delta.sum())
+        self.abs_delta_sum += float(magnitude.sum())
+        self.max_abs_delta = max(self.max_abs_delta, float(magnitude.max()))
+        self.delta_counts += np.bincount(np.searchsorted(DELTA_BUCKETS, magnitude),
+                                         minlength=len(DELTA_BUCKETS) + 1)
+        self.score_seconds += seconds
+
+    def snapshot(self):
+        rows = self.rows
+        return {
+            'rows': rows,
+            'batches': self.batches,
+            'disagreement_rate': round(self.disagreements / rows, 4) if rows else None,
+            'mean_probability_delta': round(self.delta_sum / rows, 4) if rows else None,
+            'mean_abs_probability_delta': round(self.abs_delta_sum / rows, 4) if rows else None,
+            'max_abs_probability_delta': round(self.max_abs_delta, 4),
+            'abs_delta_histogram': {f"le_{bound}" if bound is not None else 'inf': int(count) for bound, count
+                                    in zip(DELTA_BUCKETS + (None,), self.delta_counts)},
+            'score_us_per_row': round(self.score_seconds / rows * 1e6, 2) if rows else None
+        }
+
+
+class ShadowScorer:
+    """Bounded queue of served requests and the thread that scores them on the candidate"""
+
+    def __init__(self, path=None, queue_size=SHADOW_QUEUE_SIZE, batch_size=SHADOW_BATCH_SIZE):
+        self.handle = None
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.stats = {}
+        self._thread = None
+        self._stop = threading.Event()
+        if path:
+            self.set_candidate(path)
+
+    @property
+    def enabled(self):
+        return self.handle is not None
+
+    def set_candidate(self, path):
+        """Shadow score with the artifact in `path` (loaded now, so a broken one is rejected here)"""
+        handle = ModelHandle(path)
+        handle.load()
+
+        previous, self.handle = self.handle, handle
+        if previous is not None:
+            previous.stop_watching()
+        if self._thread is not None and self._thread.is_alive():
+            handle.start_watching()
+        return handle.current
+
+    def submit(self, features, prediction, probability):
+        """Queue one served request for shadow scoring; returns False if it was dropped"""
+        if self.handle is None:
+            return False
+
+        try:
+            self.queue.put_nowait((features, prediction, probability))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def _next_batch(self, timeout):
+        """Block for the first row, then take whatever else is queued, up to batch_size"""
+        try:
+            batch = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def score_batch(self, batch):
+        """Score queued rows on the candidate's current version and record the comparison"""
+        version = self.handle.current
+        features, predictions, probabilities = zip(*batch)
+
+        start = time.perf_counter()
+        shadow_predictions, shadow_probabilities = version.pipeline.score_many(features)
+        seconds = time.perf_counter() - start
+
+        stats = self.stats.get(version.version)
+        if stats is None:
+            stats = self.stats.setdefault(version.version, ShadowStats())
+        stats.record(np.asarray(predictions), np.asarray(probabilities, dtype=float), shadow_predictions,
+                     shadow_probabilities, seconds)
+
+    def drain(self, timeout=0):
+        """Score everything queued so far (the worker thread's loop body; also used by tests)"""
+        scored = 0
+        while True:
+            batch = self._next_batch(timeout)
+            if not batch:
+                return scored
+            try:
+                self.score_batch(batch)
+            except Exception as e:
+                # A failing candidate costs its rows, never the serving thread
+                self.errors += len(batch)
+                self.last_error = str(e)
+            scored += len(batch)
+            timeout = 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.drain(timeout=0.5)
+
+    def start(self):
+        """Start the scoring thread (call once per process, after forking)"""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+        self._thread.start()
+        if self.handle is not None:
+            self.handle.start_watching()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def info(self):
+        """Candidate, queue state and per-version agreement stats of this worker for /api/shadow"""
+        version = None if self.handle is None else self.handle.current
+        return {
+            'enabled': self.enabled,
+            'path': None if self.handle is None else self.handle.path,
+            'version': None if version is None else version.version,
+            'pid': os.getpid(),
+            'scope': "this worker's /predict calls only",
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queue': {'size': self.queue.qsize(), 'capacity': self.queue.maxsize},
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'versions': {key: stats.snapshot() for key, stats in list(self.stats.items())}
+        }
+
+
+# The shadow scorer /predict feeds (disabled until a candidate is set)
+shadow = ShadowScorer()
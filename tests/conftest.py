@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Make the application modules in the repository root importable from the tests
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def trained_forest(n_estimators=100):
+    """Forest trained on model_old.train_model's split (golden set rows included), without writing pickles"""
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    data = pd.read_csv('diabetes.csv')
+    X = data.drop('Outcome', axis=1)
+    y = data['Outcome']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    forest = RandomForestClassifier(n_estimators=n_estimators, random_state=42).fit(X_train_scaled, y_train)
+    return forest, scaler, X.values.astype(float)
+
+
+def random_rows(n, seed=0):
+    """Uniformly random rows within plausible clinical ranges"""
+    rng = np.random.default_rng(seed)
+    low = np.array([0, 40, 40, 0, 0, 15, 0.05, 18])
+    high = np.array([17, 220, 130, 60, 900, 60, 2.5, 85])
+    return rng.uniform(low, high, size=(n, 8))
+
+
+@pytest.fixture
+def candidate(tmp_path):
+    """A small forest published as an artifact: (path, content hash)"""
+    from artifacts import save_model_artifact
+
+    forest, scaler, _ = trained_forest(n_estimators=10)
+    header = save_model_artifact(forest, scaler, str(tmp_path))
+    return str(tmp_path), header['content_hash']
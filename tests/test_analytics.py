@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Analytics snapshot tests: pre-serialized bodies match jsonify and follow dataset reloads.
+"""
+
+import json
+import shutil
+
+import app
+import dataset
+from analytics import build_payloads, get_analytics
+from dataset import DatasetStore
+
+
+def test_bodies_are_what_jsonify_would_send():
+    data = dataset.get_dataset()
+    snapshot = get_analytics(data)
+    assert get_analytics(data) is snapshot
+
+    with app.app.test_request_context():
+        for endpoint, payload in build_payloads(data).items():
+            assert snapshot.body(endpoint) == app.jsonify(payload).get_data()
+
+
+def test_snapshot_is_rebuilt_when_the_dataset_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'diabetes.csv')
+    shutil.copy('diabetes.csv', path)
+    store = DatasetStore(path)
+    monkeypatch.setattr(dataset, 'dataset_store', store)
+    client = app.app.test_client()
+
+    before = client.get('/api/outcome-analysis')
+    assert before.mimetype == 'application/json' and before.get_json()['total_samples'] == 768
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines[:101]) + '\n')
+
+    after = client.get('/api/outcome-analysis').get_json()
+    assert after['total_samples'] == 100
+    assert after['diabetic_count'] == sum(int(line.rsplit(',', 1)[1]) for line in lines[1:101])
+    assert json.loads(client.get('/api/dataset').get_data())['total_samples'] == 100
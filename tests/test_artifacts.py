@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Round-trip tests for the memory-mappable model artifact format (artifacts.py).
+"""
+
+import json
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from artifacts import (FORMAT_VERSION, HEADER_FILE, convert_pickles, load_model_artifact,
+                       read_artifact, save_model_artifact)
+from model import MedicalRuleBasedModel, compile_pipeline
+from conftest import random_rows, trained_forest
+
+
+def test_forest_artifact_round_trip_is_memory_mapped(tmp_path):
+    forest, scaler, X = trained_forest(n_estimators=20)
+    rows = np.vstack([X, random_rows(500)])
+    header = save_model_artifact(forest, scaler, str(tmp_path))
+    
+    model, loaded_scaler, loaded_header = load_model_artifact(str(tmp_path), verify=True)
+    
+    assert header['kind'] == loaded_header['kind'] == 'forest'
+    assert isinstance(model.threshold, np.memmap) and isinstance(model.children, np.memmap)
+    assert model.expects_raw_features and model.n_estimators == 20
+    np.testing.assert_array_equal(model.predict(rows), forest.predict(scaler.transform(rows)))
+    np.testing.assert_allclose(compile_pipeline(model, loaded_scaler).score_many(rows)[1],
+                               forest.predict_proba(scaler.transform(rows))[:, 1], atol=1e-6)
+
+
+def test_rule_artifact_round_trip(tmp_path):
+    save_model_artifact(MedicalRuleBasedModel(), path=str(tmp_path))
+    model, scaler, header = load_model_artifact(str(tmp_path))
+    
+    assert header['kind'] == 'rule' and scaler is None
+    row = [2, 150, 85, 30, 200, 33, 0.6, 50]
+    assert model.predict_one(row) == MedicalRuleBasedModel().predict_one(row)
+
+
+def test_content_hash_ignores_creation_time(tmp_path):
+    forest, scaler, _ = trained_forest(n_estimators=5)
+    first = save_model_artifact(forest, scaler, str(tmp_path / 'a'))
+    second = save_model_artifact(forest, scaler, str(tmp_path / 'b'))
+    
+    assert first['content_hash'] == second['content_hash']
+    assert sorted(os.listdir(tmp_path / 'a')) == sorted(os.listdir(tmp_path / 'b'))
+
+
+def test_previous_version_arrays_are_kept_until_the_next_publish(tmp_path):
+    path = str(tmp_path)
+    headers = []
+    for n_estimators in (5, 10, 15):
+        forest, scaler, _ = trained_forest(n_estimators=n_estimators)
+        headers.append(save_model_artifact(forest, scaler, path))
+    
+    files = lambda header: {entry['file'] for entry in header['arrays'].values()}
+    on_disk = {name for name in os.listdir(path) if name.endswith('.npy')}
+    # A reader that read the replaced header can still open its arrays; older ones are gone
+    assert on_disk == files(headers[1]) | files(headers[2])
+    assert files(headers[0]) - on_disk
+
+
+def test_verify_detects_tampered_arrays(tmp_path):
+    forest, scaler, _ = trained_forest(n_estimators=5)
+    header = save_model_artifact(forest, scaler, str(tmp_path))
+    
+    path = tmp_path / header['arrays']['value']['file']
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    
+    read_artifact(str(tmp_path))
+    with pytest.raises(ValueError, match='Checksum mismatch'):
+        read_artifact(str(tmp_path), verify=True)
+
+
+def test_unsupported_version_is_rejected(tmp_path):
+    save_model_artifact(MedicalRuleBasedModel(), path=str(tmp_path))
+    header_path = tmp_path / HEADER_FILE
+    header = json.loads(header_path.read_text())
+    header['version'] = FORMAT_VERSION + 1
+    header_path.write_text(json.dumps(header))
+    
+    with pytest.raises(ValueError, match='Unsupported artifact version'):
+        load_model_artifact(str(tmp_path))
+
+
+def test_convert_pickles(tmp_path):
+    forest, scaler, X = trained_forest(n_estimators=10)
+    with open(tmp_path / 'model.pkl', 'wb') as f:
+        pickle.dump(forest, f)
+    with open(tmp_path / 'scaler.pkl', 'wb') as f:
+        pickle.dump(scaler, f)
+    
+    header = convert_pickles(str(tmp_path / 'model.pkl'), str(tmp_path / 'scaler.pkl'), str(tmp_path / 'artifact'))
+    model, _, _ = load_model_artifact(str(tmp_path / 'artifact'))
+    
+    assert header['metadata']['converted_from'] == 'model.pkl'
+    np.testing.assert_array_equal(model.predict(X), forest.predict(scaler.transform(X)))
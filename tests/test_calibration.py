@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Calibration tests: fitted curves, the compiled lookup, and calibration carried by the artifact.
+"""
+
+import numpy as np
+import pytest
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+
+from artifacts import read_header, save_model_artifact
+from calibration import DECISION_THRESHOLD, Calibrator, calibrate_artifact, fit_calibration
+from model import MedicalRuleBasedModel, ModelHandle, RejectedVersionError, compile_pipeline
+from rules import RISK_TABLE
+from conftest import random_rows
+
+
+def rule_scores():
+    data = np.loadtxt('diabetes.csv', delimiter=',', skiprows=1)
+    return RISK_TABLE.score(data[:, :-1])[1], data[:, -1].astype(int)
+
+
+def test_isotonic_curve_matches_sklearn_and_improves_brier():
+    scores, y = rule_scores()
+    calibration = fit_calibration(scores, y, 'isotonic')
+    calibrator = Calibrator.from_metadata(calibration)
+
+    expected = IsotonicRegression(y_min=0.01, y_max=0.99, out_of_bounds='clip').fit(scores, y).predict(scores)
+    np.testing.assert_allclose(calibrator.apply(scores), expected, atol=1e-12)
+    assert calibration['brier_after'] < calibration['brier_before']
+
+    # Batch and single-row lookups agree, including outside the fitted range
+    probe = np.r_[np.linspace(-0.5, 1.5, 101), scores[:50]]
+    assert calibrator.apply(probe).tolist() == [calibrator.apply_one(p) for p in probe]
+    assert np.all(np.diff(calibrator.apply(np.sort(probe))) >= 0)
+
+
+def test_platt_curve_matches_logistic_fit():
+    scores, y = rule_scores()
+    calibrator = Calibrator.from_metadata(fit_calibration(scores, y, 'platt'))
+    logistic = LogisticRegression(C=1e6).fit(scores[:, None], y)
+    np.testing.assert_allclose(calibrator.apply(scores), logistic.predict_proba(scores[:, None])[:, 1], atol=0.01)
+
+    with pytest.raises(ValueError):
+        fit_calibration(scores, y, 'histogram')
+
+
+def test_calibration_is_stored_in_artifact_and_applied(tmp_path):
+    path = str(tmp_path)
+    save_model_artifact(MedicalRuleBasedModel(), None, path)
+    header = calibrate_artifact(path, method='isotonic')
+    assert header['metadata']['calibration']['method'] == 'isotonic'
+
+    version = ModelHandle(path).load()
+    rows = random_rows(200)
+    raw = compile_pipeline(MedicalRuleBasedModel(), None).score_many(rows)
+    predictions, probabilities = version.pipeline.score_many(rows)
+    np.testing.assert_array_equal(probabilities, Calibrator.from_metadata(header['metadata']['calibration']).apply(raw[1]))
+    assert version.pipeline.score_one(rows[0]) == (predictions[0], probabilities[0])
+
+    # Explanations still add up to the served probability
+    bias, contributions = version.pipeline.explain_many(rows)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), probabilities, atol=1e-12)
+
+
+def test_calibrated_class_agrees_with_calibrated_probability(tmp_path):
+    path = str(tmp_path)
+    save_model_artifact(MedicalRuleBasedModel(), None, path)
+    calibrate_artifact(path)
+    pipeline = ModelHandle(path).load().pipeline
+
+    X = np.loadtxt('diabetes.csv', delimiter=',', skiprows=1)[:, :-1]
+    predictions, probabilities = pipeline.score_many(np.r_[X, random_rows(500)])
+    np.testing.assert_array_equal(predictions, probabilities > DECISION_THRESHOLD)
+    # The raw rule classes disagree with the calibrated probability on some of these rows
+    assert np.any(compile_pipeline(MedicalRuleBasedModel(), None).score_many(X)[0] != predictions[:len(X)])
+    for row, prediction, probability in zip(X[:100], predictions, probabilities):
+        assert pipeline.score_one(row) == (prediction, probability)
+
+
+def test_recalibration_is_validated_before_it_is_published(tmp_path):
+    path = str(tmp_path / 'serving')
+    published = save_model_artifact(MedicalRuleBasedModel(), None, path)
+
+    # Labels inverted: the fitted curve is flat, every row becomes negative and the golden set catches it
+    data = np.loadtxt('diabetes.csv', delimiter=',', skiprows=1)
+    data[:, -1] = 1 - data[:, -1]
+    inverted = str(tmp_path / 'inverted.csv')
+    np.savetxt(inverted, data, delimiter=',', header='header', comments='', fmt='%.10g')
+    with pytest.raises(RejectedVersionError):
+        calibrate_artifact(path, inverted)
+    assert read_header(path)['content_hash'] == published['content_hash']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['inverted.csv', 'serving', 'serving.lock']
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Binary columnar response tests: the raw layout, content negotiation and the two bulk endpoints.
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from columnar import ARROW_MEDIA_TYPE, COLUMNS_MEDIA_TYPE, arrow_available, decode_columns, encode_columns
+from model import predict_diabetes_many
+
+
+def test_raw_layout_round_trips_and_is_aligned():
+    columns = [np.array([0, 1, 1]), np.array([0.5, 0.25, 1 / 3]), np.array([1, 200, 3])]
+    payload = encode_columns(['Outcome', 'p', 'Glucose'], columns)
+    assert payload[:4] == b'DCOL' and len(payload) % 8 == 0
+
+    decoded = decode_columns(payload)
+    assert list(decoded) == ['Outcome', 'p', 'Glucose']
+    assert decoded['Outcome'].dtype == np.int8 and decoded['Glucose'].dtype == np.float32
+    np.testing.assert_array_equal(decoded['Outcome'], columns[0])
+    np.testing.assert_array_equal(decoded['p'], columns[1].astype(np.float32))
+    np.testing.assert_array_equal(decoded['Glucose'], columns[2])
+
+    with pytest.raises(ValueError):
+        encode_columns(['a', 'b'], [np.zeros(2), np.zeros(3)])
+
+
+def test_dataset_columns_follow_the_accept_header():
+    client = app.app.test_client()
+    df = pd.read_csv('diabetes.csv')
+
+    response = client.get('/api/dataset?columns=Pregnancies,BMI,Outcome&limit=500',
+                          headers={'Accept': COLUMNS_MEDIA_TYPE})
+    assert response.mimetype == COLUMNS_MEDIA_TYPE and 'Accept' in response.headers['Vary']
+    assert response.headers['X-Total-Count'] == '768' and response.headers['X-Next-Cursor']
+    decoded = decode_columns(response.data)
+    assert decoded['Pregnancies'].dtype == np.int8
+    np.testing.assert_array_equal(decoded['Pregnancies'], df['Pregnancies'][:500])
+    np.testing.assert_array_equal(decoded['BMI'], df['BMI'][:500].astype(np.float32))
+
+    rest = client.get(f"/api/dataset?cursor={response.headers['X-Next-Cursor']}",
+                      headers={'Accept': COLUMNS_MEDIA_TYPE})
+    assert len(decode_columns(rest.data)['Age']) == 268 and 'X-Next-Cursor' not in rest.headers
+
+    # Browsers and JSON clients are unaffected
+    assert client.get('/api/dataset', headers={'Accept': 'text/html,*/*'}).get_json()['total_samples'] == 768
+    if not arrow_available():
+        assert client.get('/api/dataset', headers={'Accept': ARROW_MEDIA_TYPE}).status_code == 406
+
+
+def test_batch_predictions_as_columns():
+    client = app.app.test_client()
+    df = pd.read_csv('diabetes.csv').drop('Outcome', axis=1)
+    upload = df.to_csv(index=False).encode()
+
+    response = client.post('/api/batch-predict', data={'file': (io.BytesIO(upload), 'rows.csv')},
+                           headers={'Accept': COLUMNS_MEDIA_TYPE})
+    assert response.status_code == 200 and response.mimetype == COLUMNS_MEDIA_TYPE
+    decoded = decode_columns(response.data)
+
+    predictions, probabilities = predict_diabetes_many(df.to_numpy(dtype=float))
+    np.testing.assert_array_equal(decoded['prediction'], predictions)
+    np.testing.assert_array_equal(decoded['probability'], probabilities.astype(np.float32))
+    assert response.headers['X-Diabetic-Predictions'] == str(int(predictions.sum()))
+
+    levels = response.headers['X-Risk-Levels'].split(',')
+    expected = client.post('/api/batch-predict', data={'file': (io.BytesIO(upload), 'rows.csv')}).get_json()
+    assert [levels[code] for code in decoded['risk_level']] == [row['risk_level'] for row in expected['predictions']]
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the background, dataset-keyed model comparison (comparison.py).
+"""
+
+import time
+
+import numpy as np
+
+import comparison
+
+
+def test_job_runs_in_background_and_result_is_cached(tmp_path):
+    directory = str(tmp_path)
+    
+    result, job = comparison.get_comparison('diabetes.csv', directory)
+    assert result is None and job['status'] == 'running' and job['total'] == len(comparison.COMPARISON_MODELS)
+    
+    # A second request joins the running job instead of starting another
+    assert comparison.get_comparison('diabetes.csv', directory)[1]['job_id'] == job['job_id']
+    
+    deadline = time.time() + 120
+    while comparison.get_job(job['job_id'], directory)['status'] == 'running' and time.time() < deadline:
+        time.sleep(0.2)
+    assert comparison.get_job(job['job_id'], directory)['completed'] == job['total']
+    
+    result, job = comparison.get_comparison('diabetes.csv', directory)
+    assert job is None
+    assert {model['name'] for model in result['models']} == set(comparison.COMPARISON_MODELS)
+    assert result['best_model'] == result['models'][0]['name']
+    assert result['dataset_sha256'] == comparison.file_sha256('diabetes.csv')
+
+
+def test_changed_dataset_is_not_served_from_cache(tmp_path):
+    dataset = tmp_path / 'data.csv'
+    dataset.write_bytes(open('diabetes.csv', 'rb').read())
+    directory = str(tmp_path / 'results')
+    
+    key = comparison.comparison_key(comparison.file_sha256(str(dataset)))
+    job = {'job_id': f'{key}-00000000', 'key': key, 'folds': None, 'dataset_sha256': '', 'status': 'running',
+           'completed': 0, 'total': len(comparison.COMPARISON_MODELS), 'started_at': 0, 'updated_at': 0, 'error': None}
+    (tmp_path / 'results').mkdir()
+    comparison.run_job(job, str(dataset), directory, max_workers=1)
+    assert comparison.get_comparison(str(dataset), directory, start=False)[0] is not None
+    
+    dataset.write_bytes(dataset.read_bytes() + b'1,100,70,20,80,25.0,0.3,30,0\n')
+    assert comparison.get_comparison(str(dataset), directory, start=False) == (None, None)
+    assert comparison.get_job('0123456789abcdef-00000000', directory) is None
+
+
+def test_cross_validated_mode_reports_mean_and_std(tmp_path):
+    directory = str(tmp_path)
+    result, job = comparison.get_comparison('diabetes.csv', directory, folds=3)
+    assert job['total'] == 3 * len(comparison.COMPARISON_MODELS) and job['job_id'].split('-')[1] == 'cv3'
+    
+    deadline = time.time() + 120
+    while comparison.get_job(job['job_id'], directory)['status'] == 'running' and time.time() < deadline:
+        time.sleep(0.2)
+    result, _ = comparison.get_comparison('diabetes.csv', directory, folds=3)
+    
+    assert result['mode'] == 'cv' and result['folds'] == 3
+    assert result['task_seconds'] > 0 and 0 < result['pool_efficiency']
+    for model in result['models']:
+        assert model['folds'] == 3
+        assert 0 <= model['accuracy'] <= 1 and model['accuracy_std'] >= 0
+    
+    # The pool computes exactly what the serial path does
+    serial = {model['name']: model for model in comparison.run_cv_serial('diabetes.csv', 3)}
+    for model in result['models']:
+        for metric in ('accuracy', 'precision', 'recall', 'f1_score'):
+            assert abs(model[metric] - serial[model['name']][metric]) < 1e-12
+
+
+def test_stratified_folds_balance_classes():
+    y = np.array([0] * 500 + [1] * 268)
+    fold_of = comparison.stratified_folds(y, 5)
+    for fold in range(5):
+        assert abs((fold_of == fold).sum() - 768 / 5) <= 2
+        assert abs(y[fold_of == fold].mean() - y.mean()) < 0.01
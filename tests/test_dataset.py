@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+DatasetStore tests: typed columns, reloads on content change, and endpoint parity with pandas.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+import dataset
+from dataset import DatasetStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / 'diabetes.csv')
+    shutil.copy('diabetes.csv', path)
+    return DatasetStore(path)
+
+
+def test_columns_are_typed_and_match_pandas(store):
+    data = store.get()
+    df = pd.read_csv('diabetes.csv')
+
+    assert data.columns == df.columns.tolist() and len(data) == len(df)
+    for column in df.columns:
+        assert data[column].dtype == (np.float64 if df[column].dtype == np.float64 else np.int64)
+        np.testing.assert_array_equal(data[column], df[column].values)
+    np.testing.assert_array_equal(data.X, df.drop('Outcome', axis=1).values)
+    assert not data.X.flags.writeable
+
+
+def test_store_reloads_only_when_content_changes(store):
+    first = store.get()
+    assert store.get() is first and store.loads == 1
+
+    # Touched with the same bytes: new mtime, same snapshot
+    stat = os.stat(store.path)
+    os.utime(store.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert store.get() is first and store.loads == 1
+
+    with open(store.path, 'rb') as f:
+        ends_with_newline = f.read().endswith(b'\n')
+    with open(store.path, 'a') as f:
+        f.write(('' if ends_with_newline else '\n') + '1,100,70,20,80,25.0,0.3,30,0\n')
+    second = store.get()
+    assert second is not first and len(second) == len(first) + 1 and store.loads == 2
+    assert second.sha256 != first.sha256
+    assert len(first) == 768  # requests holding the old snapshot keep it
+
+
+def test_blank_fields_load_as_missing_values(store, monkeypatch):
+    with open(store.path) as f:
+        lines = f.read().splitlines()
+    # Blank the Insulin field of the first row and the BMI field of the fifth
+    for row, column in ((1, 4), (5, 5)):
+        fields = lines[row].split(',')
+        fields[column] = ''
+        lines[row] = ','.join(fields)
+    with open(store.path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    monkeypatch.setattr(dataset, 'dataset_store', store)
+    df = pd.read_csv(store.path)
+    
+    data = store.get()
+    assert data['Insulin'].dtype == np.float64 and np.isnan(data['Insulin'][0]) and np.isnan(data.X[4, 5])
+    assert data['Glucose'].dtype == np.int64
+    
+    client = app.app.test_client()
+    stats = client.get('/api/dataset-stats').get_json()
+    assert stats['missing_values']['Insulin'] == stats['missing_values']['BMI'] == 1
+    for column in ('Insulin', 'BMI'):
+        assert stats['feature_stats'][column] == pytest.approx({'mean': df[column].mean(), 'std': df[column].std(),
+                                                                'min': df[column].min(), 'max': df[column].max(),
+                                                                'median': df[column].median()}, rel=1e-12)
+    correlation = client.get('/api/correlation-matrix').get_json()['correlation_matrix']
+    np.testing.assert_allclose(correlation, df.corr().values, atol=1e-12)
+    assert client.get('/api/feature-distributions').status_code == 200
+
+
+def test_endpoints_match_pandas_computation(store, monkeypatch):
+    monkeypatch.setattr(dataset, 'dataset_store', store)
+    client = app.app.test_client()
+    df = pd.read_csv('diabetes.csv')
+    X = df.drop('Outcome', axis=1)
+
+    summary = client.get('/api/dataset').get_json()
+    assert summary['sample_data'] == df.head(20).values.tolist()
+    assert summary['diabetic_cases'] == int(df['Outcome'].sum())
+
+    stats = client.get('/api/dataset-stats').get_json()['feature_stats']
+    for column in X.columns:
+        assert stats[column] == pytest.approx({'mean': X[column].mean(), 'std': X[column].std(),
+                                               'min': X[column].min(), 'max': X[column].max(),
+                                               'median': X[column].median()}, rel=1e-12)
+
+    correlation = client.get('/api/correlation-matrix').get_json()['correlation_matrix']
+    np.testing.assert_allclose(correlation, df.corr().values, atol=1e-12)
+
+    distributions = client.get('/api/feature-distributions').get_json()
+    assert distributions['histograms']['Glucose'] == np.histogram(X['Glucose'], bins=10)[0].tolist()
+
+    outcome = client.get('/api/outcome-analysis').get_json()
+    assert outcome['avg_age_diabetic'] == round(df[df['Outcome'] == 1]['Age'].mean(), 1)
+
+
+def test_cursor_pages_cover_the_dataset_once(store, monkeypatch):
+    monkeypatch.setattr(dataset, 'dataset_store', store)
+    client = app.app.test_client()
+    df = pd.read_csv('diabetes.csv')
+
+    rows, url = [], '/api/dataset?limit=250&columns=BMI,Outcome'
+    while url:
+        page = client.get(url).get_json()
+        assert page['columns'] == ['BMI', 'Outcome'] and page['offset'] == len(rows)
+        rows += page['rows']
+        url = page['next_cursor'] and f"/api/dataset?limit=250&columns=BMI,Outcome&cursor={page['next_cursor']}"
+    assert rows == df[['BMI', 'Outcome']].values.tolist()
+    assert all(isinstance(outcome, int) for _, outcome in rows)
+
+    # A cursor from before the dataset changed is refused rather than skipping or repeating rows
+    cursor = client.get('/api/dataset?limit=10').get_json()['next_cursor']
+    with open(store.path, 'a') as f:
+        f.write('\n1,100,70,20,80,25.0,0.3,30,0\n')
+    assert client.get(f"/api/dataset?cursor={cursor}").status_code == 409
+    assert client.get('/api/dataset?columns=Weight').status_code == 400
+
+
+def test_ndjson_export_streams_in_chunks(tmp_path, monkeypatch):
+    # A dataset large enough to need many chunks
+    path = str(tmp_path / 'large.csv')
+    source = np.loadtxt('diabetes.csv', delimiter=',', skiprows=1)
+    with open('diabetes.csv') as f:
+        header = f.readline().strip()
+    np.savetxt(path, np.tile(source, (50, 1)), delimiter=',', header=header, comments='', fmt='%.10g')
+    store = DatasetStore(path)
+    monkeypatch.setattr(dataset, 'dataset_store', store)
+
+    data = store.get()
+    chunks = list(data.iter_ndjson(['Glucose', 'DiabetesPedigreeFunction'], 100, None, chunk_rows=1000))
+    assert len(chunks) == 39 and all(chunk.count(b'\n') <= 1000 for chunk in chunks)
+
+    response = app.app.test_client().get('/api/dataset?format=ndjson&columns=Glucose,DiabetesPedigreeFunction')
+    assert response.mimetype == 'application/x-ndjson' and response.headers['X-Total-Count'] == str(len(data))
+    lines = response.data.splitlines()
+    assert len(lines) == len(data) == 768 * 50
+    assert [json.loads(line) for line in lines[100:]] == [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert json.loads(lines[1]) == {'Glucose': 85, 'DiabetesPedigreeFunction': 0.351}
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Per-prediction explanation tests: contributions add up to the prediction, for rules and forests.
+"""
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from forest import compile_forest
+from model import MedicalRuleBasedModel, compile_pipeline
+from rules import FEATURE_KEYS, RISK_TABLE
+from conftest import random_rows, trained_forest
+
+
+def test_rule_contributions_are_the_bucket_weights():
+    bias, contributions = RISK_TABLE.contributions([[5, 130, 85, 20, 100, 31, 0.4, 50]])
+    expected = dict(glucose=0.4, bmi=0.25, age=0.15, bloodpressure=0.05, dpf=0.025, pregnancies=0.015)
+    np.testing.assert_allclose(contributions[0], [expected.get(key, 0.0) for key in FEATURE_KEYS])
+    assert bias[0] == pytest.approx(0.0)
+
+    # Clipping shows up in the bias, so contributions still add up to the probability
+    X = random_rows(2000)
+    X[::7, 1] = np.nan
+    bias, contributions = RISK_TABLE.contributions(X)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), RISK_TABLE.score(X)[1], atol=1e-12)
+    assert np.all(contributions[::7, 1] == 0)
+
+
+def test_forest_contributions_match_tree_paths():
+    forest, scaler, X = trained_forest(n_estimators=10)
+    flat = compile_forest(forest, scaler)
+    raw = X[:50]
+    bias, contributions = flat.contributions(raw)
+
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), flat.predict_positive(raw), atol=1e-12)
+
+    # Reference: walk every tree's decision path and credit value changes to the split feature
+    expected = np.zeros_like(contributions)
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, 1] / tree.value[:, 0, :].sum(axis=1)
+        for row, path in enumerate(estimator.decision_path(scaler.transform(raw).astype(np.float32))):
+            nodes = path.indices
+            np.add.at(expected[row], tree.feature[nodes[:-1]], np.diff(value[nodes]))
+    np.testing.assert_allclose(contributions, expected / len(forest.estimators_), atol=1e-6)
+
+
+def test_pipeline_explains_raw_rows():
+    rows = random_rows(100)
+    bias, contributions = compile_pipeline(MedicalRuleBasedModel(), None).explain_many(rows)
+    assert contributions.shape == (100, 8)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), RISK_TABLE.score(rows)[1], atol=1e-12)
+
+    forest, scaler, _ = trained_forest(n_estimators=10)
+    pipeline = compile_pipeline(forest, scaler)
+    bias, contributions = pipeline.explain_many(rows)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), pipeline.score_many(rows)[1], atol=1e-12)
+
+    linear = LogisticRegression().fit(random_rows(50), np.arange(50) % 2)
+    with pytest.raises(ValueError):
+        compile_pipeline(linear, None).explain_many(rows)
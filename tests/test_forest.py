@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the flattened RandomForest inference engine against sklearn.
+"""
+
+import numpy as np
+
+from conftest import random_rows, trained_forest
+from forest import compile_forest
+from model import compile_pipeline
+
+
+def test_flat_forest_matches_sklearn_on_scaled_rows():
+    forest, scaler, X = trained_forest()
+    X_scaled = scaler.transform(np.vstack([X, random_rows(3000)]))
+    flat = compile_forest(forest)
+    
+    assert flat.threshold.dtype == np.float32 and flat.feature.dtype == np.int32
+    np.testing.assert_array_equal(flat.predict(X_scaled), forest.predict(X_scaled))
+    np.testing.assert_allclose(flat.predict_proba(X_scaled), forest.predict_proba(X_scaled), atol=1e-6)
+
+
+def test_folded_scaler_scores_raw_rows():
+    forest, scaler, X = trained_forest()
+    rows = np.vstack([X, random_rows(3000, seed=1)])
+    flat = compile_forest(forest, scaler)
+    
+    assert flat.expects_raw_features
+    predictions, probabilities = flat.predict_with_proba(rows)
+    np.testing.assert_array_equal(predictions, forest.predict(scaler.transform(rows)))
+    np.testing.assert_allclose(probabilities, forest.predict_proba(scaler.transform(rows))[:, 1], atol=1e-6)
+
+
+def test_pipeline_compiles_forest_and_keeps_model_metadata():
+    forest, scaler, X = trained_forest(n_estimators=20)
+    pipeline = compile_pipeline(forest, scaler)
+    
+    assert pipeline.mean is None
+    assert pipeline.model.n_estimators == 20
+    assert pipeline.model.random_state == 42
+    np.testing.assert_array_equal(pipeline.model.feature_importances_, forest.feature_importances_)
+    
+    prediction, probability = pipeline.score_one(list(X[0]))
+    assert prediction == forest.predict(scaler.transform(X[:1]))[0]
+    assert abs(probability - forest.predict_proba(scaler.transform(X[:1]))[0, 1]) < 1e-6
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Golden set tests: created once from the dataset, never rewritten, and kept out of training.
+"""
+
+import shutil
+
+import numpy as np
+
+import model_old
+import training_cache
+from model import ModelHandle
+from golden_set import ensure_golden_set, read_golden_set, training_mask
+
+
+def test_golden_set_is_a_fixed_stratified_holdout(tmp_path):
+    source, path = str(tmp_path / 'diabetes.csv'), str(tmp_path / 'golden_set.csv')
+    shutil.copy('diabetes.csv', source)
+    data = np.loadtxt(source, delimiter=',', skiprows=1)
+    
+    assert ensure_golden_set(path, source) == path
+    X, y = read_golden_set(path)
+    assert len(y) == round(0.2 * np.sum(data[:, -1] == 0)) + round(0.2 * np.sum(data[:, -1] == 1))
+    
+    # Later dataset changes do not move the held-out rows
+    with open(path, 'rb') as f:
+        written = f.read()
+    with open(source, 'w') as f:
+        f.write('Pregnancies,Glucose,BloodPressure,SkinThickness,Insulin,BMI,DiabetesPedigreeFunction,Age,Outcome\n')
+    ensure_golden_set(path, source)
+    with open(path, 'rb') as f:
+        assert f.read() == written
+    
+    keep = training_mask(data[:, :-1], data[:, -1], path)
+    assert keep.sum() == len(data) - len(y)
+    assert not training_mask(X, y, path).any()
+
+
+def test_training_never_sees_golden_rows():
+    _, _, metrics = model_old.fit_model()
+    _, y = read_golden_set()
+    assert metrics['samples']['total'] == 768 - len(y)
+
+
+def test_training_publishes_through_validation(tmp_path, monkeypatch):
+    serving, cache_dir = str(tmp_path / 'serving'), str(tmp_path / 'cache')
+    monkeypatch.setattr(model_old, 'ARTIFACT_DIR', serving)
+    monkeypatch.setattr(model_old, 'cached_training', lambda dataset, params, train: training_cache.cached_training(
+        dataset, params, train, cache_dir))
+    for name in ('model', 'scaler', 'model_card'):
+        monkeypatch.setattr(model_old, name, getattr(model_old, name))
+    
+    model_old.train_model()
+    version = ModelHandle(serving).load()
+    assert version.version == model_old.model_card['model_version'] and version.card['source'] != 'golden_set'
+    # Staged next to the artifact and promoted under its publish lock
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['cache', 'serving', 'serving.lock']
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Conditional GET tests: ETags from dataset and model hashes, 304s, and hit ratio counting.
+"""
+
+import shutil
+
+import pytest
+
+import app
+import dataset
+import http_cache
+from dataset import DatasetStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = str(tmp_path / 'diabetes.csv')
+    shutil.copy('diabetes.csv', path)
+    monkeypatch.setattr(dataset, 'dataset_store', DatasetStore(path))
+    http_cache.reset_http_cache_stats()
+    return app.app.test_client()
+
+
+def test_dataset_endpoints_revalidate_until_the_dataset_changes(client):
+    first = client.get('/api/dataset-stats')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    assert first.headers['Last-Modified']
+
+    again = client.get('/api/dataset-stats', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b'' and again.headers['ETag'] == etag
+    assert client.get('/api/dataset-stats', headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+
+    # Each endpoint has its own ETag for the same dataset
+    assert client.get('/api/correlation-matrix', headers={'If-None-Match': etag}).status_code == 200
+
+    path = dataset.dataset_store.path
+    with open(path) as f:
+        lines = f.read().splitlines()
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines[:200]) + '\n')
+    changed = client.get('/api/dataset-stats', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert changed.get_json()['total_samples'] == 199
+
+    stats = client.get('/api/http-cache').get_json()['endpoints']
+    assert stats['dataset-stats'] == {'requests': 4, 'not_modified': 2, 'hit_ratio': 0.5}
+
+
+def test_model_endpoints_follow_the_model_version(client, monkeypatch):
+    first = client.get('/feature-importance')
+    assert first.status_code == 200 and first.get_json()['success']
+    etag = first.headers['ETag']
+    assert client.get('/feature-importance', headers={'If-None-Match': etag}).status_code == 304
+
+    info = client.get('/model-info')
+    assert client.get('/model-info', headers={'If-None-Match': info.headers['ETag']}).status_code == 304
+
+    # A reload changes the version the ETags are derived from
+    monkeypatch.setattr(app.handle.current, 'version', 'reloaded')
+    assert client.get('/feature-importance', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/model-info', headers={'If-None-Match': info.headers['ETag']}).status_code == 200
+
+
+def test_model_info_revalidates_when_training_cache_counts_move(client, monkeypatch):
+    import app_simple
+    import training_cache
+
+    for test_client in (client, app_simple.app.test_client()):
+        info = test_client.get('/model-info')
+        assert info.status_code == 200 and 'training_cache' in info.get_json()
+        etag = info.headers['ETag']
+        assert test_client.get('/model-info', headers={'If-None-Match': etag}).status_code == 304
+        # Validated by ETag only: a date cannot say whether the counts moved
+        assert 'Last-Modified' not in info.headers
+        assert test_client.get('/model-info', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}).status_code == 200
+
+        monkeypatch.setitem(training_cache._stats, 'misses', training_cache._stats['misses'] + 1)
+        changed = test_client.get('/model-info', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.get_json()['training_cache']['misses'] == training_cache._stats['misses']
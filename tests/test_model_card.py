@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Model card tests: numpy metrics agree with sklearn, and the sidecar is tied to its artifact.
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+from sklearn import metrics
+
+from artifacts import save_model_artifact
+from model import ModelHandle
+from model_card import MODEL_CARD_FILE, build_model_card, evaluate, read_model_card
+from conftest import trained_forest
+
+
+def test_evaluate_matches_sklearn():
+    rng = np.random.RandomState(0)
+    y_true = rng.randint(0, 2, 300)
+    y_prob = np.clip(y_true * 0.3 + rng.rand(300) * 0.7, 0, 1).round(2)  # ties on purpose
+    y_pred = (y_prob > 0.5).astype(int)
+
+    evaluation = evaluate(y_true, y_pred, y_prob)
+
+    expected = metrics.classification_report(y_true, y_pred, output_dict=True)
+    for label in ('0', '1', 'macro avg', 'weighted avg'):
+        for name in ('precision', 'recall', 'f1-score', 'support'):
+            assert evaluation['classification_report'][label][name] == pytest.approx(expected[label][name])
+    assert evaluation['accuracy'] == pytest.approx(metrics.accuracy_score(y_true, y_pred))
+    assert evaluation['f1_score'] == pytest.approx(metrics.f1_score(y_true, y_pred))
+    assert evaluation['confusion_matrix'] == metrics.confusion_matrix(y_true, y_pred).tolist()
+    assert evaluation['roc_auc'] == pytest.approx(metrics.roc_auc_score(y_true, y_prob))
+
+    fpr, tpr, _ = metrics.roc_curve(y_true, y_prob, drop_intermediate=False)
+    assert len(evaluation['roc_curve']['fpr']) <= 101
+    assert evaluation['roc_curve']['fpr'][-1] == 1.0 and evaluation['roc_curve']['thresholds'][0] is None
+    # Thinned, but every kept point is one of sklearn's
+    expected_points = set(zip(fpr.round(6), tpr.round(6)))
+    assert set(zip(evaluation['roc_curve']['fpr'], evaluation['roc_curve']['tpr'])) <= expected_points
+    json.dumps(evaluation)
+
+
+def test_card_sidecar_is_stamped_with_the_artifact_version(tmp_path):
+    path = str(tmp_path)
+    forest, scaler, X = trained_forest(n_estimators=10)
+    y = forest.predict(X)
+    card = build_model_card(forest, evaluate(y, y, forest.predict_proba(X)[:, 1]),
+                            {'total': len(X), 'training': 0, 'test': len(X)}, dataset_sha256='abc')
+
+    header = save_model_artifact(forest, scaler, path, sidecars={MODEL_CARD_FILE: card})
+    loaded = read_model_card(path, header['content_hash'])
+    assert loaded['model_version'] == header['content_hash']
+    assert loaded['feature_importance'] == pytest.approx(forest.feature_importances_.tolist())
+    assert read_model_card(path, 'another-version') is None
+
+    handle = ModelHandle(path)
+    handle.load()
+    assert handle.current.card['source'] == 'training' and handle.current.card['dataset_sha256'] == 'abc'
+
+
+def test_missing_card_falls_back_to_golden_set_evaluation(tmp_path):
+    path = str(tmp_path)
+    forest, scaler, _ = trained_forest(n_estimators=10)
+    save_model_artifact(forest, scaler, path)
+    assert not os.path.exists(os.path.join(path, MODEL_CARD_FILE))
+
+    handle = ModelHandle(path)
+    version = handle.load()
+    assert version.card['source'] == 'golden_set' and version.card['model_version'] == version.version
+    assert version.card['metrics']['accuracy'] == pytest.approx(version.golden_accuracy, abs=1e-4)
+    assert sum(map(sum, version.card['confusion_matrix'])) == version.card['samples']['test']
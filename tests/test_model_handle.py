@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Hot reload tests for ModelHandle: watch, validate against the golden set, atomic swap.
+"""
+
+import os
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import model
+from artifacts import save_model_artifact
+from model import ModelHandle, RejectedVersionError
+from conftest import trained_forest
+
+
+def test_check_loads_and_swaps_new_artifact_versions(tmp_path):
+    path = str(tmp_path)
+    handle = ModelHandle(path)
+    assert handle.check() is False  # nothing published yet
+    
+    forest, scaler, X = trained_forest(n_estimators=10)
+    first = save_model_artifact(forest, scaler, path)
+    assert handle.check() is True
+    assert handle.current.version == first['content_hash']
+    assert handle.current.load_seconds > 0 and handle.current.golden_accuracy > 0.8
+    
+    # Same content rewritten: no reload
+    save_model_artifact(forest, scaler, path)
+    assert handle.check() is False
+    
+    old = handle.current
+    forest, scaler, _ = trained_forest(n_estimators=12)
+    second = save_model_artifact(forest, scaler, path)
+    assert handle.check() is True
+    assert handle.current.version == second['content_hash'] and handle.reloads == 2
+    
+    # A request holding the old version keeps scoring with it
+    np.testing.assert_array_equal(old.pipeline.score_many(X)[1], old.model.predict_proba(X)[:, 1])
+    assert handle.info()['active']['version'] == second['content_hash']
+
+
+def test_version_failing_golden_set_is_not_swapped_in(tmp_path):
+    path = str(tmp_path)
+    forest, scaler, X = trained_forest(n_estimators=10)
+    save_model_artifact(forest, scaler, path)
+    handle = ModelHandle(path)
+    good = handle.load()
+    
+    # Same features, inverted labels: far below the active version on the golden set
+    y = np.loadtxt('diabetes.csv', delimiter=',', skiprows=1)[:, -1].astype(int)
+    bad = RandomForestClassifier(n_estimators=10, random_state=0).fit(scaler.transform(X), 1 - y)
+    save_model_artifact(bad, scaler, path)
+    
+    assert handle.check() is False
+    assert handle.current is good
+    assert 'golden set accuracy' in handle.info()['last_error']
+
+
+def test_artifact_failing_golden_set_is_not_served_at_startup(tmp_path, monkeypatch):
+    path = str(tmp_path)
+    forest, scaler, X = trained_forest(n_estimators=10)
+    y = np.loadtxt('diabetes.csv', delimiter=',', skiprows=1)[:, -1].astype(int)
+    bad = RandomForestClassifier(n_estimators=10, random_state=0).fit(scaler.transform(X), 1 - y)
+    save_model_artifact(bad, scaler, path)
+    
+    # With nothing active the artifact is held against the rule model
+    handle = ModelHandle(path)
+    with pytest.raises(RejectedVersionError, match='rule model'):
+        handle.load(validate=True)
+    assert handle.current is None and handle.check() is False
+    
+    # load_model() falls back to the rule model instead of serving it
+    for name in ('model', 'scaler', 'pipeline'):
+        monkeypatch.setattr(model, name, getattr(model, name))
+    monkeypatch.setattr(model, 'handle', ModelHandle(path))
+    model.load_model()
+    assert model.handle.current.source == 'rules.py' and 'golden set accuracy' in model.handle.last_error
+
+
+def test_small_losses_cannot_drift_below_the_rule_model():
+    floor = model.baseline_version().golden_accuracy
+    active = SimpleNamespace(golden_accuracy=floor + 0.03)
+    
+    # Within the tolerance of the active version, but below the fixed floor
+    with pytest.raises(RejectedVersionError, match='rule model'):
+        model.validate_version(SimpleNamespace(golden_accuracy=floor - 0.01), active)
+    model.validate_version(SimpleNamespace(golden_accuracy=floor), active)
+    with pytest.raises(RejectedVersionError, match='active version'):
+        model.validate_version(SimpleNamespace(golden_accuracy=floor + 0.2), SimpleNamespace(golden_accuracy=floor + 0.3))
+
+
+def test_read_errors_are_retried_on_the_next_check(tmp_path):
+    path = str(tmp_path)
+    forest, scaler, _ = trained_forest(n_estimators=10)
+    save_model_artifact(forest, scaler, path)
+    handle = ModelHandle(path)
+    first = handle.load()
+    
+    forest, scaler, _ = trained_forest(n_estimators=12)
+    second = save_model_artifact(forest, scaler, path)
+    array = os.path.join(path, second['arrays']['threshold']['file'])
+    os.rename(array, array + '.away')
+    assert handle.check() is False and handle.current is first and handle.last_error
+    
+    # The header did not change again, but the failed read is not remembered as a rejection
+    os.rename(array + '.away', array)
+    assert handle.check() is True and handle.current.version == second['content_hash']
+
+
+def test_requests_see_a_whole_version_during_swaps(tmp_path):
+    path = str(tmp_path)
+    versions = []
+    for n_estimators in (5, 6):
+        forest, scaler, X = trained_forest(n_estimators=n_estimators)
+        versions.append((forest, scaler))
+    save_model_artifact(*versions[0], path)
+    handle = ModelHandle(path)
+    handle.load()
+    
+    errors = []
+    stop = threading.Event()
+    
+    def serve():
+        while not stop.is_set():
+            version = handle.current
+            try:
+                probabilities = version.pipeline.score_many(X[:50])[1]
+                expected = version.model.predict_proba(X[:50])[:, 1]
+                if not np.array_equal(probabilities, expected):
+                    errors.append('mixed versions')
+            except Exception as e:
+                errors.append(repr(e))
+    
+    thread = threading.Thread(target=serve)
+    thread.start()
+    for i in range(6):
+        save_model_artifact(*versions[(i + 1) % 2], path)
+        handle.check()
+    stop.set()
+    thread.join()
+    
+    assert errors == []
+    assert handle.reloads == 6
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Online update tests: running scaler statistics, incremental SGD, ingest and publishing.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from artifacts import load_model_artifact, read_header, save_model_artifact
+from golden_set import training_mask
+from model import ModelHandle
+from online import COLUMNS, INGEST_LOG, OnlineLogisticModel, ingest, load_online_model, parse_records
+from conftest import random_rows, trained_forest
+
+
+def load_dataset():
+    data = np.loadtxt('diabetes.csv', delimiter=',', skiprows=1)
+    return data[:, :-1], data[:, -1].astype(int)
+
+
+def test_running_scaler_matches_full_statistics_and_keeps_predictions():
+    X, y = load_dataset()
+    model = OnlineLogisticModel()
+    for start in range(0, len(X), 100):
+        model.partial_fit(X[start:start + 100], y[start:start + 100])
+    np.testing.assert_allclose(model.mean, X.mean(axis=0))
+    np.testing.assert_allclose(model.var, X.var(axis=0))
+    assert model.count == len(X)
+
+    # Merging new statistics alone (no SGD steps) re-expresses the model without changing it
+    rows = random_rows(500)
+    before = model.predict_with_proba(rows)[1]
+    model.params['epochs'] = 0
+    model.partial_fit(random_rows(50, seed=1), np.ones(50))
+    np.testing.assert_allclose(model.predict_with_proba(rows)[1], before, atol=1e-12)
+
+
+def test_incremental_model_learns_and_round_trips(tmp_path):
+    X, y = load_dataset()
+    model = OnlineLogisticModel()
+    for start in range(0, 600, 50):
+        model.partial_fit(X[start:start + 50], y[start:start + 50])
+    assert np.mean(model.predict(X[600:]) == y[600:]) > 0.72
+
+    prediction, probability = model.predict_one(X[0])
+    assert prediction == model.predict(X[:1])[0] and probability == pytest.approx(model.predict_proba(X[:1])[0, 1])
+
+    save_model_artifact(model, None, str(tmp_path))
+    loaded, _, header = load_model_artifact(str(tmp_path))
+    assert header['kind'] == 'linear'
+    np.testing.assert_array_equal(loaded.predict_with_proba(X)[1], model.predict_with_proba(X)[1])
+
+
+def test_ingest_updates_state_and_publishes(tmp_path):
+    online_dir, serving_dir = str(tmp_path / 'online'), str(tmp_path / 'serving')
+    X, y = load_dataset()
+    # The bootstrap leaves out the golden set rows, and so does every update
+    keep = training_mask(X, y)
+    bootstrap_rows = int(keep.sum())
+    assert bootstrap_rows < len(X)
+    X, y = X[keep], y[keep]
+
+    # Without an artifact the rule model is served, which an update only replaces when forced
+    first = ingest(X[:10], y[:10], online_dir, serving_dir)
+    assert first['bootstrapped'] and first['rows_seen'] == bootstrap_rows + 10 and first['updates'] == 1
+    assert not first['published'] and 'rule model' in first['rejected']
+    assert not os.path.exists(serving_dir)
+
+    second = ingest(X[10:15], y[10:15], online_dir, serving_dir, replace=True)
+    assert not second['bootstrapped'] and second['rows_seen'] == bootstrap_rows + 15 and second['updates'] == 2
+    assert second['published'] and second['rejected'] is None
+    third = ingest(X[15:20], y[15:20], online_dir, serving_dir)
+    assert third['published'] and load_online_model(online_dir).count == bootstrap_rows + 20
+
+    with open(tmp_path / 'online' / INGEST_LOG) as f:
+        assert len(f.read().splitlines()) == 1 + 20
+
+    handle = ModelHandle(serving_dir)
+    assert handle.check() and handle.current.version == third['version']
+    assert handle.current.golden_accuracy > 0.72
+
+
+def test_ingest_drops_golden_set_rows(tmp_path):
+    X, y = load_dataset()
+    golden = ~training_mask(X, y)
+    rows = np.concatenate([np.flatnonzero(golden)[:3], np.flatnonzero(~golden)[:2]])
+
+    update = ingest(X[rows], y[rows], str(tmp_path), None, bootstrap=None)
+    assert update['last_update_rows'] == 2 and update['held_out_rows'] == 3 and update['rows_seen'] == 2
+    with pytest.raises(ValueError, match='golden set'):
+        ingest(X[golden][:3], y[golden][:3], str(tmp_path), None, bootstrap=None)
+
+
+def test_ingest_endpoint_needs_the_token(monkeypatch):
+    import app
+    import online
+
+    client = app.app.test_client()
+    record = dict(zip(COLUMNS, [1, 120, 70, 20, 80, 30, 0.5, 40, 1]))
+    monkeypatch.setattr(online, 'INGEST_TOKEN', None)
+    assert client.post('/api/ingest', json={'records': [record]}).status_code == 403
+
+    monkeypatch.setattr(online, 'INGEST_TOKEN', 'secret')
+    for headers in ({}, {'Authorization': 'Bearer wrong'}, {'Authorization': 'secret'}):
+        assert client.post('/api/ingest', json={'records': [record]}, headers=headers).status_code == 401
+    assert online.ingest_authorized('Bearer secret')
+
+
+def test_ingest_does_not_replace_other_serving_models_unvalidated(tmp_path):
+    online_dir, serving_dir = str(tmp_path / 'online'), str(tmp_path / 'serving')
+    forest, scaler, _ = trained_forest(n_estimators=10)
+    served = save_model_artifact(forest, scaler, serving_dir)
+    X, y = load_dataset()
+
+    update = ingest(X[:10], y[:10], online_dir, serving_dir)
+    assert not update['published'] and 'forest' in update['rejected']
+    assert read_header(serving_dir)['content_hash'] == served['content_hash']
+
+    # Forced over the forest it is still validated, and this forest saw the golden rows in training
+    update = ingest(X[10:20], y[10:20], online_dir, serving_dir, replace=True)
+    assert not update['published'] and 'golden set accuracy' in update['rejected']
+    assert read_header(serving_dir)['content_hash'] == served['content_hash']
+    assert sorted(os.listdir(tmp_path)) == ['online', 'serving', 'serving.lock']
+
+
+def test_parse_records_validates_columns_and_labels():
+    X, y = parse_records([dict(zip(COLUMNS, [1, 120, 70, 20, 80, 30, 0.5, 40, 1])), [0] * 9])
+    assert X.shape == (2, 8) and y.tolist() == [1, 0]
+
+    for records in ([], [{'Glucose': 1}], [[1, 2, 3]], [[0] * 8 + [2]], [[float('nan')] * 9]):
+        with pytest.raises(ValueError):
+            parse_records(records)
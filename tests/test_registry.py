@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Model registry tests: weighted and sticky A/B routing, per-version stats and configuration.
+"""
+
+import json
+import os
+
+import pytest
+
+import app_simple
+import model
+from registry import PRIMARY_ARM, ModelRegistry
+from conftest import random_rows
+
+
+def test_weighted_routing_splits_traffic_and_counts_per_version(candidate):
+    path, version = candidate
+    registry = ModelRegistry()
+    registry.configure({PRIMARY_ARM: {'weight': 3}, 'candidate': {'path': path, 'weight': 1}})
+
+    rows = random_rows(2000).tolist()
+    served = [registry.predict(row) for row in rows]
+    share = sum(arm == 'candidate' for _, _, arm, _ in served) / len(served)
+    assert 0.2 < share < 0.3
+
+    # The candidate scores exactly as its own pipeline does
+    candidate_arm = registry.arms['candidate']
+    for row, (prediction, probability, arm, served_version) in zip(rows, served):
+        if arm == 'candidate':
+            assert served_version.version == version
+            assert (prediction, probability) == candidate_arm.handle.current.pipeline.score_one(row)
+
+    info = registry.info()
+    stats = info['arms']['candidate']['versions'][version]
+    assert stats['requests'] == sum(arm == 'candidate' for _, _, arm, _ in served)
+    assert stats['positive_rate'] == round(sum(p for p, _, arm, _ in served if arm == 'candidate')
+                                           / stats['requests'], 4)
+    assert sum(stats['latency_ms']['histogram'].values()) == stats['requests']
+    primary = info['arms'][PRIMARY_ARM]['versions'][model.active_version().version]
+    assert primary['requests'] + stats['requests'] == len(rows)
+
+
+def test_sticky_routing_keeps_sessions_on_one_arm(candidate):
+    path, _ = candidate
+    registry = ModelRegistry()
+    registry.configure({'candidate': {'path': path, 'weight': 1}}, mode='sticky')
+
+    row = random_rows(1)[0].tolist()
+    arms = {f"session-{i}": registry.predict(row, f"session-{i}")[2] for i in range(200)}
+    assert set(arms.values()) == {PRIMARY_ARM, 'candidate'}
+    for _ in range(3):
+        assert all(registry.predict(row, key)[2] == arm for key, arm in arms.items())
+
+    # Shifting all weight to the primary arm moves every session there
+    registry.configure({'candidate': {'weight': 0}})
+    assert {registry.predict(row, key)[2] for key in arms} == {PRIMARY_ARM}
+
+
+def test_invalid_configuration_leaves_routing_unchanged(candidate):
+    path, _ = candidate
+    registry = ModelRegistry()
+    routes = registry._routes
+
+    with pytest.raises(ValueError):
+        registry.configure({PRIMARY_ARM: {'weight': 0}})
+    with pytest.raises(ValueError):
+        registry.configure({'candidate': {'weight': 1}})  # no artifact path
+    with pytest.raises(ValueError):
+        registry.configure(mode='round_robin')
+    assert registry._routes is routes and registry.arms[PRIMARY_ARM].weight == 1.0
+
+    # A single arm is served without routing
+    assert registry.route('any-session').name == PRIMARY_ARM
+
+
+def test_config_file_is_reloaded_and_new_arms_are_watched(candidate, tmp_path):
+    path, version = candidate
+    config_path = str(tmp_path / 'registry.json')
+    registry = ModelRegistry(config_path=config_path)
+    # Watching, but polling too rarely to race the explicit checks below
+    registry.start_watching(interval=60)
+    try:
+        assert registry.check_config() is False  # no config file yet
+        
+        with open(config_path, 'w') as f:
+            json.dump({'mode': 'sticky', 'arms': {'candidate': {'path': path, 'weight': 1}}}, f)
+        assert registry.check_config() is True
+        candidate_arm = registry.arms['candidate']
+        assert registry.mode == 'sticky' and candidate_arm.handle.current.version == version
+        assert candidate_arm.handle.info()['watching']
+        
+        # An invalid file leaves routing alone and is reported
+        with open(config_path, 'w') as f:
+            json.dump({'arms': {'candidate': {'weight': -1}}}, f)
+        assert registry.check_config() is False
+        assert candidate_arm.weight == 1 and 'negative' in registry.info()['last_error']
+        
+        # Arms left out of the file stop getting traffic
+        with open(config_path, 'w') as f:
+            json.dump({'arms': {PRIMARY_ARM: {'weight': 1}}}, f)
+        os.utime(config_path, ns=(0, os.stat(config_path).st_mtime_ns + 10 ** 9))
+        assert registry.check_config() is True and candidate_arm.weight == 0
+        assert registry.info()['last_error'] is None
+    finally:
+        registry.stop_watching()
+    assert not candidate_arm.handle.info()['watching']
+
+
+def test_predict_explains_with_the_arm_that_served(candidate, monkeypatch):
+    path, version = candidate
+    registry = ModelRegistry()
+    registry.configure({PRIMARY_ARM: {'weight': 0}, 'candidate': {'path': path, 'weight': 1}})
+    monkeypatch.setattr(app_simple, 'registry', registry)
+    
+    form = dict(zip(['pregnancies', 'glucose', 'bloodpressure', 'skinthickness', 'insulin', 'bmi', 'dpf', 'age'],
+                    ['2', '150', '85', '30', '200', '33', '0.6', '50']))
+    result = app_simple.app.test_client().post('/predict', data=form).get_json()
+    assert result['prediction_details']['model_arm'] == 'candidate'
+    assert result['prediction_details']['model_version'] == version
+    
+    pipeline = registry.arms['candidate'].handle.current.pipeline
+    bias, contributions = pipeline.explain_many([[2, 150, 85, 30, 200, 33, 0.6, 50]])
+    assert {item['feature']: item['contribution'] for item in result['feature_importance']}['Glucose'] \
+        == pytest.approx(contributions[0][1])
+    assert bias[0] + sum(item['contribution'] for item in result['feature_importance']) \
+        == pytest.approx(result['probability'])
+
+
+def test_registry_cannot_be_configured_over_http():
+    client = app_simple.app.test_client()
+    assert client.post('/api/model-registry', json={'arms': {'x': {'path': '/tmp', 'weight': 1}}}).status_code == 405
+    assert client.get('/api/model-registry').get_json()['success']
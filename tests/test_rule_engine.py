@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the vectorized MedicalRuleBasedModel engine.
+The scalar rules below are the original per-sample implementation and act as the reference.
+"""
+
+import numpy as np
+import pandas as pd
+
+from model import MedicalRuleBasedModel
+
+
+def reference_score(sample):
+    """Original per-sample risk score and probability"""
+    pregnancies, glucose, bp, skin_thickness, insulin, bmi, dpf, age = sample
+    
+    risk_score = 0
+    if glucose >= 126:
+        risk_score += 4
+    elif glucose >= 100:
+        risk_score += 2
+    elif glucose < 70:
+        risk_score += 1
+    if bmi >= 30:
+        risk_score += 3
+    elif bmi >= 25:
+        risk_score += 1
+    if age >= 45:
+        risk_score += 2
+    elif age >= 35:
+        risk_score += 1
+    if bp >= 90:
+        risk_score += 2
+    elif bp >= 80:
+        risk_score += 1
+    if dpf >= 0.5:
+        risk_score += 2
+    elif dpf >= 0.3:
+        risk_score += 1
+    if insulin >= 200:
+        risk_score += 2
+    elif insulin >= 166:
+        risk_score += 1
+    if pregnancies >= 4:
+        risk_score += 1
+    if skin_thickness >= 35:
+        risk_score += 1
+    
+    prob = 0.0
+    if glucose >= 126:
+        prob += 0.4
+    elif glucose >= 100:
+        prob += 0.2
+    elif glucose < 70:
+        prob += 0.1
+    if bmi >= 30:
+        prob += 0.25
+    elif bmi >= 25:
+        prob += 0.15
+    if age >= 45:
+        prob += 0.15
+    elif age >= 35:
+        prob += 0.08
+    if bp >= 90:
+        prob += 0.1
+    elif bp >= 80:
+        prob += 0.05
+    if dpf >= 0.5:
+        prob += 0.05
+    elif dpf >= 0.3:
+        prob += 0.025
+    if insulin >= 200:
+        prob += 0.02
+    if pregnancies >= 4:
+        prob += 0.015
+    if skin_thickness >= 35:
+        prob += 0.015
+    prob = min(max(prob, 0.05), 0.95)
+    
+    return (1 if risk_score >= 6 else 0), prob
+
+
+def sample_rows():
+    """Dataset rows, random rows and rows sitting exactly on every threshold"""
+    rng = np.random.default_rng(0)
+    dataset = pd.read_csv('diabetes.csv').drop('Outcome', axis=1).values.astype(float)
+    low = np.array([0, 40, 40, 0, 0, 15, 0.05, 18])
+    high = np.array([17, 220, 130, 60, 900, 60, 2.5, 85])
+    random_rows = rng.uniform(low, high, size=(2000, 8))
+    
+    edges = [[4], [70, 100, 126], [80, 90], [35], [166, 200], [25, 30], [0.3, 0.5], [35, 45]]
+    boundary_rows = np.repeat(dataset[:1], sum(len(e) for e in edges), axis=0)
+    row = 0
+    for column, cuts in enumerate(edges):
+        for cut in cuts:
+            boundary_rows[row, column] = cut
+            row += 1
+    
+    return np.vstack([dataset, random_rows, boundary_rows])
+
+
+def test_predict_matches_reference():
+    X = sample_rows()
+    expected = np.array([reference_score(sample)[0] for sample in X])
+    
+    np.testing.assert_array_equal(MedicalRuleBasedModel().predict(X), expected)
+
+
+def test_predict_proba_matches_reference():
+    X = sample_rows()
+    expected = np.array([reference_score(sample)[1] for sample in X])
+    
+    proba = MedicalRuleBasedModel().predict_proba(X)
+    assert proba.shape == (len(X), 2)
+    np.testing.assert_array_equal(proba[:, 1], expected)
+    np.testing.assert_array_equal(proba[:, 0], 1 - expected)
+
+
+def test_single_row_input():
+    sample = [2, 150, 85, 30, 120, 32.0, 0.6, 50]
+    model = MedicalRuleBasedModel()
+    
+    assert model.predict([sample]).tolist() == [reference_score(sample)[0]]
+    assert model.predict_proba([sample])[0][1] == reference_score(sample)[1]
+
+
+def test_predict_with_proba_matches_separate_calls():
+    X = sample_rows()
+    model = MedicalRuleBasedModel()
+    
+    predictions, probabilities = model.predict_with_proba(X)
+    np.testing.assert_array_equal(predictions, model.predict(X))
+    np.testing.assert_array_equal(probabilities, model.predict_proba(X)[:, 1])
+
+
+def test_predict_with_proba_for_sklearn_estimators():
+    from sklearn.tree import DecisionTreeClassifier
+    from model import predict_with_proba
+    
+    df = pd.read_csv('diabetes.csv')
+    X, y = df.drop('Outcome', axis=1).values, df['Outcome'].values
+    tree = DecisionTreeClassifier(max_depth=4, random_state=42).fit(X, y)
+    
+    predictions, probabilities = predict_with_proba(tree, X)
+    np.testing.assert_array_equal(predictions, tree.predict(X))
+    np.testing.assert_array_equal(probabilities, tree.predict_proba(X)[:, 1])
+
+
+def test_predict_diabetes_many_matches_single_row_path():
+    from model import predict_diabetes, predict_diabetes_many
+    
+    X = sample_rows()[:50]
+    predictions, probabilities = predict_diabetes_many(X)
+    
+    for row, prediction, probability in zip(X, predictions, probabilities):
+        assert predict_diabetes(list(row)) == (prediction, probability)
+
+
+def test_missing_values_do_not_trigger_rules():
+    X = sample_rows()[:200].copy()
+    X[::3, 1] = np.nan
+    X[1::3, 5] = np.nan
+    X[2::3, 7] = np.nan
+    expected = [reference_score(sample) for sample in X]
+    
+    predictions, probabilities = MedicalRuleBasedModel().predict_with_proba(X)
+    np.testing.assert_array_equal(predictions, [prediction for prediction, _ in expected])
+    np.testing.assert_array_equal(probabilities, [probability for _, probability in expected])
+
+
+def test_rule_table_rejects_unsorted_cutpoints():
+    import pytest
+    from rules import RuleTable
+    
+    rule = {'feature': 'glucose', 'cutpoints': [126, 100], 'scores': [0, 2, 4],
+            'weights': [0.0, 0.2, 0.4], 'levels': [None, 'moderate', 'high']}
+    with pytest.raises(ValueError):
+        RuleTable([rule])
+
+
+def test_risk_analysis_helpers_follow_rule_table():
+    import app_simple
+    
+    features = [5, 130, 92, 30, 100, 27.0, 0.4, 50]
+    form = dict(zip(['pregnancies', 'glucose', 'bloodpressure', 'skinthickness',
+                     'insulin', 'bmi', 'dpf', 'age'], features))
+    
+    factors = {item['factor']: item['level'] for item in app_simple.analyze_risk_factors(features)}
+    assert factors == {'Blood Glucose': 'high', 'BMI': 'moderate', 'Blood Pressure': 'high', 'Age': 'moderate'}
+    
+    analysis = app_simple.generate_detailed_risk_analysis(form, 1, 0.8)
+    detailed = {item['factor']: (item['level'], item['value']) for item in analysis['risk_factors']}
+    assert detailed == {'Blood Glucose': ('High', 130), 'BMI': ('Elevated', 27.0),
+                        'Age': ('Moderate', 50), 'Blood Pressure': ('High', 92)}
+
+
+def test_lookup_single_row_matches_reference():
+    model = MedicalRuleBasedModel()
+    X = sample_rows()
+    X[::7, 1] = np.nan
+    
+    for sample in X:
+        assert model.predict_one(list(sample)) == reference_score(sample)
+
+
+def test_lookup_hit_stats_count_traffic():
+    from rules import BucketLookup
+    
+    lookup = BucketLookup()
+    X = sample_rows()
+    lookup.lookup_many(X)
+    lookup.lookup_one(list(X[0]))
+    
+    stats = lookup.hit_stats(top=3)
+    assert stats['total_predictions'] == len(X) + 1
+    assert stats['cells'] == 4 * 3 ** 5 * 2 * 2
+    assert len(stats['top_cells']) == 3
+    assert stats['top_cells'][0]['hits'] >= stats['top_cells'][1]['hits']
+    assert set(stats['top_cells'][0]['buckets']) == {'glucose', 'bmi', 'age', 'bloodpressure',
+                                                     'dpf', 'insulin', 'pregnancies', 'skinthickness'}
+    
+    lookup.reset_hits()
+    assert lookup.hit_stats()['total_predictions'] == 0
+
+
+def test_rule_model_pickles_without_lookup_table():
+    import pickle
+    
+    restored = pickle.loads(pickle.dumps(MedicalRuleBasedModel()))
+    X = sample_rows()[:100]
+    np.testing.assert_array_equal(restored.predict(X), MedicalRuleBasedModel().predict(X))
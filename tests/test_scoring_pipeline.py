@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the compiled scoring pipeline used by predict_diabetes.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+import model
+from model import MedicalRuleBasedModel, compile_pipeline
+
+
+def dataset():
+    df = pd.read_csv('diabetes.csv')
+    return df.drop('Outcome', axis=1).values.astype(float), df['Outcome'].values
+
+
+def test_rule_pipeline_scores_raw_clinical_units():
+    X, _ = dataset()
+    rules = MedicalRuleBasedModel()
+    scaler = StandardScaler().fit(X)
+    pipeline = compile_pipeline(rules, scaler)
+    
+    assert pipeline.mean is None
+    predictions, probabilities = pipeline.score_many(X)
+    np.testing.assert_array_equal(predictions, rules.predict(X))
+    np.testing.assert_array_equal(probabilities, rules.predict_proba(X)[:, 1])
+
+
+def test_predict_diabetes_applies_thresholds_as_written():
+    model.create_synthetic_model()
+    
+    rules = model.get_model()
+    calibrator = model.active_version().pipeline.calibrator
+    
+    # Diabetic glucose, obese BMI, older age, family history -> positive
+    prediction, probability = model.predict_diabetes([2, 160, 85, 30, 120, 34.0, 0.6, 52])
+    assert prediction == 1
+    assert abs(rules.predict_one([2, 160, 85, 30, 120, 34.0, 0.6, 52])[1] - 0.9) < 1e-9
+    assert probability == calibrator.apply_one(rules.predict_one([2, 160, 85, 30, 120, 34.0, 0.6, 52])[1])
+    
+    # Normal glucose, healthy BMI, young -> negative with the 5% floor before calibration
+    prediction, probability = model.predict_diabetes([1, 85, 66, 20, 80, 22.0, 0.2, 25])
+    assert prediction == 0
+    assert rules.predict_one([1, 85, 66, 20, 80, 22.0, 0.2, 25])[1] == 0.05
+    assert probability == calibrator.apply_one(0.05)
+
+
+def test_scaled_estimator_pipeline_matches_scaler_transform():
+    X, y = dataset()
+    scaler = StandardScaler().fit(X)
+    estimator = LogisticRegression(max_iter=1000).fit(scaler.transform(X), y)
+    pipeline = compile_pipeline(estimator, scaler)
+    
+    predictions, probabilities = pipeline.score_many(X)
+    np.testing.assert_array_equal(predictions, estimator.predict(scaler.transform(X)))
+    np.testing.assert_allclose(probabilities, estimator.predict_proba(scaler.transform(X))[:, 1], rtol=1e-12)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Shadow scoring tests: batched candidate scoring, agreement stats and dropping when full.
+"""
+
+import time
+
+import numpy as np
+
+import app_simple
+import model
+from shadow import ShadowScorer
+from conftest import random_rows
+
+
+def serve(scorer, rows):
+    """Score rows on the primary model like /predict does and hand them to the scorer"""
+    served = [model.predict_diabetes(row) for row in rows]
+    for row, (prediction, probability) in zip(rows, served):
+        scorer.submit(row, prediction, probability)
+    return served
+
+
+def test_drained_batches_match_candidate_scores(candidate):
+    path, version = candidate
+    scorer = ShadowScorer(path, batch_size=64)
+    rows = random_rows(300).tolist()
+    served = serve(scorer, rows)
+    assert scorer.drain() == 300
+
+    predictions, probabilities = map(np.asarray, zip(*served))
+    shadow_predictions, shadow_probabilities = scorer.handle.current.pipeline.score_many(rows)
+    delta = shadow_probabilities - probabilities
+
+    stats = scorer.info()['versions'][version]
+    assert stats['rows'] == 300 and stats['batches'] == 5
+    assert stats['disagreement_rate'] == round(np.mean(shadow_predictions != predictions), 4)
+    assert stats['mean_abs_probability_delta'] == round(np.abs(delta).mean(), 4)
+    assert stats['max_abs_probability_delta'] == round(np.abs(delta).max(), 4)
+    assert sum(stats['abs_delta_histogram'].values()) == 300
+
+
+def test_full_queue_drops_instead_of_blocking(candidate):
+    path, _ = candidate
+    scorer = ShadowScorer(path, queue_size=10)
+    rows = random_rows(25).tolist()
+
+    start = time.perf_counter()
+    serve(scorer, rows)
+    assert time.perf_counter() - start < 1
+
+    info = scorer.info()
+    assert info['submitted'] == 10 and info['dropped'] == 15 and info['queue']['size'] == 10
+
+    # Without a candidate nothing is queued
+    assert ShadowScorer().submit(rows[0], 0, 0.1) is False
+
+
+def test_background_thread_scores_submitted_rows(candidate):
+    path, version = candidate
+    scorer = ShadowScorer(path)
+    scorer.start()
+    try:
+        serve(scorer, random_rows(100).tolist())
+        deadline = time.time() + 5
+        while scorer.info()['versions'].get(version, {}).get('rows', 0) < 100 and time.time() < deadline:
+            time.sleep(0.01)
+        assert scorer.info()['versions'][version]['rows'] == 100
+    finally:
+        scorer.stop()
+        scorer.handle.stop_watching()
+
+
+def test_endpoint_is_read_only_and_labels_the_sample():
+    client = app_simple.app.test_client()
+    assert client.post('/api/shadow', json={'path': '/tmp'}).status_code == 405
+
+    info = client.get('/api/shadow').get_json()
+    assert info['success'] and info['scope'] == "this worker's /predict calls only"
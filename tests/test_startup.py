@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Startup tests: importing the app stays cheap and the model initializes in warmup().
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def run_fresh(script):
+    """Run a script in a fresh interpreter from the repo root and return its last output line"""
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_importing_app_defers_heavy_modules_and_model_load():
+    state = run_fresh(
+        "import json, sys, app_simple, model\n"
+        "print(json.dumps({'eager': sorted({m.split('.')[0] for m in sys.modules} & {'pandas', 'sklearn'}),\n"
+        "                  'loaded': model.pipeline is not None}))"
+    )
+    assert state == {'eager': [], 'loaded': False}
+
+
+def test_warmup_loads_model_and_records_time():
+    state = run_fresh(
+        "import json, app_simple, model\n"
+        "accuracy = app_simple.warmup_model()\n"
+        "print(json.dumps({'loaded': model.pipeline is not None, 'seconds': model.warmup_seconds,\n"
+        "                  'accuracy': accuracy}))"
+    )
+    assert state['loaded'] and state['seconds'] > 0 and 0 < state['accuracy'] <= 1
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed training cache (training_cache.py).
+"""
+
+import numpy as np
+
+import training_cache
+from conftest import trained_forest
+
+
+def fake_training(calls):
+    def train():
+        calls.append(1)
+        forest, scaler, _ = trained_forest(n_estimators=5)
+        return forest, scaler, {'accuracy': 0.75}
+    return train
+
+
+def test_second_run_hits_cache_with_identical_model(tmp_path):
+    dataset = tmp_path / 'data.csv'
+    dataset.write_bytes(open('diabetes.csv', 'rb').read())
+    cache_dir = str(tmp_path / 'cache')
+    params = {'n_estimators': 5}
+    calls = []
+    
+    forest, scaler, first, hit = training_cache.cached_training(str(dataset), params, fake_training(calls), cache_dir)
+    assert not hit and len(calls) == 1
+    cached, cached_scaler, second, hit = training_cache.cached_training(str(dataset), params, fake_training(calls), cache_dir)
+    assert hit and len(calls) == 1
+    
+    assert second == first and second['metrics'] == {'accuracy': 0.75}
+    X = np.loadtxt('diabetes.csv', delimiter=',', skiprows=1)[:, :8]
+    np.testing.assert_array_equal(cached.predict(X), forest.predict(scaler.transform(X)))
+    assert training_cache.cache_stats(cache_dir)['entries'] == 1
+
+
+def test_dataset_or_params_change_misses(tmp_path):
+    dataset = tmp_path / 'data.csv'
+    dataset.write_bytes(open('diabetes.csv', 'rb').read())
+    cache_dir = str(tmp_path / 'cache')
+    calls = []
+    
+    training_cache.cached_training(str(dataset), {'n_estimators': 5}, fake_training(calls), cache_dir)
+    training_cache.cached_training(str(dataset), {'n_estimators': 6}, fake_training(calls), cache_dir)
+    dataset.write_bytes(dataset.read_bytes() + b'1,100,70,20,80,25.0,0.3,30,0\n')
+    training_cache.cached_training(str(dataset), {'n_estimators': 5}, fake_training(calls), cache_dir)
+    
+    assert len(calls) == 3
+    assert training_cache.cache_stats(cache_dir)['entries'] == 3
+
+
+def test_stats_are_served_from_memory(tmp_path, monkeypatch):
+    dataset = tmp_path / 'data.csv'
+    dataset.write_bytes(open('diabetes.csv', 'rb').read())
+    cache_dir = str(tmp_path / 'cache')
+    calls = []
+    
+    assert training_cache.cache_stats(cache_dir)['entries'] == 0
+    
+    def count_entries(cache_dir):
+        raise AssertionError("cache_stats listed the cache directory again")
+    monkeypatch.setattr(training_cache, '_count_entries', count_entries)
+    
+    training_cache.cached_training(str(dataset), {'n_estimators': 5}, fake_training(calls), cache_dir)
+    training_cache.cached_training(str(dataset), {'n_estimators': 6}, fake_training(calls), cache_dir)
+    training_cache.cached_training(str(dataset), {'n_estimators': 6}, fake_training(calls), cache_dir)
+    assert training_cache.cache_stats(cache_dir)['entries'] == 2 and len(calls) == 2
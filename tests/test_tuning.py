@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter search tests: successive halving, checkpoint/resume and publishing the winner.
+"""
+
+import json
+import os
+
+import pytest
+
+import tuning
+from artifacts import read_header, save_model_artifact
+from model import ModelHandle
+from model_card import MODEL_CARD_FILE
+from conftest import trained_forest
+
+SMALL_SPACE = {
+    'random_forest': {'n_estimators': [10, 20], 'max_depth': [3, None]},
+    'logistic_regression': {'C': [0.1, 1.0]}
+}
+SMALL_CONFIG = {'candidates': 4, 'eta': 2, 'folds': 2}
+
+
+@pytest.fixture
+def small_space(monkeypatch):
+    monkeypatch.setattr(tuning, 'SEARCH_SPACE', SMALL_SPACE)
+
+
+def test_candidates_and_rungs():
+    candidates = tuning.sample_candidates(27)
+    assert len({candidate['id'] for candidate in candidates}) == 27
+    assert {candidate['family'] for candidate in candidates} == {'random_forest', 'logistic_regression'}
+    assert tuning.sample_candidates(27) == candidates
+
+    assert tuning.rung_rows(512, 3, 3) == [56, 170, 512]
+
+
+def test_search_publishes_winner_with_report(tmp_path, small_space):
+    search_dir, artifact_dir = str(tmp_path / 'search'), str(tmp_path / 'artifact')
+    report = tuning.run_search('diabetes.csv', 120, 1, search_dir, artifact_dir, SMALL_CONFIG)
+
+    assert report['completed'] and [rung['candidates'] for rung in report['rungs']] == [4, 2]
+    assert report['fits'] == 4 * 2 + 2 * 2 and report['task_seconds'] > 0
+    assert report['winner']['id'] == report['leaderboard'][0]['id'] and report['holdout']['accuracy'] > 0.65
+
+    assert report['publish_rejected'] is None
+    handle = ModelHandle(artifact_dir)
+    version = handle.load()
+    assert version.version == report['published_version'] and version.card['source'] == 'hyperparameter_search'
+    with open(os.path.join(artifact_dir, tuning.SEARCH_REPORT_FILE)) as f:
+        stored = json.load(f)
+    assert stored['model_version'] == version.version and stored['winner'] == report['winner']
+    assert os.path.exists(os.path.join(artifact_dir, MODEL_CARD_FILE))
+
+
+def test_winner_failing_validation_is_not_published(tmp_path, small_space):
+    search_dir, artifact_dir = str(tmp_path / 'search'), str(tmp_path / 'artifact')
+    # This forest was trained on the golden rows too, so no held-out winner gets within tolerance of it
+    forest, scaler, _ = trained_forest(n_estimators=20)
+    served = save_model_artifact(forest, scaler, artifact_dir)
+
+    report = tuning.run_search('diabetes.csv', 120, 1, search_dir, artifact_dir, SMALL_CONFIG)
+    assert report['published_version'] is None and 'golden set accuracy' in report['publish_rejected']
+    assert report['holdout']['accuracy'] > 0.65
+    assert read_header(artifact_dir)['content_hash'] == served['content_hash']
+    assert not os.path.exists(os.path.join(artifact_dir, tuning.SEARCH_REPORT_FILE))
+
+
+def test_interrupted_search_resumes_from_checkpoint(tmp_path, small_space):
+    search_dir = str(tmp_path)
+    first = tuning.run_search('diabetes.csv', 120, 1, search_dir, None, SMALL_CONFIG)
+
+    # Drop the last rung from the checkpoint, as if the search had been killed during it
+    path = tuning.checkpoint_path(first['search_key'], search_dir)
+    with open(path) as f:
+        checkpoint = json.load(f)
+    checkpoint['results'] = {key: result for key, result in checkpoint['results'].items() if result['rung'] == 0}
+    checkpoint['status'] = 'running'
+    with open(path, 'w') as f:
+        json.dump(checkpoint, f)
+
+    resumed = tuning.run_search('diabetes.csv', 120, 1, search_dir, None, SMALL_CONFIG)
+    assert resumed['resumed_fits'] == 4 * 2 and resumed['fits'] == first['fits']
+    assert resumed['winner'] == first['winner'] and resumed['leaderboard'] == first['leaderboard']
+
+
+def test_endpoint_caps_the_budget(monkeypatch):
+    import app
+
+    started = []
+    monkeypatch.setattr(tuning, 'start_search', lambda *args: started.append(args) or True)
+    client = app.app.test_client()
+    for budget in (0, -5, 'nan', tuning.MAX_BUDGET_SECONDS + 1, 1e9):
+        assert client.post(f'/api/hyperparameter-search?budget={budget}').status_code == 400
+    assert client.post(f'/api/hyperparameter-search?budget={tuning.MAX_BUDGET_SECONDS}').status_code == 202
+    assert started == [('diabetes.csv', tuning.MAX_BUDGET_SECONDS)]
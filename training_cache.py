@@ -0,0 +1,138 @@
+"""
+Content-addressed cache of training results.
+
+A training run is keyed by the SHA-256 of the dataset bytes together with its
+hyperparameters. The fitted model, scaler and metrics are stored under that key as a
+model artifact (see artifacts.py):
+
+    training_cache/
+        3f2a9c01d4e5b6a7/    first 16 hex digits of the key
+            header.json      metadata['training'] holds the full key, params, metrics, training time
+            ...
+
+Retraining on unchanged data with unchanged hyperparameters becomes a memory-mapped load.
+Editing the dataset or any hyperparameter changes the key, so stale entries are never
+reused. Bump CACHE_VERSION when the training code changes in a way the hyperparameters
+do not capture.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+from artifacts import artifact_exists, load_model_artifact, save_model_artifact
+
+TRAINING_CACHE_DIR = 'training_cache'
+CACHE_VERSION = 3
+
+# Hit/miss counters for this process, reported by cache_stats()
+_stats = {'hits': 0, 'misses': 0, 'last': None}
+_stats_lock = threading.Lock()
+
+# Stored entries per cache directory: counted on the first cache_stats() call in this
+# process, then kept up to date by store()
+_entries = {}
+
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(dataset_sha256, params):
+    """Key for training on a dataset (by content hash) with the JSON-serialisable `params`"""
+    payload = {'dataset': dataset_sha256, 'params': params, 'cache_version': CACHE_VERSION}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def entry_path(key, cache_dir=TRAINING_CACHE_DIR):
+    return os.path.join(cache_dir, key[:16])
+
+
+def _record(event, key, seconds):
+    with _stats_lock:
+        _stats['hits' if event == 'hit' else 'misses'] += 1
+        _stats['last'] = {'event': event, 'cache_key': key, 'seconds': round(seconds, 4)}
+
+
+def lookup(key, cache_dir=TRAINING_CACHE_DIR):
+    """Return (model, scaler, metadata) for a cached training run, or None"""
+    path = entry_path(key, cache_dir)
+    if not artifact_exists(path):
+        return None
+
+    model, scaler, header = load_model_artifact(path)
+    training = header['metadata'].get('training', {})
+    if training.get('cache_key') != key:
+        # Shortened directory name collided with another key
+        return None
+    return model, scaler, training
+
+
+def store(key, model, scaler, metadata, cache_dir=TRAINING_CACHE_DIR):
+    """Store a training result under `key` and return the artifact header"""
+    path = entry_path(key, cache_dir)
+    new = not artifact_exists(path)
+    # Namespaced so it cannot clash with the model's own metadata fields
+    header = save_model_artifact(model, scaler, path, metadata={'training': dict(metadata, cache_key=key)})
+
+    with _stats_lock:
+        if new and cache_dir in _entries:
+            _entries[cache_dir] += 1
+    return header
+
+
+def cached_training(dataset_path, params, train, cache_dir=TRAINING_CACHE_DIR):
+    """Return (model, scaler, metadata, hit), calling train() only on a cache miss
+
+    train() must return (model, scaler, metrics) with a JSON-serialisable metrics dict.
+    """
+    start = time.perf_counter()
+    dataset_sha256 = file_sha256(dataset_path)
+    key = cache_key(dataset_sha256, params)
+
+    cached = lookup(key, cache_dir)
+    if cached is not None:
+        seconds = time.perf_counter() - start
+        _record('hit', key, seconds)
+        print(f"Training cache hit ({key[:12]}): loaded in {seconds * 1000:.1f} ms")
+        return cached + (True,)
+
+    model, scaler, metrics = train()
+    seconds = time.perf_counter() - start
+    metadata = {
+        'params': params,
+        'metrics': metrics,
+        'dataset_sha256': dataset_sha256,
+        'training_seconds': round(seconds, 3),
+        'trained_at': datetime.datetime.now().isoformat()
+    }
+    store(key, model, scaler, metadata, cache_dir)
+    _record('miss', key, seconds)
+    print(f"Training cache miss ({key[:12]}): trained in {seconds:.2f} s")
+    return model, scaler, dict(metadata, cache_key=key), False
+
+
+def _count_entries(cache_dir):
+    if not os.path.isdir(cache_dir):
+        return 0
+    return sum(artifact_exists(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+
+
+def cache_stats(cache_dir=TRAINING_CACHE_DIR):
+    """Hit/miss counts for this process and the number of stored entries, from memory
+
+    The directory is listed once per process; entries other processes store after that
+    show up when this one restarts.
+    """
+    with _stats_lock:
+        if cache_dir not in _entries:
+            _entries[cache_dir] = _count_entries(cache_dir)
+        return dict(_stats, entries=_entries[cache_dir])
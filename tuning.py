@@ -0,0 +1,429 @@
+"""
+Budgeted hyperparameter search with successive halving.
+
+Candidates are sampled from SEARCH_SPACE, which covers random forest and logistic regression
+settings. Every candidate is scored by stratified k-fold cross-validation on a small share
+of each training fold. The best 1/ETA of them move on to a rung with ETA times as many
+training rows, until the survivors are fitted on full training folds. Fits run in a
+process pool and share the dataset as memory-mapped arrays (see comparison.py). The search
+stops early once its wall-clock budget is spent. The golden set rows (see golden_set.py)
+are left out of the search and of the winner's refit.
+
+Every finished fit is checkpointed:
+
+    hyperparameter_search/
+        <search key>.checkpoint.json    config, every (candidate, rung, fold) score, time spent
+        <search key>.report.json        final report
+
+Rerunning an interrupted search resumes it: finished fits are read from the checkpoint,
+and the survivors of each rung are recomputed from the stored scores. The budget covers
+the whole search, across resumes. The winner is refitted on the same 80/20 training split
+as model_old.train_model and published to the artifact load_model reads, through
+model.publish_version: staged, validated on the golden set against the published version,
+and only promoted if it passes (the report's publish_rejected says why it was not). Its
+model card and the search report are written next to it:
+
+    model_artifact/
+        header.json
+        model_card.json
+        search_report.json
+
+Run a search with:
+
+    python tuning.py --budget 300 [--workers N] [--candidates 27]
+"""
+
+import argparse
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+
+import numpy as np
+
+from artifacts import ARTIFACT_DIR, save_model_artifact
+from calibration import fit_calibration
+from golden_set import golden_set_sha256, training_mask
+from comparison import (cv_arrays, init_cv_worker, load_dataset, read_json, stratified_folds, write_cv_arrays,
+                        write_json)
+from model import RejectedVersionError, publish_version
+from model_card import MODEL_CARD_FILE, build_model_card, evaluate
+from training_cache import file_sha256
+
+SEARCH_DIR = 'hyperparameter_search'
+SEARCH_REPORT_FILE = 'search_report.json'
+
+# Values tried per hyperparameter, per model family
+SEARCH_SPACE = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200, 300],
+        'max_depth': [None, 4, 6, 8, 12],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': ['sqrt', 0.5, None]
+    },
+    'logistic_regression': {
+        'C': [0.01, 0.1, 1.0, 10.0, 100.0],
+        'class_weight': [None, 'balanced']
+    }
+}
+
+# Search settings; all of them are part of the search key
+DEFAULT_CONFIG = {
+    'candidates': 27,
+    'eta': 3,
+    'folds': 3,
+    'metric': 'accuracy',
+    'seed': 42
+}
+
+# Wall-clock budget of a search in seconds, across resumes
+DEFAULT_BUDGET_SECONDS = 300
+
+# Largest budget a search started over HTTP may ask for (the pool uses every CPU meanwhile);
+# longer searches are run with the command line
+MAX_BUDGET_SECONDS = 900
+
+# Seconds without a checkpoint write after which a 'running' search is presumed dead
+STALE_SEARCH_SECONDS = 600
+
+_search_lock = threading.Lock()
+
+
+def sample_candidates(count, seed=42):
+    """`count` distinct candidates from SEARCH_SPACE, split evenly over the families where their grids allow"""
+    grids = {family: [dict(zip(space, values)) for values in itertools.product(*space.values())]
+             for family, space in SEARCH_SPACE.items()}
+    rng = np.random.default_rng(seed)
+
+    # Deal the candidates out round-robin; a family whose grid is used up passes its turn
+    shares = dict.fromkeys(grids, 0)
+    while sum(shares.values()) < count and any(shares[family] < len(grid) for family, grid in grids.items()):
+        for family, grid in grids.items():
+            if shares[family] < len(grid) and sum(shares.values()) < count:
+                shares[family] += 1
+
+    candidates = []
+    for family, grid in grids.items():
+        for index in rng.choice(len(grid), size=shares[family], replace=False):
+            params = grid[index]
+            candidate_id = hashlib.sha256(json.dumps([family, params], sort_keys=True).encode()).hexdigest()[:12]
+            candidates.append({'id': candidate_id, 'family': family, 'params': params})
+    return candidates
+
+
+def build_estimator(candidate):
+    """Unfitted sklearn estimator for a candidate"""
+    if candidate['family'] == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=42, n_jobs=1, **candidate['params'])
+    if candidate['family'] == 'logistic_regression':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(max_iter=1000, **candidate['params'])
+    raise ValueError(f"Unknown model family '{candidate['family']}'")
+
+
+def rung_rows(training_rows, rungs, eta):
+    """Training rows used per fold at every rung; the last rung uses whole training folds"""
+    return [max(training_rows // eta ** (rungs - 1 - rung), 2 * eta) for rung in range(rungs)]
+
+
+def fit_candidate(candidate, rung, fold, rows):
+    """Fit a candidate on the first `rows` training rows of `fold` and score it (runs in a pool process)"""
+    from sklearn.preprocessing import StandardScaler
+
+    start = time.perf_counter()
+    X, y, fold_of = cv_arrays['X'], cv_arrays['y'], cv_arrays['fold_of']
+    test = fold_of == fold
+
+    # fold_of is stratified and rows are in random order, so a prefix keeps both classes
+    train = np.flatnonzero(~test)[:rows]
+    scaler = StandardScaler()
+    model = build_estimator(candidate).fit(scaler.fit_transform(X[train]), y[train])
+    evaluation = evaluate(y[test], model.predict(scaler.transform(X[test])))
+
+    return {
+        'candidate': candidate['id'],
+        'rung': rung,
+        'fold': fold,
+        'rows': int(len(train)),
+        'accuracy': evaluation['accuracy'],
+        'f1_score': evaluation['f1_score'],
+        'seconds': time.perf_counter() - start
+    }
+
+
+def task_key(candidate_id, rung, fold):
+    return f"{candidate_id}:{rung}:{fold}"
+
+
+def rung_scores(results, candidates, rung, folds, metric):
+    """Mean score at `rung` of every candidate with all its folds finished"""
+    scores = {}
+    for candidate in candidates:
+        values = [results.get(task_key(candidate['id'], rung, fold)) for fold in range(folds)]
+        if all(values):
+            scores[candidate['id']] = float(np.mean([value[metric] for value in values]))
+    return scores
+
+
+def search_key(dataset_hash, config):
+    payload = json.dumps({'dataset': dataset_hash, 'config': config, 'space': SEARCH_SPACE,
+                          'golden_set': golden_set_sha256()}, sort_keys=True)
+    return f"{dataset_hash[:16]}-{hashlib.sha256(payload.encode()).hexdigest()[:8]}"
+
+
+def checkpoint_path(key, directory=SEARCH_DIR):
+    return os.path.join(directory, f"{key}.checkpoint.json")
+
+
+def report_path(key, directory=SEARCH_DIR):
+    return os.path.join(directory, f"{key}.report.json")
+
+
+def load_training_set(dataset_path):
+    """(X, y) of the dataset without the golden set rows (see golden_set.py)"""
+    X, y = load_dataset(dataset_path)
+    keep = training_mask(X, y)
+    return X[keep], y[keep]
+
+
+def run_search(dataset_path='diabetes.csv', budget_seconds=DEFAULT_BUDGET_SECONDS, max_workers=None,
+               directory=SEARCH_DIR, publish_to=ARTIFACT_DIR, config=None):
+    """Run (or resume) a successive-halving search, publish the winner and return the report"""
+    import multiprocessing
+
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    dataset_hash = file_sha256(dataset_path)
+    key = search_key(dataset_hash, config)
+    os.makedirs(directory, exist_ok=True)
+
+    path = checkpoint_path(key, directory)
+    checkpoint = read_json(path) or {'key': key, 'config': config, 'dataset_sha256': dataset_hash,
+                                      'results': {}, 'elapsed_seconds': 0.0}
+    results = checkpoint['results']
+    resumed_fits = len(results)
+    spent = checkpoint['elapsed_seconds']
+    start = time.perf_counter()
+
+    def elapsed():
+        return spent + time.perf_counter() - start
+
+    def save(status):
+        checkpoint.update(status=status, elapsed_seconds=round(elapsed(), 3), updated_at=time.time())
+        write_json(path, checkpoint)
+
+    candidates = sample_candidates(config['candidates'], config['seed'])
+    folds, eta, metric = config['folds'], config['eta'], config['metric']
+    # Enough rungs to cut the field down to a handful of finalists
+    rungs = 1
+    while eta ** rungs < len(candidates):
+        rungs += 1
+
+    X, y = load_training_set(dataset_path)
+    order = np.random.default_rng(config['seed']).permutation(len(y))
+    X, y = X[order], y[order]
+    fold_of = stratified_folds(y, folds, config['seed'])
+    rows_per_rung = rung_rows(int(np.sum(fold_of != 0)), rungs, eta)
+
+    survivors = candidates
+    history = []
+    exhausted = False
+    save('running')
+
+    with tempfile.TemporaryDirectory() as scratch:
+        paths = write_cv_arrays(X, y, fold_of, scratch)
+        workers = max_workers or os.cpu_count() or 1
+        pool = None
+        try:
+            for rung, rows in enumerate(rows_per_rung):
+                pending = [(candidate, fold) for candidate in survivors for fold in range(folds)
+                           if task_key(candidate['id'], rung, fold) not in results]
+
+                if pending and elapsed() < budget_seconds:
+                    if pool is None:
+                        # 'spawn' keeps the pool processes clear of the caller's threads and locks
+                        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                                   initializer=init_cv_worker, initargs=(paths,))
+                    futures = [pool.submit(fit_candidate, candidate, rung, fold, rows) for candidate, fold in pending]
+                    try:
+                        for future in as_completed(futures, timeout=max(budget_seconds - elapsed(), 0)):
+                            result = future.result()
+                            results[task_key(result['candidate'], rung, result['fold'])] = result
+                            save('running')
+                    except TimeoutError:
+                        for future in futures:
+                            future.cancel()
+
+                scores = rung_scores(results, survivors, rung, folds, metric)
+                history.append({'rung': rung, 'rows': rows, 'candidates': len(survivors), 'scored': len(scores)})
+                if len(scores) < len(survivors):
+                    # Budget spent part way through this rung: pick from the rungs that finished
+                    exhausted = True
+                    break
+
+                if rung < rungs - 1:
+                    keep = max(1, len(survivors) // eta)
+                    ranked = sorted(survivors, key=lambda candidate: scores[candidate['id']], reverse=True)
+                    survivors = ranked[:keep]
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    # The winner is the best candidate of the highest rung every one of its survivors finished
+    final = next((entry for entry in reversed(history) if entry['scored'] == entry['candidates']), None)
+    if final is None:
+        save('exhausted')
+        raise RuntimeError(f"Budget of {budget_seconds} s ran out before the first rung finished")
+
+    scores = rung_scores(results, candidates, final['rung'], folds, metric)
+    by_id = {candidate['id']: candidate for candidate in candidates}
+    winner = by_id[max(scores, key=scores.get)]
+
+    report = {
+        'search_key': key,
+        'dataset_sha256': dataset_hash,
+        'config': config,
+        'budget_seconds': budget_seconds,
+        'elapsed_seconds': round(elapsed(), 3),
+        'completed': not exhausted,
+        'resumed_fits': resumed_fits,
+        'fits': len(results),
+        'workers': workers,
+        'task_seconds': round(sum(result['seconds'] for result in results.values()), 3),
+        'rungs': history,
+        'winner': dict(winner, cv_score=scores[winner['id']], rung=final['rung']),
+        'leaderboard': [
+            dict(by_id[candidate_id], cv_score=score, rung=final['rung'])
+            for candidate_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        ],
+        'candidates': []
+    }
+    for candidate in candidates:
+        # Mean score of every rung the candidate finished
+        per_rung = {rung: rung_scores(results, [candidate], rung, folds, metric) for rung in range(rungs)}
+        report['candidates'].append(dict(candidate, scores={rung: scores[candidate['id']]
+                                                            for rung, scores in per_rung.items() if scores}))
+
+    report['holdout'], header, report['publish_rejected'] = publish_winner(winner, dataset_path, dataset_hash,
+                                                                          report, publish_to)
+    report['published_version'] = None if header is None else header['content_hash']
+    report['finished_at'] = datetime.datetime.now().isoformat()
+    write_json(report_path(key, directory), report)
+    save('done')
+    print(f"Hyperparameter search {key}: {winner['family']} {winner['params']} "
+          f"({metric} {scores[winner['id']]:.3f}) in {report['elapsed_seconds']:.1f} s")
+    return report
+
+
+def publish_winner(winner, dataset_path, dataset_hash, report, publish_to=ARTIFACT_DIR):
+    """Refit the winner on model_old's 80/20 split, evaluate it and publish it; returns (metrics, header, rejected)
+
+    A winner that fails validation against the published version (see model.publish_version)
+    is not published: header is None and `rejected` says why.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X, y = load_training_set(dataset_path)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler()
+    start = time.perf_counter()
+    model = build_estimator(winner).fit(scaler.fit_transform(X_train), y_train)
+    training_seconds = time.perf_counter() - start
+
+    y_prob = model.predict_proba(scaler.transform(X_test))[:, 1]
+    evaluation = evaluate(y_test, model.predict(scaler.transform(X_test)), y_prob)
+    samples = {'total': int(len(X)), 'training': int(len(X_train)), 'test': int(len(X_test)),
+               'positive_rate': round(float(y.mean()), 4)}
+    metrics = {name: evaluation[name] for name in ('accuracy', 'precision', 'recall', 'f1_score', 'roc_auc')}
+    if not publish_to:
+        return metrics, None, None
+
+    if winner['family'] == 'logistic_regression':
+        # Stored as an online model, which can also be updated incrementally afterwards
+        from online import OnlineLogisticModel
+        model, scaler = OnlineLogisticModel.from_sklearn(model, scaler, len(X_train)), None
+
+    params = dict(winner['params'], family=winner['family'])
+    card = build_model_card(model, evaluation, samples, dataset_sha256=dataset_hash, source='hyperparameter_search',
+                            params=params, training_seconds=round(training_seconds, 3))
+    training = {
+        'params': params,
+        'metrics': card['metrics'],
+        'dataset_sha256': dataset_hash,
+        'training_seconds': round(training_seconds, 3),
+        'trained_at': datetime.datetime.now().isoformat(),
+        'search_key': report['search_key']
+    }
+    # Calibrated on the held-out split, like model_old.train_model
+    metadata = {'training': training, 'calibration': fit_calibration(y_prob, y_test, dataset_sha256=dataset_hash)}
+    sidecars = {MODEL_CARD_FILE: card, SEARCH_REPORT_FILE: dict(report, holdout=metrics)}
+    try:
+        header = publish_version(lambda staging: save_model_artifact(model, scaler, staging, metadata=metadata,
+                                                                     sidecars=sidecars), publish_to)
+    except RejectedVersionError as e:
+        print(f"Hyperparameter search winner not published: {e}")
+        return metrics, None, str(e)
+    return metrics, header, None
+
+
+def get_search(dataset_path='diabetes.csv', directory=SEARCH_DIR, config=None):
+    """(report, checkpoint) of the search for this dataset and config; either may be None"""
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    key = search_key(file_sha256(dataset_path), config)
+    return read_json(report_path(key, directory)), read_json(checkpoint_path(key, directory))
+
+
+def start_search(dataset_path='diabetes.csv', budget_seconds=DEFAULT_BUDGET_SECONDS, directory=SEARCH_DIR,
+                 publish_to=ARTIFACT_DIR):
+    """Run the search in a background thread unless a live one is already running; returns True if started"""
+    with _search_lock:
+        _, checkpoint = get_search(dataset_path, directory)
+        if checkpoint is not None and checkpoint.get('status') == 'running' \
+                and time.time() - checkpoint['updated_at'] < STALE_SEARCH_SECONDS:
+            return False
+
+        # Written before the thread starts so a second request sees the search as running
+        config = dict(DEFAULT_CONFIG)
+        os.makedirs(directory, exist_ok=True)
+        key = search_key(file_sha256(dataset_path), config)
+        checkpoint = dict(checkpoint or {'key': key, 'config': config, 'results': {}, 'elapsed_seconds': 0.0},
+                          status='running', updated_at=time.time())
+        write_json(checkpoint_path(key, directory), checkpoint)
+
+    def run():
+        try:
+            run_search(dataset_path, budget_seconds, directory=directory, publish_to=publish_to)
+        except Exception as e:
+            print(f"Hyperparameter search failed: {e}")
+            write_json(checkpoint_path(key, directory),
+                        dict(read_json(checkpoint_path(key, directory)) or checkpoint, status='error', error=str(e),
+                             updated_at=time.time()))
+
+    threading.Thread(target=run, name='hyperparameter-search', daemon=True).start()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search")
+    parser.add_argument('--dataset', default='diabetes.csv')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_SECONDS, help="wall-clock budget in seconds")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--candidates', type=int, default=DEFAULT_CONFIG['candidates'])
+    parser.add_argument('--out', default=SEARCH_DIR)
+    parser.add_argument('--publish', default=ARTIFACT_DIR, help="artifact to publish the winner to ('' to skip)")
+    args = parser.parse_args()
+
+    report = run_search(args.dataset, args.budget, args.workers, args.out, args.publish or None,
+                        {'candidates': args.candidates})
+    print(json.dumps({name: report[name] for name in ('winner', 'holdout', 'elapsed_seconds', 'fits', 'completed')},
+                     indent=2))
+
+
+if __name__ == '__main__':
+    main()